@@ -47,17 +47,16 @@ async def list_databases(
 
 async def main():
     api_token = os.environ.get("NOTION_API_KEY", "no-token-set")
-    notion_client = NotionAsyncClient(api_token)
-
-    response = await http_list_databases(notion_client)
-    print(response)
-    print(response.json())
-    response.raise_for_status()
-
-    async for db in list_databases(notion_client):
-        print(db.id)
-        print(db.title)
-        print(db)
+    async with NotionAsyncClient(api_token) as notion_client:
+        response = await http_list_databases(notion_client)
+        print(response)
+        print(response.json())
+        response.raise_for_status()
+
+        async for db in list_databases(notion_client):
+            print(db.id)
+            print(db.title)
+            print(db)
 
 
 if __name__ == "__main__":
@@ -66,27 +66,28 @@ async def main():
         logging.basicConfig(level=logging.INFO)
     api_token = os.environ["NOTION_API_KEY"]
     notions_parent_page_uuid = os.environ["NOTIONS_PARENT_PAGE_UUID"]
-    notion_client = NotionAsyncClient(api_token)
-
-    database = await create_database(notion_client, uuid.UUID(notions_parent_page_uuid))
-
-    LOG.info(f"Getting database back using {database.id=}")
-    retrieved_database = await notion_client.get_database(database_id=database.id)
-    if database != retrieved_database:
-        LOG.warning(
-            f"Huh, retrieved database doesn't look like the one we created:\n{database=}\n{retrieved_database=}"
+    async with NotionAsyncClient(api_token) as notion_client:
+        database = await create_database(
+            notion_client, uuid.UUID(notions_parent_page_uuid)
         )
-    else:
-        LOG.info("Retrieved database looks like one we created!")
 
-    if os.environ.get("NOTIONS_KEEP_EXAMPLE_PAGES"):
-        LOG.info("NOTIONS_KEEP_EXAMPLE_PAGES set, keeping database")
-    else:
-        # TODO: delete database
-        LOG.info(f"Deleting database {database.id=}")
-        LOG.warning(
-            "Notion API doesn't support database deletion. You'll have to tidy up yourself! Soz!"
-        )
+        LOG.info(f"Getting database back using {database.id=}")
+        retrieved_database = await notion_client.get_database(database_id=database.id)
+        if database != retrieved_database:
+            LOG.warning(
+                f"Huh, retrieved database doesn't look like the one we created:\n{database=}\n{retrieved_database=}"
+            )
+        else:
+            LOG.info("Retrieved database looks like one we created!")
+
+        if os.environ.get("NOTIONS_KEEP_EXAMPLE_PAGES"):
+            LOG.info("NOTIONS_KEEP_EXAMPLE_PAGES set, keeping database")
+        else:
+            # TODO: delete database
+            LOG.info(f"Deleting database {database.id=}")
+            LOG.warning(
+                "Notion API doesn't support database deletion. You'll have to tidy up yourself! Soz!"
+            )
 
 
 if __name__ == "__main__":
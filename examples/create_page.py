@@ -58,24 +58,23 @@ async def main():
         logging.basicConfig(level=logging.INFO)
     api_token = os.environ["NOTION_API_KEY"]
     notions_parent_page_uuid = uuid.UUID(os.environ["NOTIONS_PARENT_PAGE_UUID"])
-    notion_client = NotionAsyncClient(api_token)
-
-    database = await create_database(notion_client, notions_parent_page_uuid)
-    page = await create_page(notion_client, database_id=database.id)
-
-    LOG.info(f"Getting page back using {page.id=}")
-    retrieved_page = await notion_client.get_page(page_id=page.id)
-    if page != retrieved_page:
-        LOG.warning(
-            f"Huh, retrieved page doesn't look like the one we created:\n{page=}\n{retrieved_page=}"
-        )
-    else:
-        LOG.info("Retrieved page looks like one we created!")
-
-    if os.environ.get("NOTIONS_KEEP_EXAMPLE_PAGES"):
-        LOG.info("NOTIONS_KEEP_EXAMPLE_PAGES set, keeping pages")
-    else:
-        await delete_page(client=notion_client, page=page)
+    async with NotionAsyncClient(api_token) as notion_client:
+        database = await create_database(notion_client, notions_parent_page_uuid)
+        page = await create_page(notion_client, database_id=database.id)
+
+        LOG.info(f"Getting page back using {page.id=}")
+        retrieved_page = await notion_client.get_page(page_id=page.id)
+        if page != retrieved_page:
+            LOG.warning(
+                f"Huh, retrieved page doesn't look like the one we created:\n{page=}\n{retrieved_page=}"
+            )
+        else:
+            LOG.info("Retrieved page looks like one we created!")
+
+        if os.environ.get("NOTIONS_KEEP_EXAMPLE_PAGES"):
+            LOG.info("NOTIONS_KEEP_EXAMPLE_PAGES set, keeping pages")
+        else:
+            await delete_page(client=notion_client, page=page)
 
 
 if __name__ == "__main__":
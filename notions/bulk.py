@@ -0,0 +1,312 @@
+"""Helpers for running many requests concurrently
+
+Concurrency is bounded here, the client's rate limiter still decides how fast requests
+actually go out.
+"""
+
+import asyncio
+import collections
+import contextlib
+import dataclasses
+import heapq
+import logging
+import typing
+
+LOG = logging.getLogger(__name__)
+
+K = typing.TypeVar("K")
+T = typing.TypeVar("T")
+
+DEFAULT_CONCURRENCY = 8
+
+
+@dataclasses.dataclass
+class BulkResult(typing.Generic[K, T]):
+    """Outcome of one item of a bulk operation
+
+    Exactly one of result or error is set. index is the position of the item in the
+    input.
+    """
+
+    index: int
+    item: K
+    result: typing.Optional[T] = None
+    error: typing.Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@contextlib.asynccontextmanager
+async def aclosing(agen: typing.Any):
+    """Make sure an async generator is closed (like contextlib.aclosing in 3.10+)
+
+    Closing promptly matters when the generator runs background tasks.
+    """
+    try:
+        yield agen
+    finally:
+        await agen.aclose()
+
+
+async def aiter_items(
+    items: typing.Union[typing.Iterable[K], typing.AsyncIterable[K]],
+) -> typing.AsyncIterator[K]:
+    """Iterate over a sync or async iterable"""
+    if isinstance(items, typing.AsyncIterable):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def bounded_map(
+    func: typing.Callable[[K], typing.Awaitable[T]],
+    items: typing.Union[typing.Iterable[K], typing.AsyncIterable[K]],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    ordered: bool = True,
+) -> typing.AsyncIterator[BulkResult[K, T]]:
+    """Call func on each item, with at most `concurrency` calls in flight
+
+    Yields a BulkResult per item, in input order if `ordered`, otherwise as they
+    complete. Errors are captured in the result rather than stopping the run.
+
+    Items are pulled from the input lazily, so large (or endless) inputs are fine.
+    In ordered mode completed results wait for the ones before them, which counts
+    towards the concurrency limit.
+
+    If the input itself raises, no more items are taken but the calls already started
+    are left to finish and their results yielded, then the error is raised. Calls are
+    only cancelled if the caller stops iterating early.
+    """
+    if concurrency < 1:
+        raise ValueError(f"Concurrency must be at least 1: {concurrency=}")
+
+    async def call(index: int, item: K) -> BulkResult[K, T]:
+        try:
+            return BulkResult(index=index, item=item, result=await func(item))
+        except Exception as e:
+            LOG.debug(f"Error processing {item=}: {e!r}")
+            return BulkResult(index=index, item=item, error=e)
+
+    iterator = aiter_items(items).__aiter__()
+    in_flight: typing.Deque[asyncio.Future] = collections.deque()
+    exhausted = False
+    input_error: typing.Optional[Exception] = None
+    index = 0
+    try:
+        while True:
+            while not exhausted and len(in_flight) < concurrency:
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                except Exception as e:
+                    LOG.debug(f"Error reading item {index}: {e!r}")
+                    input_error = e
+                    exhausted = True
+                    break
+                in_flight.append(asyncio.ensure_future(call(index, item)))
+                index += 1
+            if not in_flight:
+                if input_error is not None:
+                    raise input_error
+                return
+            if ordered:
+                yield await in_flight.popleft()
+            else:
+                done, _ = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    in_flight.remove(task)
+                    yield task.result()
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+
+async def read_ahead(
+    iterable: typing.AsyncIterable[T], size: int = 1
+) -> typing.AsyncIterator[T]:
+    """Consume an async iterable in a background task, running up to `size` items ahead
+
+    Lets the source get on with producing the next item (e.g. fetching the next page)
+    while the caller is still working on the current one. At most `size` items are
+    produced (or being produced) beyond what the caller has taken, which gives
+    backpressure so the source doesn't run too far ahead.
+
+    The source is closed if the caller stops iterating early.
+    """
+    if size < 1:
+        raise ValueError(f"Read ahead size must be at least 1: {size=}")
+    queue: asyncio.Queue = asyncio.Queue()
+    slots = asyncio.Semaphore(size)
+    done = object()
+
+    async def produce():
+        iterator = iterable.__aiter__()
+        try:
+            while True:
+                await slots.acquire()
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    break
+                queue.put_nowait((item, None))
+        except Exception as e:
+            queue.put_nowait((done, e))
+        else:
+            queue.put_nowait((done, None))
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            slots.release()
+            # Let the producer start on the next item now. Otherwise it only gets to
+            # run when the caller next awaits, which may not be until it's finished
+            # with this item if its work is synchronous (e.g. parsing).
+            await asyncio.sleep(0)
+            yield item
+    finally:
+        producer.cancel()
+        try:
+            await producer
+        except asyncio.CancelledError:
+            pass
+        await _aclose(iterable)
+
+
+async def _aclose(iterable: typing.Any):
+    """Close an async generator (or anything else with aclose)"""
+    aclose = getattr(iterable, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+class SingleFlight(typing.Generic[T]):
+    """Shares one call between concurrent callers asking for the same key
+
+    The first caller for a key starts the call, callers arriving while it's in flight
+    wait for the same result (or error). The call runs in its own task, so cancelling
+    a caller doesn't cancel it for the others. Once it finishes the key is forgotten,
+    so later callers start a new call.
+    """
+
+    def __init__(self):
+        self._calls: typing.Dict[typing.Hashable, asyncio.Future] = {}
+        # Callers which joined a call already in flight
+        self.shared = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(
+        self,
+        key: typing.Hashable,
+        func: typing.Callable[[], typing.Awaitable[T]],
+    ) -> T:
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.shared += 1
+        return await asyncio.shield(future)
+
+    def _forget(self, key: typing.Hashable, future: asyncio.Future):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        if not future.cancelled():
+            # Mark the error as retrieved, in case every caller was cancelled
+            future.exception()
+
+
+async def merge(
+    iterables: typing.Sequence[typing.AsyncIterable[T]],
+) -> typing.AsyncIterator[T]:
+    """Iterate over several async iterables at once, yielding items as they arrive
+
+    Each source is consumed in its own task, one item ahead of the caller. The
+    sources are closed if the caller stops early, and an error in one stops the rest.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def consume(iterable: typing.AsyncIterable[T]):
+        try:
+            async for item in iterable:
+                taken = asyncio.Event()
+                queue.put_nowait((item, None, taken))
+                await taken.wait()
+        except Exception as e:
+            queue.put_nowait((done, e, None))
+        else:
+            queue.put_nowait((done, None, None))
+
+    tasks = [asyncio.ensure_future(consume(iterable)) for iterable in iterables]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            item, error, taken = await queue.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                remaining -= 1
+                continue
+            taken.set()
+            yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Leaving an async for doesn't close what it iterates over, so close the
+        # sources here now that nothing is iterating over them
+        for iterable in iterables:
+            await _aclose(iterable)
+
+
+async def merge_sorted(
+    iterables: typing.Sequence[typing.AsyncIterable[T]],
+    key: typing.Callable[[T], typing.Any],
+) -> typing.AsyncIterator[T]:
+    """K-way merge of async iterables which are each sorted by key
+
+    Like `heapq.merge`. Ties keep the order of the iterables. The sources are closed
+    if the caller stops early.
+    """
+    iterators = [iterable.__aiter__() for iterable in iterables]
+    heap: typing.List[typing.Tuple[typing.Any, int, T]] = []
+
+    async def push(index: int):
+        try:
+            item = await iterators[index].__anext__()
+        except StopAsyncIteration:
+            return
+        heapq.heappush(heap, (key(item), index, item))
+
+    try:
+        # Start every source off at once, so their first requests overlap. Wait for
+        # all of them even if one fails, so none is still running when it's closed.
+        started = await asyncio.gather(
+            *[push(index) for index in range(len(iterators))], return_exceptions=True
+        )
+        for error in started:
+            if isinstance(error, BaseException):
+                raise error
+        while heap:
+            _, index, item = heapq.heappop(heap)
+            yield item
+            await push(index)
+    finally:
+        for iterable in iterables:
+            await _aclose(iterable)
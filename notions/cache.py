@@ -0,0 +1,156 @@
+"""In-process caching of pages and databases
+
+A read-through cache for `NotionAsyncClient.get_page` and `get_database`, so hot
+schemas and pages don't need a round trip each time. Entries expire after a TTL set
+per object type, and the least recently used ones are evicted once there are more
+than `max_entries` of them or they add up to more than `max_bytes`.
+
+Sizes are the length of the response body each object was parsed from (or of its
+JSON, when no size is given), so `max_bytes` is a rough bound: the parsed models take
+a few times more memory than that.
+
+Cached objects are shared between callers, so treat them as read only.
+"""
+
+import collections
+import dataclasses
+import time
+import typing
+
+from . import codec
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Seconds to keep each type of object for. Schemas change less often than pages.
+DEFAULT_TTLS = {"page": 60.0, "database": 300.0}
+
+Key = typing.Tuple[str, str]
+
+
+class Cache(typing.Protocol):
+    """What NotionAsyncClient needs from a cache, see ObjectCache and DiskCache"""
+
+    def get(self, object_type: str, object_id: typing.Any) -> typing.Any: ...
+
+    def put(
+        self,
+        object_type: str,
+        object_id: typing.Any,
+        value: typing.Any,
+        size: typing.Optional[int] = None,
+    ): ...
+
+    def invalidate(self, object_type: str, object_id: typing.Any): ...
+
+
+@dataclasses.dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    # Entries dropped to stay within max_entries or max_bytes
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+
+class _Entry(typing.NamedTuple):
+    value: typing.Any
+    size: int
+    expires_at: float
+
+
+def json_size(value: typing.Any) -> int:
+    """Estimated size of a model, as the length of its JSON
+
+    Only used when `put` isn't given a size, as it serialises the whole model.
+    """
+    return len(codec.dumps_model(value))
+
+
+class ObjectCache:
+    """LRU cache of Notion objects by type and id, with a TTL per type
+
+    Object types without a TTL (or a TTL of 0) aren't cached. `clock` can be
+    swapped out for testing.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttls: typing.Optional[typing.Dict[str, float]] = None,
+        size_of: typing.Callable[[typing.Any], int] = json_size,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.size_of = size_of
+        self.clock = clock
+        self.stats = CacheStats()
+        self.size = 0
+        self._entries: "collections.OrderedDict[Key, _Entry]" = (
+            collections.OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(object_type: str, object_id: typing.Any) -> Key:
+        return (object_type, str(object_id))
+
+    def get(self, object_type: str, object_id: typing.Any) -> typing.Any:
+        """The cached object, or None if it isn't cached or has expired"""
+        key = self._key(object_type, object_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        if entry.expires_at <= self.clock():
+            self._remove(key)
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return entry.value
+
+    def put(
+        self,
+        object_type: str,
+        object_id: typing.Any,
+        value: typing.Any,
+        size: typing.Optional[int] = None,
+    ):
+        """Cache value, `size` bytes of it or `size_of(value)` if not given"""
+        ttl = self.ttls.get(object_type, 0.0)
+        key = self._key(object_type, object_id)
+        self._remove(key)
+        if ttl <= 0:
+            return
+        if size is None:
+            size = self.size_of(value)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = _Entry(value, size, self.clock() + ttl)
+        self.size += size
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    def invalidate(self, object_type: str, object_id: typing.Any):
+        if self._remove(self._key(object_type, object_id)):
+            self.stats.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def _remove(self, key: Key) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self.size -= entry.size
+        return True
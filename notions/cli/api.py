@@ -7,7 +7,7 @@ import typer
 from notions.client import NotionAsyncClient
 
 from .config import OutputFormats
-from .run import run
+from .run import RAW_OUTPUT_FORMATS, run
 
 app = typer.Typer()
 
@@ -29,13 +29,19 @@ async def run_api(
     output_format: OutputFormats,
 ):
     url = client.get_url_for_path(path)
-    if paginated:
-        await run(
-            paginated_request(client, method, url),
-            output=output,
-            output_format=output_format,
-        )
-    else:
-        async with client.async_client() as async_client:
-            response = await async_client.request(method, url.tostr())
+    async with client:
+        if paginated:
+            await run(
+                (
+                    client.stream_paginated_results(
+                        method, url, pagination_in_json=False
+                    )
+                    if output_format in RAW_OUTPUT_FORMATS
+                    else paginated_request(client, method, url)
+                ),
+                output=output,
+                output_format=output_format,
+            )
+        else:
+            response = await client.http_request(method, url)
             output.write(response.content.decode("UTF-8"))
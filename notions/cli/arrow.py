@@ -0,0 +1,145 @@
+"""Columnar output in Parquet or Arrow IPC format
+
+Needs pyarrow (`pip install notions[arrow]`).
+
+Columns follow the same ColumnPlan as CSV output, but keep their types: checkboxes are
+bools, numbers are floats, times and dates are UTC timestamps and multi-value
+properties (people, multi-selects, files, relations) are lists of strings. Everything
+else is a string formatted as in CSV output.
+
+Pages are gathered into record batches of `batch_size` rows as they arrive, each
+batch is written out as a Parquet row group (or Arrow record batch).
+"""
+
+import datetime
+import typing
+
+from notions.columns import CORE_HEADERS, Column, ColumnPlan, format_cell
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    HAS_PYARROW = True
+except ImportError:  # pragma: no cover - depends on the environment
+    HAS_PYARROW = False
+
+DEFAULT_BATCH_SIZE = 10_000
+
+Converter = typing.Callable[[typing.Any], typing.Any]
+
+
+def _to_float(value: typing.Any) -> typing.Optional[float]:
+    return None if value is None else float(value)
+
+
+def _to_timestamp(value: typing.Any) -> typing.Optional[datetime.datetime]:
+    if value is None:
+        return None
+    if not isinstance(value, datetime.datetime):
+        # Dates without a time become midnight UTC
+        value = datetime.datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
+def _to_strings(value: typing.Any) -> typing.Optional[typing.List[str]]:
+    if value is None:
+        return None
+    return [format_cell(item) for item in value]
+
+
+def _to_string(value: typing.Any) -> typing.Optional[str]:
+    return None if value is None else format_cell(value)
+
+
+def _column_type(column: Column) -> typing.Tuple[typing.Any, Converter]:
+    """Arrow type for a property column, and how to convert values to it"""
+    kind = column.kind
+    if kind == "bool":
+        return pyarrow.bool_(), lambda value: value
+    if kind == "number":
+        return pyarrow.float64(), _to_float
+    if kind == "timestamp":
+        return pyarrow.timestamp("us", tz="UTC"), _to_timestamp
+    if kind == "list":
+        return pyarrow.list_(pyarrow.string()), _to_strings
+    return pyarrow.string(), _to_string
+
+
+def make_schema(
+    column_plan: ColumnPlan,
+) -> typing.Tuple[typing.Any, typing.List[Converter]]:
+    """Arrow schema for the plan's columns, with a converter per column"""
+    if not HAS_PYARROW:
+        raise RuntimeError("pyarrow is needed for Parquet and Arrow output")
+    timestamp = pyarrow.timestamp("us", tz="UTC")
+    fields = [
+        pyarrow.field("type", pyarrow.string()),
+        pyarrow.field("id", pyarrow.string()),
+        pyarrow.field("title", pyarrow.string()),
+        pyarrow.field("created_time", timestamp),
+        pyarrow.field("last_edited_time", timestamp),
+    ]
+    converters: typing.List[Converter] = [
+        _to_string,
+        _to_string,
+        _to_string,
+        _to_timestamp,
+        _to_timestamp,
+    ]
+    assert len(fields) == len(CORE_HEADERS)
+    for column in column_plan.columns:
+        arrow_type, converter = _column_type(column)
+        fields.append(pyarrow.field(column.header, arrow_type))
+        converters.append(converter)
+    return pyarrow.schema(fields), converters
+
+
+async def columnar_format_iterable(
+    iterable: typing.AsyncIterable,
+    output: typing.Any,
+    format: str,
+    column_plan: ColumnPlan,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+):
+    """Write pages as Parquet (format="parquet") or an Arrow IPC file ("arrow")
+
+    `output` is a binary file, or a text file with a binary `buffer` (like stdout).
+    """
+    schema, converters = make_schema(column_plan)
+    if hasattr(output, "buffer"):
+        output.flush()
+        output = output.buffer
+    if format == "parquet":
+        writer = pyarrow.parquet.ParquetWriter(output, schema)
+    elif format == "arrow":
+        writer = pyarrow.ipc.new_file(output, schema)
+    else:
+        raise ValueError(f"Unknown columnar format: {format=}")
+
+    columns: typing.List[typing.List[typing.Any]] = [[] for _ in converters]
+
+    def write_batch():
+        arrays = [
+            pyarrow.array(values, type=field.type)
+            for values, field in zip(columns, schema)
+        ]
+        writer.write_batch(pyarrow.record_batch(arrays, schema=schema))
+        for values in columns:
+            values.clear()
+
+    try:
+        async for item in iterable:
+            for values, convert, value in zip(
+                columns, converters, column_plan.values(item)
+            ):
+                values.append(convert(value))
+            if len(columns[0]) >= batch_size:
+                write_batch()
+        if columns[0]:
+            write_batch()
+    finally:
+        writer.close()
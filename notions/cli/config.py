@@ -1,19 +1,46 @@
 import dataclasses
 import enum
+import pathlib
 import sys
 import typing
 
+from notions.client import NotionAsyncClient
+from notions.diskcache import DiskCache
+
 
 class OutputFormats(enum.Enum):
     text = "text"
     notion_json = "notion_json"
     notion_jsonl = "notion_jsonl"
     notion_yaml = "notion_yaml"
+    notion_yaml_stream = "notion_yaml_stream"
     yaml = "yaml"
+    yaml_stream = "yaml_stream"
     json = "json"
     jsonl = "jsonl"
     csv = "csv"
     tsv = "tsv"
+    parquet = "parquet"
+    arrow = "arrow"
+    sqlite = "sqlite"
+
+
+# Formats laid out according to a database's schema, see notions.columns
+TABULAR_OUTPUT_FORMATS = frozenset(
+    {
+        OutputFormats.csv,
+        OutputFormats.tsv,
+        OutputFormats.parquet,
+        OutputFormats.arrow,
+        OutputFormats.sqlite,
+    }
+)
+
+
+class InputFormats(enum.Enum):
+    jsonl = "jsonl"
+    csv = "csv"
+    tsv = "tsv"
 
 
 @dataclasses.dataclass
@@ -24,6 +51,14 @@ class Config:
     output: typing.TextIO = sys.stdout
     notion_api_key: str = "no-key-set"
     output_format: OutputFormats = OutputFormats.text
+    # SQLite file to cache pages and databases in, see notions.diskcache
+    cache_file: typing.Optional[pathlib.Path] = None
 
 
 CONFIG = Config()
+
+
+def make_client() -> NotionAsyncClient:
+    """A client for commands, with the disk cache if one was given"""
+    cache = DiskCache(str(CONFIG.cache_file)) if CONFIG.cache_file is not None else None
+    return NotionAsyncClient(CONFIG.notion_api_key, cache=cache)
@@ -1,4 +1,6 @@
 import asyncio
+import json
+import pathlib
 import sys
 import typing
 import uuid
@@ -6,12 +8,17 @@ import uuid
 import typer
 
 from notions.client import NotionAsyncClient
+from notions.columns import ColumnPlan
+from notions.diskcache import ensure_fresh_cache
 from notions.models.query_database import Direction, QueryDatabase, QueryDatabaseSort
 from notions.models.search import Search, SearchFilter
+from notions.offline import query_pages
+from notions.sharding import query_database_sharded
+from notions.sqlite import PageStore
 
 from . import yaml
-from .config import CONFIG, OutputFormats
-from .run import run
+from .config import CONFIG, TABULAR_OUTPUT_FORMATS, OutputFormats, make_client
+from .run import RAW_OUTPUT_FORMATS, run
 
 app = typer.Typer()
 
@@ -19,13 +26,17 @@ app = typer.Typer()
 async def run_list_databases(
     client: NotionAsyncClient, output: typing.TextIO, output_format: OutputFormats
 ):
-    await run(
-        client.search(
-            search=Search(filter=SearchFilter(value="database", property="object"))
-        ),
-        output=output,
-        output_format=output_format,
-    )
+    search = Search(filter=SearchFilter(value="database", property="object"))
+    async with client:
+        await run(
+            (
+                client.search_raw(search)
+                if output_format in RAW_OUTPUT_FORMATS
+                else client.search(search)
+            ),
+            output=output,
+            output_format=output_format,
+        )
 
 
 @app.command("list")
@@ -39,13 +50,9 @@ def list_databases():
     )
 
 
-async def run_query_databases(
-    client: NotionAsyncClient,
-    database_id: uuid.UUID,
-    output: typing.TextIO,
-    output_format: OutputFormats,
-    sorts: typing.List[typing.List[str]],
-):
+def make_query(
+    sorts: typing.List[typing.List[str]], filter: typing.Optional[dict] = None
+) -> QueryDatabase:
     query_sorts = []
     for sort in sorts:
         if len(sort) == 1:
@@ -57,13 +64,73 @@ async def run_query_databases(
             query_sorts.append(QueryDatabaseSort(property=sort[0], direction=direction))
         else:
             raise ValueError(f"Invalid sort: {sort=}")
-    query = QueryDatabase(sorts=query_sorts)
-    await run(
-        client.query_database(database_id, query),
-        output=output,
-        output_format=output_format,
-        guess_headers=True,
-    )
+    if filter is None:
+        return QueryDatabase(sorts=query_sorts)
+    return QueryDatabase(sorts=query_sorts, filter=filter)
+
+
+async def run_query_databases(
+    client: NotionAsyncClient,
+    database_id: uuid.UUID,
+    output: typing.TextIO,
+    output_format: OutputFormats,
+    sorts: typing.List[typing.List[str]],
+    filter: typing.Optional[dict] = None,
+    shards: int = 1,
+    limit: typing.Optional[int] = None,
+):
+    query = make_query(sorts, filter)
+    async with client:
+        column_plan = None
+        if output_format in TABULAR_OUTPUT_FORMATS:
+            await ensure_fresh_cache(client)
+            # Take the columns from the schema rather than guessing from the first page
+            database = await client.get_database(database_id)
+            column_plan = ColumnPlan.from_database(database)
+        if shards > 1:
+            pages: typing.AsyncIterable = query_database_sharded(
+                client, database_id, query, shards=shards, limit=limit
+            )
+        elif output_format in RAW_OUTPUT_FORMATS:
+            pages = client.query_database_raw(database_id, query, limit=limit)
+        else:
+            pages = client.query_database(database_id, query, limit=limit)
+        await run(
+            pages,
+            output=output,
+            output_format=output_format,
+            guess_headers=True,
+            column_plan=column_plan,
+        )
+
+
+async def run_query_databases_offline(
+    store_path: pathlib.Path,
+    database_id: uuid.UUID,
+    output: typing.TextIO,
+    output_format: OutputFormats,
+    sorts: typing.List[typing.List[str]],
+    filter: typing.Optional[dict] = None,
+    limit: typing.Optional[int] = None,
+):
+    """Like `run_query_databases`, but against a local copy from `notions mirror sync`"""
+    query = make_query(sorts, filter)
+    store = PageStore.load(str(store_path))
+    try:
+        database = store.column_plan.database
+        if database is not None and database.id != database_id:
+            raise ValueError(f"{store_path=} holds {database.id=}, not {database_id=}")
+        await run(
+            query_pages(
+                store, query, raw=output_format in RAW_OUTPUT_FORMATS, limit=limit
+            ),
+            output=output,
+            output_format=output_format,
+            guess_headers=True,
+            column_plan=store.column_plan,
+        )
+    finally:
+        store.close()
 
 
 @app.command("query")
@@ -79,15 +146,63 @@ def query_database(
             "Can be specified multiple times. "
         ),
     ),
+    filter: typing.Optional[str] = typer.Option(
+        None,
+        help=(
+            "Filter as JSON, in the format of the Notion API "
+            "(https://developers.notion.com/reference/post-database-query-filter)."
+        ),
+    ),
+    offline: bool = typer.Option(
+        False,
+        help=(
+            "Query the local copy of the database in --store "
+            "(see `notions mirror sync`) instead of the API."
+        ),
+    ),
+    store: typing.Optional[pathlib.Path] = typer.Option(
+        None, help="SQLite file holding the local copy, for --offline."
+    ),
+    shards: int = typer.Option(
+        1,
+        min=1,
+        help=(
+            "Split the query into this many shards by created time and run them "
+            "in parallel. Speeds up exporting large databases."
+        ),
+    ),
+    limit: typing.Optional[int] = typer.Option(
+        None, min=0, help="Stop after this many pages."
+    ),
 ):
     """Query a database for pages"""
-    client = NotionAsyncClient(CONFIG.notion_api_key)
+    sorts = [p.split(":", 1) for p in sort_properties]
+    query_filter = json.loads(filter) if filter is not None else None
+    if offline:
+        if store is None:
+            raise typer.BadParameter("--offline needs --store", param_hint="--store")
+        asyncio.run(
+            run_query_databases_offline(
+                store,
+                database_id,
+                output=CONFIG.output,
+                output_format=CONFIG.output_format,
+                sorts=sorts,
+                filter=query_filter,
+                limit=limit,
+            )
+        )
+        return
+    client = make_client()
     asyncio.run(
         run_query_databases(
             client,
             database_id,
             output=CONFIG.output,
             output_format=CONFIG.output_format,
-            sorts=[p.split(":", 1) for p in sort_properties],
+            sorts=sorts,
+            filter=query_filter,
+            shards=shards,
+            limit=limit,
         )
     )
@@ -1,5 +1,6 @@
 import asyncio
 import logging
+import pathlib
 import typing
 
 import coloredlogs
@@ -7,7 +8,7 @@ import typer
 
 from notions.client import NotionAsyncClient
 
-from . import database, page
+from . import database, mirror, page
 from .api import run_api
 from .config import CONFIG, OutputFormats
 from .search import run_search
@@ -15,6 +16,7 @@ from .search import run_search
 app = typer.Typer()
 app.add_typer(database.app, name="database")
 app.add_typer(page.app, name="page")
+app.add_typer(mirror.app, name="mirror")
 
 LOG = logging.getLogger(__name__)
 
@@ -49,7 +51,10 @@ def search(
     query: typing.Optional[str] = typer.Option(
         None,
         help="When supplied, limits which pages are returned by comparing the query to the page title.",
-    )
+    ),
+    limit: typing.Optional[int] = typer.Option(
+        None, min=0, help="Stop after this many results."
+    ),
 ):
     """Search for pages and databases"""
     client = NotionAsyncClient(CONFIG.notion_api_key)
@@ -59,6 +64,7 @@ def search(
             query,
             output=CONFIG.output,
             output_format=CONFIG.output_format,
+            limit=limit,
         )
     )
 
@@ -79,6 +85,14 @@ def main(
     output: typer.FileTextWrite = typer.Option(
         "-", help="File to write to, defaults to stdout (-)."
     ),
+    cache_file: typing.Optional[pathlib.Path] = typer.Option(
+        None,
+        envvar="NOTIONS_CACHE_FILE",
+        help=(
+            "SQLite file to cache pages and databases in between runs. "
+            "Cached copies are checked against recent edits before use."
+        ),
+    ),
 ):
     """Notions: a Notion API CLI client"""
     level = "DEBUG" if debug else ("INFO" if verbose else "WARNING")
@@ -86,6 +100,7 @@ def main(
     CONFIG.notion_api_key = notion_api_key
     CONFIG.output_format = output_format
     CONFIG.output = output
+    CONFIG.cache_file = cache_file
 
     LOG.debug(f"{CONFIG=}")
 
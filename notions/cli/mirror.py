@@ -0,0 +1,43 @@
+import asyncio
+import pathlib
+import uuid
+
+import typer
+
+from notions.client import NotionAsyncClient
+from notions.mirror import SyncResult, sync_database
+
+from .config import CONFIG
+
+app = typer.Typer()
+
+
+async def run_sync(
+    client: NotionAsyncClient, database_id: uuid.UUID, store: pathlib.Path, full: bool
+) -> SyncResult:
+    async with client:
+        return await sync_database(client, database_id, str(store), full=full)
+
+
+@app.command("sync")
+def sync(
+    database_id: uuid.UUID,
+    store: pathlib.Path = typer.Option(
+        ..., help="SQLite file to keep the copy of the database in."
+    ),
+    full: bool = typer.Option(
+        False,
+        help=(
+            "Fetch every page rather than only those edited since the last sync, "
+            "and remove pages which have been deleted."
+        ),
+    ),
+):
+    """Update a local SQLite copy of a database with pages edited since the last sync"""
+    client = NotionAsyncClient(CONFIG.notion_api_key)
+    result = asyncio.run(run_sync(client, database_id, store, full))
+    typer.echo(
+        f"{'Full' if result.full else 'Incremental'} sync: {result.seen} pages fetched, "
+        f"{result.upserted} updated, {result.deleted} deleted",
+        err=True,
+    )
@@ -1,17 +1,31 @@
 import asyncio
+import csv
+import decimal
+import logging
 import sys
 import typing
 import uuid
 
 import typer
 
+from notions import codec
+from notions.bulk import DEFAULT_CONCURRENCY, aclosing, bounded_map
 from notions.client import NotionAsyncClient
+from notions.diskcache import ensure_fresh_cache
+from notions.models import properties
+from notions.models.color import Color
+from notions.models.database import Database
+from notions.models.page import CreatePage, CreatePageDatabaseParent, Page
+from notions.models.properties.select import CreatePageSelectOption
+from notions.models.rich_text import RichTextText, Text
 
-from .config import CONFIG, OutputFormats
-from .run import run, run_single_item
+from .config import CONFIG, InputFormats, OutputFormats, make_client
+from .run import check_schema_output_format, run, run_single_item
 
 app = typer.Typer()
 
+LOG = logging.getLogger(__name__)
+
 
 async def run_get_page(
     client: NotionAsyncClient,
@@ -19,12 +33,15 @@ async def run_get_page(
     output_format: OutputFormats,
     page_id: uuid.UUID,
 ):
-    await run_single_item(
-        client.get_page(page_id=page_id),
-        output=output,
-        output_format=output_format,
-        guess_headers=True,
-    )
+    check_schema_output_format(output_format)
+    async with client:
+        await ensure_fresh_cache(client)
+        await run_single_item(
+            client.get_page(page_id=page_id),
+            output=output,
+            output_format=output_format,
+            guess_headers=True,
+        )
 
 
 @app.command("get")
@@ -32,7 +49,7 @@ def get_page(
     page_id: uuid.UUID = typer.Argument(..., help="The ID of the page to get"),
 ):
     """Get a single page"""
-    client = NotionAsyncClient(CONFIG.notion_api_key)
+    client = make_client()
     asyncio.run(
         run_get_page(
             client,
@@ -41,3 +58,169 @@ def get_page(
             page_id=page_id,
         )
     )
+
+
+def create_page_from_json(
+    line: str, database_id: typing.Optional[uuid.UUID]
+) -> CreatePage:
+    """Parse a CreatePage from a line of JSON
+
+    The parent and children can be left out if a database_id is given.
+    """
+    obj = codec.loads(line)
+    if database_id is not None:
+        obj.setdefault("parent", {"database_id": str(database_id)})
+    obj.setdefault("children", [])
+    return CreatePage.parse_obj(obj)
+
+
+def create_page_property_from_string(
+    database_property: properties.DatabaseProperty, value: str
+) -> properties.CreatePageProperty:
+    """Convert a string (e.g. from CSV) to a property to create, based on the database property type"""
+    if isinstance(database_property, properties.DatabaseTitleProperty):
+        return properties.CreatePageTitleProperty(
+            title=[RichTextText(plain_text=value, text=Text(content=value))]
+        )
+    if isinstance(database_property, properties.DatabaseNumberProperty):
+        return properties.CreatePageNumberProperty(number=decimal.Decimal(value))
+    if isinstance(database_property, properties.DatabaseURLProperty):
+        return properties.CreatePageURLProperty(url=value)
+    if isinstance(database_property, properties.DatabaseSelectProperty):
+        colors = {o.name: o.color for o in database_property.select.options}
+        return properties.CreatePageSelectProperty(
+            select=CreatePageSelectOption(
+                name=value, color=colors.get(value, Color.default)
+            )
+        )
+    raise NotImplementedError(
+        f"Creating {database_property.type} properties isn't supported yet"
+    )
+
+
+def create_page_from_row(database: Database, row: typing.Dict[str, str]) -> CreatePage:
+    """Create a page in the database from a CSV row keyed by property name
+
+    Empty values are left unset.
+    """
+    create_properties = {}
+    for name, value in row.items():
+        if value is None or value == "":
+            continue
+        if name not in database.properties:
+            raise ValueError(f"Unknown property {name!r} for database {database.id}")
+        create_properties[name] = create_page_property_from_string(
+            database.properties[name], value
+        )
+    return CreatePage(
+        parent=CreatePageDatabaseParent(database_id=database.id),
+        properties=create_properties,
+        children=[],
+    )
+
+
+def read_import_rows(
+    input: typing.TextIO, input_format: InputFormats
+) -> typing.Iterator[typing.Union[str, typing.Dict[str, str]]]:
+    """Rows to import, unparsed: lines of JSON or CSV rows keyed by property name"""
+    if input_format == InputFormats.jsonl:
+        for line in input:
+            if line.strip():
+                yield line
+    elif input_format in (InputFormats.csv, InputFormats.tsv):
+        yield from csv.DictReader(
+            input, dialect="excel-tab" if input_format == InputFormats.tsv else "excel"
+        )
+    else:
+        raise NotImplementedError(f"Unknown input format: {input_format=}")
+
+
+async def run_import_pages(
+    client: NotionAsyncClient,
+    input: typing.TextIO,
+    input_format: InputFormats,
+    database_id: typing.Optional[uuid.UUID],
+    concurrency: int,
+    output: typing.TextIO,
+    output_format: OutputFormats,
+) -> int:
+    """Create pages from the input, returns the number of failures
+
+    Rows are parsed as they're created, so a bad row is reported as a failure like
+    any other rather than stopping the import.
+    """
+    failures = 0
+
+    async with client:
+        database: typing.Optional[Database] = None
+        if input_format in (InputFormats.csv, InputFormats.tsv):
+            if database_id is None:
+                raise ValueError(
+                    f"A database id is needed to import {input_format.value}"
+                )
+            database = await client.get_database(database_id)
+
+        async def create(row: typing.Union[str, typing.Dict[str, str]]) -> Page:
+            if isinstance(row, str):
+                create_page = create_page_from_json(row, database_id)
+            else:
+                assert database is not None
+                create_page = create_page_from_row(database, row)
+            return await client.create_page(create_page)
+
+        async def created_pages():
+            nonlocal failures
+            async with aclosing(
+                bounded_map(
+                    create,
+                    read_import_rows(input, input_format),
+                    concurrency=concurrency,
+                )
+            ) as results:
+                async for result in results:
+                    if result.result is not None:
+                        yield result.result
+                    else:
+                        failures += 1
+                        LOG.error(
+                            f"Failed to create page from item {result.index}: {result.error}"
+                        )
+
+        await run(created_pages(), output=output, output_format=output_format)
+    return failures
+
+
+@app.command("import")
+def import_pages(
+    input: typer.FileText = typer.Option(
+        "-", help="File to read from, defaults to stdin (-)."
+    ),
+    input_format: InputFormats = typer.Option(
+        InputFormats.jsonl,
+        help=(
+            "jsonl: one CreatePage JSON object per line. "
+            "csv/tsv: a header row of property names, needs --database-id."
+        ),
+    ),
+    database_id: typing.Optional[uuid.UUID] = typer.Option(
+        None, help="Database to create the pages in."
+    ),
+    concurrency: int = typer.Option(
+        DEFAULT_CONCURRENCY, help="Maximum number of requests in flight."
+    ),
+):
+    """Create pages in bulk from JSONL or CSV"""
+    client = NotionAsyncClient(CONFIG.notion_api_key)
+    failures = asyncio.run(
+        run_import_pages(
+            client,
+            input=input,
+            input_format=input_format,
+            database_id=database_id,
+            concurrency=concurrency,
+            output=CONFIG.output,
+            output_format=CONFIG.output_format,
+        )
+    )
+    if failures:
+        raise typer.Exit(code=1)
@@ -6,18 +6,67 @@ import itertools
 import logging
 import typing
 
-from notions.flatten import flatten_item
+import pydantic
+import typer
+
+from notions import codec
+from notions.columns import CORE_HEADERS, ColumnPlan, format_cell
+from notions.flatten import Key, flatten_item
 from notions.models import properties
 from notions.models.database import Database
 from notions.models.page import Page
 from notions.models.properties import PageTitleProperty
+from notions.sqlite import PageStore
 
 from . import yaml
+from .arrow import columnar_format_iterable
 from .config import OutputFormats
 
 LOG = logging.getLogger(__name__)
 
 
+# Formats which can be written straight from the JSON Notion sent, see `to_notion_json`
+RAW_OUTPUT_FORMATS = frozenset({OutputFormats.notion_json, OutputFormats.notion_jsonl})
+
+# Formats which need a database's schema, so only `database query` can write them
+SCHEMA_OUTPUT_FORMATS = frozenset(
+    {OutputFormats.parquet, OutputFormats.arrow, OutputFormats.sqlite}
+)
+
+
+def check_schema_output_format(output_format: OutputFormats):
+    """Reject formats which need a schema, before any requests are made"""
+    if output_format in SCHEMA_OUTPUT_FORMATS:
+        raise typer.BadParameter(
+            f"{output_format.value} output is only supported by `database query`",
+            param_hint="'--output-format'",
+        )
+
+
+def to_json(model: pydantic.BaseModel) -> str:
+    return codec.dumps_model(model).decode("UTF-8")
+
+
+def to_notion_json(item: typing.Union[Page, Database, bytes]) -> str:
+    """Notion JSON for an item
+
+    Raw items (JSON bytes from the API, e.g. from `NotionAsyncClient.query_database_raw`)
+    are passed through as they are, without parsing.
+    """
+    if isinstance(item, bytes):
+        return item.decode("UTF-8")
+    return to_json(item)
+
+
+def to_notion_json_line(item: typing.Union[Page, Database, bytes]) -> str:
+    """Notion JSON for an item on a single line"""
+    text = to_notion_json(item)
+    if isinstance(item, bytes) and ("\n" in text or "\r" in text):
+        # Newlines can only be whitespace between tokens, they're escaped in strings
+        text = text.replace("\r", " ").replace("\n", " ")
+    return text
+
+
 def text_format_item(
     item: typing.Union[Page, Database],
     output: typing.TextIO,
@@ -37,10 +86,10 @@ async def text_format_iterable(
 
 
 def notion_json_format_item(
-    item: typing.Union[Page, Database],
+    item: typing.Union[Page, Database, bytes],
     output: typing.TextIO,
 ):
-    output.write(item.json())
+    output.write(to_notion_json(item))
     output.write("\n")
 
 
@@ -48,25 +97,24 @@ def json_format_item(
     item: typing.Union[Page, Database],
     output: typing.TextIO,
 ):
-    output.write(flatten_item(item).json())
+    output.write(to_json(flatten_item(item)))
     output.write("\n")
 
 
 async def json_format_iterable(
     iterable: typing.AsyncIterable,
     output: typing.TextIO,
-    formatter=lambda item: flatten_item(item).json(),
+    formatter=lambda item: to_json(flatten_item(item)),
 ):
-    items = []
+    """Write a JSON array, one element at a time as the items arrive"""
+    count = 0
+    output.write("[")
     async for item in iterable:
-        items.append(formatter(item))
-    output.write("[\n")
-    LOG.info(f"Writing {len(items)} items to {output.name}")
-    for item in items[0:-1]:
-        output.write(item)
-        output.write(",\n")
-    output.write(items[-1])
-    output.write("\n]")
+        output.write(",\n" if count else "\n")
+        output.write(formatter(item))
+        count += 1
+    output.write("\n]" if count else "]")
+    LOG.info(f"Wrote {count} items to {getattr(output, 'name', output)}")
 
 
 async def notion_json_format_iterable(
@@ -74,7 +122,7 @@ async def notion_json_format_iterable(
     output: typing.TextIO,
 ):
     # re-use the json formatter
-    await json_format_iterable(iterable, output, formatter=lambda item: item.json())
+    await json_format_iterable(iterable, output, formatter=to_notion_json)
 
 
 async def jsonl_format_iterable(
@@ -82,7 +130,7 @@ async def jsonl_format_iterable(
     output: typing.TextIO,
 ):
     async for item in iterable:
-        output.write(flatten_item(item).json())
+        output.write(to_json(flatten_item(item)))
         output.write("\n")
 
 
@@ -91,7 +139,7 @@ async def notion_jsonl_format_iterable(
     output: typing.TextIO,
 ):
     async for item in iterable:
-        output.write(item.json())
+        output.write(to_notion_json_line(item))
         output.write("\n")
 
 
@@ -129,6 +177,24 @@ async def yaml_format_iterable(
     yaml.dump(items, output)
 
 
+async def notion_yaml_stream_format_iterable(
+    iterable: typing.AsyncIterable,
+    output: typing.TextIO,
+):
+    with yaml.document_stream(output) as write:
+        async for item in iterable:
+            write(item.dict())
+
+
+async def yaml_stream_format_iterable(
+    iterable: typing.AsyncIterable,
+    output: typing.TextIO,
+):
+    with yaml.document_stream(output) as write:
+        async for item in iterable:
+            write(flatten_item(item).dict())
+
+
 def default_text_formatter(item: typing.Union[Database, Page]) -> str:
     title = "-No title-"
     item_type = "unknown"
@@ -153,27 +219,50 @@ async def csv_format_iterable(
     output: typing.TextIO,
     format: str,
     guess_headers: bool,
+    column_plan: typing.Optional[ColumnPlan] = None,
 ):
     writer = csv.writer(output, dialect="excel-tab" if format == "tsv" else "excel")
-    core_headers = ["type", "id", "title", "created_time", "last_edited_time"]
+    if column_plan is not None:
+        # Layout is known up front from the database schema
+        writer.writerow(column_plan.headers)
+        async for item in iterable:
+            writer.writerow(column_plan.row(item))
+        return
+    property_headers: typing.List[Key] = []
     first_row = True
     async for item in iterable:
-        item = flatten_item(item)
         if first_row:
-            if guess_headers:
-                # TODO: expand and flatten nested objects to property_nested_name
-                property_headers = list(item.properties)
-                headers = core_headers + property_headers
+            if guess_headers and isinstance(item, Page):
+                # Without a schema, lay out every page like the first one
+                column_plan = ColumnPlan.from_page(item)
+                headers = column_plan.headers
+            elif guess_headers:
+                property_headers = list(flatten_item(item).properties)
+                headers = CORE_HEADERS + list(property_headers)
             else:
-                headers = core_headers
+                headers = CORE_HEADERS
             writer.writerow(headers)
             first_row = False
-        row = [item.type, item.id, item.title, item.created_time, item.last_edited_time]
-        if guess_headers:
-            row += [str(item.properties[header].value) for header in property_headers]
+        if column_plan is not None and isinstance(item, Page):
+            writer.writerow(column_plan.row(item))
+        elif isinstance(item, Page):
+            # Items have different properties, so each gets its own expansion
+            writer.writerow(ColumnPlan.from_page(item).row(item))
         else:
-            row += [str(prop.value) for prop in item.properties.values()]
-        writer.writerow(row)
+            flat = flatten_item(item)
+            row = [
+                flat.type,
+                flat.id,
+                flat.title,
+                flat.created_time,
+                flat.last_edited_time,
+            ]
+            if guess_headers:
+                props = [flat.properties.get(header) for header in property_headers]
+            else:
+                props = list(flat.properties.values())
+            row += [format_cell(prop.value if prop else None) for prop in props]
+            writer.writerow(row)
 
 
 async def csv_format_item(
@@ -190,20 +279,49 @@ async def csv_format_item(
     )
 
 
+async def sqlite_format_iterable(
+    iterable: typing.AsyncIterable,
+    output: typing.TextIO,
+    column_plan: ColumnPlan,
+):
+    """Write pages to a table in a SQLite file, see notions.sqlite
+
+    SQLite can't write to a stream, so output must be a real file.
+    """
+    path = getattr(output, "name", "")
+    if not path or path.startswith("<"):
+        raise ValueError("SQLite output must be written to a file, use --output")
+    store = PageStore.open(path, column_plan)
+    try:
+        count = await store.write_pages(iterable)
+    finally:
+        store.close()
+    LOG.info(f"Wrote {count} pages to {path}")
+
+
 async def run(
     iterable: typing.AsyncIterable,
     output: typing.TextIO,
     output_format: OutputFormats,
     text_formatter: typing.Callable[[typing.Any], str] = default_text_formatter,
     guess_headers: bool = False,
+    column_plan: typing.Optional[ColumnPlan] = None,
 ):
-    """Helper for commands which handles formatting output"""
+    """Helper for commands which handles formatting output
+
+    `column_plan` sets the columns for tabular formats, otherwise they're worked out
+    from the first item (or with `guess_headers` its properties).
+    """
+    if column_plan is None:
+        check_schema_output_format(output_format)
     if output_format == OutputFormats.notion_json:
         await notion_json_format_iterable(iterable, output)
     elif output_format == OutputFormats.notion_jsonl:
         await notion_jsonl_format_iterable(iterable, output)
     elif output_format == OutputFormats.notion_yaml:
         await notion_yaml_format_iterable(iterable, output)
+    elif output_format == OutputFormats.notion_yaml_stream:
+        await notion_yaml_stream_format_iterable(iterable, output)
     elif output_format == OutputFormats.text:
         await text_format_iterable(iterable, output, text_formatter)
     elif output_format == OutputFormats.json:
@@ -212,10 +330,32 @@ async def run(
         await jsonl_format_iterable(iterable, output)
     elif output_format == OutputFormats.yaml:
         await yaml_format_iterable(iterable, output)
+    elif output_format == OutputFormats.yaml_stream:
+        await yaml_stream_format_iterable(iterable, output)
     elif output_format == OutputFormats.tsv:
-        await csv_format_iterable(iterable, output, "tsv", guess_headers=guess_headers)
+        await csv_format_iterable(
+            iterable,
+            output,
+            "tsv",
+            guess_headers=guess_headers,
+            column_plan=column_plan,
+        )
     elif output_format == OutputFormats.csv:
-        await csv_format_iterable(iterable, output, "csv", guess_headers=guess_headers)
+        await csv_format_iterable(
+            iterable,
+            output,
+            "csv",
+            guess_headers=guess_headers,
+            column_plan=column_plan,
+        )
+    elif output_format in (OutputFormats.parquet, OutputFormats.arrow):
+        assert column_plan is not None
+        await columnar_format_iterable(
+            iterable, output, output_format.value, column_plan=column_plan
+        )
+    elif output_format == OutputFormats.sqlite:
+        assert column_plan is not None
+        await sqlite_format_iterable(iterable, output, column_plan=column_plan)
     else:
         raise NotImplementedError(f"Unknown output format: {output_format=}")
 
@@ -232,7 +372,10 @@ async def run_single_item(
         notion_json_format_item(item, output)
     elif output_format == OutputFormats.notion_jsonl:
         notion_json_format_item(item, output)
-    elif output_format == OutputFormats.notion_yaml:
+    elif output_format in (
+        OutputFormats.notion_yaml,
+        OutputFormats.notion_yaml_stream,
+    ):
         notion_yaml_format_item(item, output)
     elif output_format == OutputFormats.text:
         text_format_item(item, output, text_formatter)
@@ -240,11 +383,12 @@ async def run_single_item(
         json_format_item(item, output)
     elif output_format == OutputFormats.jsonl:
         json_format_item(item, output)
-    elif output_format == OutputFormats.yaml:
+    elif output_format in (OutputFormats.yaml, OutputFormats.yaml_stream):
         yaml_format_item(item, output)
     elif output_format == OutputFormats.tsv:
         await csv_format_item(item, output, "tsv", guess_headers=guess_headers)
     elif output_format == OutputFormats.csv:
         await csv_format_item(item, output, "csv", guess_headers=guess_headers)
     else:
+        check_schema_output_format(output_format)
         raise NotImplementedError(f"Unknown output format: {output_format=}")
@@ -7,7 +7,7 @@ from notions.client import NotionAsyncClient
 from notions.models.search import Search
 
 from .config import OutputFormats
-from .run import run
+from .run import RAW_OUTPUT_FORMATS, run
 
 app = typer.Typer()
 
@@ -17,6 +17,16 @@ async def run_search(
     query: typing.Optional[str],
     output: typing.TextIO,
     output_format: OutputFormats,
+    limit: typing.Optional[int] = None,
 ):
     search_request = Search(query=query)
-    await run(client.search(search_request), output=output, output_format=output_format)
+    async with client:
+        await run(
+            (
+                client.search_raw(search_request, limit=limit)
+                if output_format in RAW_OUTPUT_FORMATS
+                else client.search(search_request, limit=limit)
+            ),
+            output=output,
+            output_format=output_format,
+        )
@@ -3,6 +3,7 @@
 Handle the various data types we defined in notions.
 """
 
+import contextlib
 import decimal
 import typing
 import uuid
@@ -12,9 +13,15 @@ import yaml
 from notions.models.color import Color
 from notions.models.number import NumberFormat
 
+try:
+    # libyaml's C emitter is a lot faster than the pure Python one
+    from yaml import CDumper as BaseDumper
+except ImportError:  # pragma: no cover - depends on how PyYAML was built
+    from yaml import Dumper as BaseDumper
+
 
 # From https://github.com/yaml/pyyaml/issues/103
-class NoAliasDumper(yaml.Dumper):
+class NoAliasDumper(BaseDumper):
     """Dumper with automatic aliases disabled"""
 
     def ignore_aliases(self, data):
@@ -57,3 +64,21 @@ NoAliasDumper.add_representer(decimal.Decimal, decimal_yaml_representer)
 def dump(obj: typing.Any, stream: typing.TextIO):
     """Dump to YAML"""
     yaml.dump(obj, stream, Dumper=NoAliasDumper)
+
+
+@contextlib.contextmanager
+def document_stream(
+    stream: typing.TextIO,
+) -> typing.Iterator[typing.Callable[[typing.Any], None]]:
+    """Dump to YAML as a stream of documents
+
+    Yields a function which writes each object passed to it as its own `---`
+    document straight away, so nothing needs to be held in memory.
+    """
+    dumper = NoAliasDumper(stream, explicit_start=True)
+    dumper.open()
+    try:
+        yield dumper.represent
+    finally:
+        dumper.close()
+        dumper.dispose()
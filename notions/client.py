@@ -1,5 +1,5 @@
+import asyncio
 import contextlib
-import json
 import logging
 import typing
 import uuid
@@ -7,16 +7,51 @@ import uuid
 import furl
 import httpx
 
+from . import codec
+from .bulk import (
+    DEFAULT_CONCURRENCY,
+    BulkResult,
+    SingleFlight,
+    aclosing,
+    bounded_map,
+    read_ahead,
+)
+from .cache import Cache
 from .models.database import CreateDatabase, Database
 from .models.page import CreatePage, Page, UpdatePage
 from .models.query_database import QueryDatabase
-from .models.response import NotionAPIResponse, PaginatedListResponse
+from .models.response import NotionAPIResponse, PaginatedListResponse, parse_result
 from .models.search import Search
+from .ratelimit import DEFAULT_REQUESTS_PER_SECOND, TokenBucket, parse_retry_after
+from .retry import (
+    DEFAULT_RETRY_POLICIES,
+    IDEMPOTENT_METHODS,
+    NO_RETRIES,
+    RETRYABLE_EXCEPTIONS,
+    UNSENT_EXCEPTIONS,
+    RetryBudget,
+    RetryPolicy,
+)
+from .streaming import ListResponseParser, StreamingParseError
 
 LOG = logging.getLogger(__name__)
 
+DEFAULT_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=10, max_keepalive_connections=10, keepalive_expiry=30.0
+)
+# Request bodies are pre-encoded JSON
+RequestBody = typing.Union[str, bytes]
+
+# Used when a HTTP 429 doesn't tell us how long to wait
+DEFAULT_RETRY_AFTER = 1.0
+MAX_PAGE_SIZE = 100
+
 
 class NotionAPIResponseError(Exception):
+    # Set on errors from paginated requests, the cursor of the page which failed
+    start_cursor: typing.Optional[str] = None
+
     def __init__(
         self,
         message: str,
@@ -38,17 +73,111 @@ class NotionAPIResponseError(Exception):
 
 
 class NotionAsyncClient:
-    """Async HTTP client for talking to Notion"""
+    """Async HTTP client for talking to Notion
+
+    Requests share a single pooled keep-alive session. Use as an async context manager
+    (`async with NotionAsyncClient(...) as client:`) or call `aclose()` when done to
+    release the connections.
+
+    With `validate=False` pages and databases in responses are built without pydantic
+    validation (see `notions.models.construct`), which is much faster for large
+    queries.
+
+    With `lazy_properties=True` the properties of pages and databases are only parsed
+    when they're first used, which saves a lot of work when only a few are needed.
+
+    Pass a `cache` (see `notions.cache` and `notions.diskcache`) to serve `get_page` and `get_database` from
+    memory. The client's own `update_page` and `create_database` calls keep it
+    up to date.
+
+    Concurrent `get_page` (or `get_database`) calls for the same id share a single
+    request and all get the same parsed object back, unless `coalesce_reads=False`.
+    """
 
     def __init__(
         self,
         api_token: str,
         base_url="https://api.notion.com/",
         notion_version="2022-02-22",
+        timeout: typing.Optional[httpx.Timeout] = None,
+        limits: typing.Optional[httpx.Limits] = None,
+        transport: typing.Optional[httpx.AsyncBaseTransport] = None,
+        requests_per_second: typing.Optional[float] = DEFAULT_REQUESTS_PER_SECOND,
+        rate_limiter: typing.Optional[TokenBucket] = None,
+        max_rate_limited_retries: int = 10,
+        retry_policies: typing.Optional[typing.Dict[str, RetryPolicy]] = None,
+        retry_budget: typing.Optional[RetryBudget] = None,
+        validate: bool = True,
+        lazy_properties: bool = False,
+        cache: typing.Optional[Cache] = None,
+        coalesce_reads: bool = True,
     ):
         self.api_token = api_token
         self.base_url = furl.furl(base_url)
         self.notion_version = notion_version
+        self.timeout = timeout if timeout is not None else DEFAULT_TIMEOUT
+        self.limits = limits if limits is not None else DEFAULT_LIMITS
+        self.transport = transport
+        # An explicit rate_limiter allows sharing one limit across several clients
+        if rate_limiter is None and requests_per_second is not None:
+            rate_limiter = TokenBucket(rate=requests_per_second)
+        self.rate_limiter = rate_limiter
+        self.max_rate_limited_retries = max_rate_limited_retries
+        # Per HTTP method, methods without a policy aren't retried
+        self.retry_policies = dict(DEFAULT_RETRY_POLICIES)
+        if retry_policies is not None:
+            self.retry_policies.update(
+                {method.upper(): policy for method, policy in retry_policies.items()}
+            )
+        self.retry_budget = retry_budget if retry_budget is not None else RetryBudget()
+        # Skip validating pages and databases in responses, see notions.models.construct
+        self.validate = validate
+        # Parse page and database properties when first used, see notions.models.lazy
+        self.lazy_properties = lazy_properties
+        self.cache = cache
+        # Concurrent get_page / get_database calls for the same id share one request
+        self.coalesce_reads = coalesce_reads
+        self._single_flight: SingleFlight = SingleFlight()
+        self._httpx_client: typing.Optional[httpx.AsyncClient] = None
+
+    async def __aenter__(self) -> "NotionAsyncClient":
+        self.get_httpx_client()
+        return self
+
+    async def __aexit__(self, *exc_info: typing.Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP session, if one is open"""
+        if self._httpx_client is not None:
+            httpx_client = self._httpx_client
+            self._httpx_client = None
+            await httpx_client.aclose()
+
+    def _make_httpx_client(
+        self, timeout: typing.Optional[httpx.Timeout] = None
+    ) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            headers={
+                "Authorization": f"Bearer {self.api_token}",
+                "Notion-Version": self.notion_version,
+                "Content-Type": "application/json",
+            },
+            timeout=timeout if timeout is not None else self.timeout,
+            limits=self.limits,
+            transport=self.transport,
+        )
+
+    def get_httpx_client(self) -> httpx.AsyncClient:
+        """Get the pooled httpx.AsyncClient shared by all requests
+
+        The session is created on first use and kept open (along with its keep-alive
+        connections) until `aclose()` is called or the `async with` block exits.
+        """
+        if self._httpx_client is None or self._httpx_client.is_closed:
+            LOG.debug(f"Creating pooled httpx client {self.timeout=} {self.limits=}")
+            self._httpx_client = self._make_httpx_client()
+        return self._httpx_client
 
     def get_url_for_path(self, *path_segments: str) -> furl.furl:
         """Append path segments to the base url"""
@@ -59,116 +188,531 @@ class NotionAsyncClient:
 
     @contextlib.asynccontextmanager
     async def async_client(self, timeout: typing.Optional[httpx.Timeout] = None):
-        """Context manager giving a httpx.AsyncClient set up for requests"""
+        """Context manager giving a httpx.AsyncClient set up for requests
+
+        Yields the pooled session, unless a custom timeout is given, in which case a
+        dedicated client is created and closed on exit.
+        """
         if timeout is None:
-            timeout = httpx.Timeout(30.0, connect=5.0)
-        LOG.debug(f"Using httpx timeout {timeout}")
-        async with httpx.AsyncClient(
-            headers={
-                "Authorization": f"Bearer {self.api_token}",
-                "Notion-Version": self.notion_version,
-                "Content-Type": "application/json",
-            },
-            timeout=timeout,
-        ) as httpx_client:
+            yield self.get_httpx_client()
+            return
+        LOG.debug(f"Using dedicated httpx client with timeout {timeout}")
+        async with self._make_httpx_client(timeout=timeout) as httpx_client:
             yield httpx_client
 
+    def get_retry_policy(self, method: str) -> RetryPolicy:
+        return self.retry_policies.get(method.upper(), NO_RETRIES)
+
+    def _can_retry(self, policy: RetryPolicy, attempt: int) -> bool:
+        if attempt >= policy.max_attempts:
+            return False
+        if self.retry_budget is not None and not self.retry_budget.withdraw():
+            LOG.warning("Retry budget exhausted, not retrying")
+            return False
+        return True
+
+    async def http_request(
+        self,
+        method: str,
+        url: furl.furl,
+        *args: typing.Any,
+        idempotent: typing.Optional[bool] = None,
+        stream: bool = False,
+        **kwargs: typing.Any,
+    ) -> httpx.Response:
+        """Perform a HTTP request using the pooled session, within the rate limit
+
+        HTTP 429 (rate limited) responses are transparently retried after waiting for
+        the time given in Retry-After, up to `max_rate_limited_retries` times.
+
+        Timeouts, connection errors and 5xx responses are retried according to the
+        method's retry policy, but only if the request is idempotent. This defaults to
+        True for GET and other idempotent methods, pass `idempotent=True` to retry
+        other requests (e.g. query POSTs).
+
+        With `stream=True` the body isn't read, the caller must read and close the
+        response.
+        """
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        policy = self.get_retry_policy(method)
+        if self.retry_budget is not None:
+            self.retry_budget.deposit()
+        client = self.get_httpx_client()
+        attempt = 1
+        rate_limited_retries = 0
+        while True:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+            try:
+                request = client.build_request(method, url.url, *args, **kwargs)
+                response = await client.send(request, stream=stream)
+            except RETRYABLE_EXCEPTIONS as e:
+                safe_to_retry = idempotent or isinstance(e, UNSENT_EXCEPTIONS)
+                if not (safe_to_retry and self._can_retry(policy, attempt)):
+                    raise
+                backoff = policy.get_backoff(attempt)
+                LOG.warning(
+                    f"Error making request {method} {url}, retrying in {backoff:.2f}s ({attempt=}): {e!r}"
+                )
+                attempt += 1
+                await asyncio.sleep(backoff)
+                continue
+
+            if (
+                response.status_code == 429
+                and rate_limited_retries < self.max_rate_limited_retries
+            ):
+                rate_limited_retries += 1
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if retry_after is None:
+                    retry_after = DEFAULT_RETRY_AFTER
+                LOG.info(
+                    f"Rate limited, retrying {method} {url} in {retry_after}s ({rate_limited_retries=})"
+                )
+                await response.aclose()
+                if self.rate_limiter is not None:
+                    self.rate_limiter.pause(retry_after)
+                else:
+                    await asyncio.sleep(retry_after)
+                continue
+
+            if (
+                response.status_code in policy.retry_statuses
+                and idempotent
+                and self._can_retry(policy, attempt)
+            ):
+                backoff = policy.get_backoff(attempt)
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if retry_after is not None:
+                    backoff = max(backoff, retry_after)
+                LOG.warning(
+                    f"HTTP {response.status_code} from {method} {url}, retrying in {backoff:.2f}s ({attempt=})"
+                )
+                attempt += 1
+                await response.aclose()
+                await asyncio.sleep(backoff)
+                continue
+
+            return response
+
+    def _parse_response(self, response: httpx.Response) -> NotionAPIResponse:
+        """Parse a response body, raising NotionAPIResponseError for any errors"""
+        try:
+            obj = codec.loads(response.content)
+            notion_response = NotionAPIResponse(
+                object=obj["object"], obj=obj, size=len(response.content)
+            )
+        except Exception as e:
+            raise NotionAPIResponseError(
+                f"Unable to parse response: {e}", response=response
+            ) from e
+
+        if response.status_code != 200:
+            raise NotionAPIResponseError(
+                f"Non HTTP 200 response: {response.status_code}",
+                response=response,
+                notion_api_response=notion_response,
+            )
+        return notion_response
+
     async def api_request(
         self,
         method: str,
         url: furl.furl,
         json: typing.Any = None,
         *args: typing.Any,
+        idempotent: typing.Optional[bool] = None,
         **kwargs: typing.Any,
     ) -> NotionAPIResponse:
-        """Perform a HTTP request"""
+        """Perform a HTTP request
+
+        See `http_request` for how `idempotent` affects retries.
+        """
         LOG.debug(f"request: {method=} {url=} {json=}")
-        async with self.async_client() as client:
-            try:
-                response = await client.request(
-                    method, url.url, json=json, *args, **kwargs
-                )
-            except Exception as e:
-                raise NotionAPIResponseError(f"Error making request: {e}") from e
-            try:
-                obj = response.json()
-                notion_response = NotionAPIResponse(object=obj["object"], obj=obj)
-            except Exception as e:
-                raise NotionAPIResponseError(
-                    f"Unable to parse response: {e}", response=response
-                ) from e
-
-            if response.status_code != 200:
-                raise NotionAPIResponseError(
-                    f"Non HTTP 200 response: {response.status_code}",
-                    response=response,
-                    notion_api_response=notion_response,
-                )
-            return notion_response
+        if json is not None:
+            kwargs["content"] = codec.dumps(json)
+        try:
+            response = await self.http_request(
+                method, url, idempotent=idempotent, *args, **kwargs
+            )
+        except Exception as e:
+            raise NotionAPIResponseError(f"Error making request: {e}") from e
+        return self._parse_response(response)
+
+    def _set_start_cursor(
+        self,
+        url: furl.furl,
+        pagination_in_json: bool,
+        data: typing.Optional[RequestBody],
+        start_cursor: str,
+    ) -> typing.Optional[RequestBody]:
+        """Set start_cursor on the request, returning the new request body"""
+        return self._set_pagination_param(
+            url, pagination_in_json, data, "start_cursor", start_cursor
+        )
+
+    def _set_pagination_param(
+        self,
+        url: furl.furl,
+        pagination_in_json: bool,
+        data: typing.Optional[RequestBody],
+        name: str,
+        value: typing.Any,
+    ) -> typing.Optional[RequestBody]:
+        """Set start_cursor or page_size on the request, returning the new request body"""
+        # These are set either in the json body or the query params, depending on the request
+        if pagination_in_json and data:
+            LOG.debug(f"Setting {name}={value!r} in JSON body")
+            # Since the data is already encoded, load, update and re-encode it
+            request_json = codec.loads(data)
+            request_json[name] = value
+            return codec.dumps(request_json)
+        LOG.debug(f"Setting {name}={value!r} in url params")
+        url.set({name: value})
+        return data
+
+    def _get_page_size(
+        self,
+        url: furl.furl,
+        pagination_in_json: bool,
+        data: typing.Optional[RequestBody],
+    ) -> int:
+        if pagination_in_json and data:
+            page_size = codec.loads(data).get("page_size")
+        else:
+            page_size = url.args.get("page_size")
+        return int(page_size) if page_size is not None else MAX_PAGE_SIZE
+
+    def _limit_page_size(
+        self,
+        url: furl.furl,
+        pagination_in_json: bool,
+        data: typing.Optional[RequestBody],
+        page_size: int,
+        remaining: int,
+    ) -> typing.Optional[RequestBody]:
+        """Shrink the request's page_size to the number of results still wanted"""
+        if remaining >= page_size:
+            return data
+        return self._set_pagination_param(
+            url, pagination_in_json, data, "page_size", remaining
+        )
 
     async def paginated_request(
         self,
         method: str,
         url: furl.furl,
         pagination_in_json: bool,
-        data: typing.Optional[str] = None,
+        data: typing.Optional[RequestBody] = None,
         *args: typing.Any,
+        start_cursor: typing.Optional[str] = None,
+        idempotent: bool = True,
+        prefetch: int = 1,
+        limit: typing.Optional[int] = None,
         **kwargs: typing.Any,
     ):
-        """Perform a httpx request, yielding pages"""
+        """Perform a httpx request, yielding pages
+
+        Listing is a read, so requests are retried on transient errors by default (even
+        for POSTs like queries). Each page is retried from its own cursor, so a failure
+        doesn't restart the walk. If the retries give up the error's `start_cursor`
+        says where to resume from, pass it back in via `start_cursor`.
+
+        Up to `prefetch` pages are fetched ahead in the background, so the next
+        request is already under way while the caller works through the current page.
+        Set `prefetch=0` to only fetch a page when asked for it.
+
+        With a `limit` pagination stops once that many results have been fetched, and
+        the last request's page_size is cut down to only ask for the ones still needed.
+        """
+        if limit is not None and limit < 0:
+            raise ValueError(f"Limit can't be negative: {limit=}")
+        pages = self._paginated_request(
+            method,
+            url,
+            pagination_in_json,
+            data,
+            *args,
+            start_cursor=start_cursor,
+            idempotent=idempotent,
+            limit=limit,
+            **kwargs,
+        )
+        if prefetch > 0:
+            pages = read_ahead(pages, size=prefetch)
+        async with aclosing(pages):
+            async for page in pages:
+                yield page
+
+    async def _paginated_request(
+        self,
+        method: str,
+        url: furl.furl,
+        pagination_in_json: bool,
+        data: typing.Optional[RequestBody] = None,
+        *args: typing.Any,
+        start_cursor: typing.Optional[str] = None,
+        idempotent: bool = True,
+        limit: typing.Optional[int] = None,
+        **kwargs: typing.Any,
+    ) -> typing.AsyncIterator[PaginatedListResponse]:
         url = url.copy()  # make sure we don't modify the original
-        has_more = True
-        start_cursor = None
+        page_size = self._get_page_size(url, pagination_in_json, data)
+        count = 0
+        has_more = limit != 0
         while has_more:
             if start_cursor is not None:
-                # start_cursor is set either in the json body or the query params, depending on the request
-                if pagination_in_json and data:
-                    LOG.debug(f"Setting {start_cursor=} in JSON body")
-                    # Since the data is already encoded by pydantic, load, update and re-encode it
-                    request_json = json.loads(data)
-                    request_json["start_cursor"] = start_cursor
-                    data = json.dumps(request_json)
-                else:
-                    LOG.debug(f"Setting {start_cursor=} in url params")
-                    url.set({"start_cursor": start_cursor})
+                data = self._set_start_cursor(
+                    url, pagination_in_json, data, start_cursor
+                )
+            if limit is not None:
+                data = self._limit_page_size(
+                    url, pagination_in_json, data, page_size, limit - count
+                )
             LOG.debug(f"paginated_request: {method=} {url=} {data=}")
-            notion_response = await self.api_request(
-                method,
-                url,
-                data=data,
-                *args,
-                **kwargs,
-            )
+            try:
+                notion_response = await self.api_request(
+                    method,
+                    url,
+                    content=data,
+                    idempotent=idempotent,
+                    *args,
+                    **kwargs,
+                )
+            except NotionAPIResponseError as e:
+                e.start_cursor = start_cursor
+                raise
             LOG.debug(f"{notion_response=}")
             page = notion_response.get_paginated_list_response()
+            if limit is not None:
+                del page.results[limit - count :]
+                count += len(page.results)
             yield page
-            has_more = page.has_more
+            has_more = page.has_more and (limit is None or count < limit)
             start_cursor = page.next_cursor
 
+    async def stream_paginated_results(
+        self,
+        method: str,
+        url: furl.furl,
+        pagination_in_json: bool,
+        data: typing.Optional[RequestBody] = None,
+        *args: typing.Any,
+        start_cursor: typing.Optional[str] = None,
+        idempotent: bool = True,
+        limit: typing.Optional[int] = None,
+        **kwargs: typing.Any,
+    ) -> typing.AsyncIterator[bytes]:
+        """Perform a paginated request, yielding each result as it arrives
+
+        Unlike `paginated_request` the response body is decoded incrementally, each
+        item in `results` is yielded (as the raw JSON bytes sent by Notion) as soon as
+        it has been received. This gets the first item out sooner and avoids holding
+        whole pages of results in memory.
+
+        If the connection fails part way through a page the page is fetched again
+        (subject to the retry policy) and the items already yielded are skipped.
+
+        See `paginated_request` for `limit`.
+        """
+        if limit is not None and limit < 0:
+            raise ValueError(f"Limit can't be negative: {limit=}")
+        url = url.copy()  # make sure we don't modify the original
+        policy = self.get_retry_policy(method)
+        page_size = self._get_page_size(url, pagination_in_json, data)
+        count = 0
+        has_more = limit != 0
+        while has_more:
+            if start_cursor is not None:
+                data = self._set_start_cursor(
+                    url, pagination_in_json, data, start_cursor
+                )
+            if limit is not None:
+                data = self._limit_page_size(
+                    url, pagination_in_json, data, page_size, limit - count
+                )
+            LOG.debug(f"stream_paginated_results: {method=} {url=} {data=}")
+            attempt = 1
+            yielded = 0
+            while True:
+                try:
+                    response = await self.http_request(
+                        method,
+                        url,
+                        content=data,
+                        idempotent=idempotent,
+                        stream=True,
+                        *args,
+                        **kwargs,
+                    )
+                except Exception as e:
+                    error = NotionAPIResponseError(f"Error making request: {e}")
+                    error.start_cursor = start_cursor
+                    raise error from e
+                try:
+                    if response.status_code != 200:
+                        await response.aread()
+                        self._parse_response(response)
+                    parser = ListResponseParser()
+                    seen = 0
+                    async for chunk in response.aiter_bytes():
+                        for item in parser.feed(chunk):
+                            seen += 1
+                            if seen > yielded and (
+                                limit is None or count + yielded < limit
+                            ):
+                                yielded = seen
+                                yield item
+                    fields = parser.close()
+                except RETRYABLE_EXCEPTIONS as e:
+                    if not (idempotent and self._can_retry(policy, attempt)):
+                        error = NotionAPIResponseError(
+                            f"Error reading response: {e}", response=response
+                        )
+                        error.start_cursor = start_cursor
+                        raise error from e
+                    backoff = policy.get_backoff(attempt)
+                    LOG.warning(
+                        f"Error reading response from {method} {url}, retrying in {backoff:.2f}s ({attempt=}): {e!r}"
+                    )
+                    attempt += 1
+                    await asyncio.sleep(backoff)
+                    continue
+                except StreamingParseError as e:
+                    raise NotionAPIResponseError(
+                        f"Unable to parse response: {e}", response=response
+                    ) from e
+                except NotionAPIResponseError as e:
+                    e.start_cursor = start_cursor
+                    raise
+                finally:
+                    await response.aclose()
+                break
+            count += yielded
+            has_more = bool(fields.get("has_more")) and (limit is None or count < limit)
+            start_cursor = fields.get("next_cursor")
+
+    async def iter_paginated_results(
+        self,
+        method: str,
+        url: furl.furl,
+        pagination_in_json: bool,
+        data: typing.Optional[RequestBody] = None,
+        stream: bool = False,
+        limit: typing.Optional[int] = None,
+    ) -> typing.AsyncIterator[typing.Union[Database, Page]]:
+        """Perform a paginated request, yielding each result parsed into a Database or Page
+
+        See `stream_paginated_results` for `stream` and `paginated_request` for `limit`.
+        """
+        if stream:
+            async with aclosing(
+                self.stream_paginated_results(
+                    method,
+                    url,
+                    pagination_in_json=pagination_in_json,
+                    data=data,
+                    limit=limit,
+                )
+            ) as items:
+                async for item in items:
+                    yield parse_result(
+                        codec.loads(item),
+                        validate=self.validate,
+                        lazy=self.lazy_properties,
+                    )
+        else:
+            async with aclosing(
+                self.paginated_request(
+                    method,
+                    url,
+                    pagination_in_json=pagination_in_json,
+                    data=data,
+                    limit=limit,
+                )
+            ) as pages:
+                async for page in pages:
+                    for result in page.iter_results(
+                        validate=self.validate, lazy=self.lazy_properties
+                    ):
+                        yield result
+
     async def get_database(self, database_id: uuid.UUID) -> Database:
         """https://developers.notion.com/reference/get-database"""
+        if self.cache is not None:
+            cached = self.cache.get("database", database_id)
+            if cached is not None:
+                return cached
+        if self.coalesce_reads:
+            return await self._single_flight.do(
+                ("database", str(database_id)),
+                lambda: self._fetch_database(database_id),
+            )
+        return await self._fetch_database(database_id)
+
+    async def _fetch_database(self, database_id: uuid.UUID) -> Database:
         response = await self.api_request(
             "GET", self.get_url_for_path("v1/databases", str(database_id))
         )
-        return response.get_database()
+        database = response.get_database(
+            validate=self.validate, lazy=self.lazy_properties
+        )
+        if self.cache is not None:
+            self.cache.put("database", database_id, database, size=response.size)
+        return database
 
     async def query_database(
-        self, database_id: uuid.UUID, query: QueryDatabase
+        self,
+        database_id: uuid.UUID,
+        query: QueryDatabase,
+        stream: bool = False,
+        limit: typing.Optional[int] = None,
     ) -> typing.AsyncIterable[Page]:
-        """https://developers.notion.com/reference/post-database-query"""
-        async for page in self.paginated_request(
-            "POST",
-            self.base_url / "v1/databases" / str(database_id) / "query",
-            data=query.json(exclude_unset=True),
-            pagination_in_json=True,
-        ):
-            for item in page.iter_results():
+        """https://developers.notion.com/reference/post-database-query
+
+        See `stream_paginated_results` for `stream`. With a `limit` at most that many
+        pages are fetched, and no more requests are made than needed for them.
+        """
+        async with aclosing(
+            self.iter_paginated_results(
+                "POST",
+                self.base_url / "v1/databases" / str(database_id) / "query",
+                data=codec.dumps_model(query, exclude_unset=True),
+                pagination_in_json=True,
+                stream=stream,
+                limit=limit,
+            )
+        ) as items:
+            async for item in items:
                 LOG.debug(f"{item=}")
                 if isinstance(item, Page):
                     yield item
                 else:
                     LOG.warning(f"Got unexpected item when querying database: {item=}")
 
+    async def query_database_raw(
+        self,
+        database_id: uuid.UUID,
+        query: QueryDatabase,
+        limit: typing.Optional[int] = None,
+    ) -> typing.AsyncIterator[bytes]:
+        """Like `query_database` but yields each page as the JSON bytes Notion sent
+
+        Nothing is parsed, which makes this the quickest way to dump a database.
+        """
+        async with aclosing(
+            self.stream_paginated_results(
+                "POST",
+                self.base_url / "v1/databases" / str(database_id) / "query",
+                data=codec.dumps_model(query, exclude_unset=True),
+                pagination_in_json=True,
+                limit=limit,
+            )
+        ) as items:
+            async for item in items:
+                yield item
+
     async def create_database(
         self,
         create_database: CreateDatabase,
@@ -177,34 +721,142 @@ class NotionAsyncClient:
         response = await self.api_request(
             "POST",
             self.get_url_for_path("v1/databases"),
-            data=create_database.json(),
+            content=codec.dumps_model(create_database),
+        )
+        database = response.get_database(
+            validate=self.validate, lazy=self.lazy_properties
         )
-        return response.get_database()
+        if self.cache is not None:
+            # Replaces anything stale cached under the id
+            self.cache.put("database", database.id, database, size=response.size)
+        return database
 
     async def get_page(self, page_id: uuid.UUID) -> Page:
         """https://developers.notion.com/reference/get-page"""
+        if self.cache is not None:
+            cached = self.cache.get("page", page_id)
+            if cached is not None:
+                return cached
+        if self.coalesce_reads:
+            return await self._single_flight.do(
+                ("page", str(page_id)), lambda: self._fetch_page(page_id)
+            )
+        return await self._fetch_page(page_id)
+
+    async def _fetch_page(self, page_id: uuid.UUID) -> Page:
         response = await self.api_request(
             "GET", self.get_url_for_path("v1/pages", str(page_id))
         )
-        return response.get_page()
+        page = response.get_page(validate=self.validate, lazy=self.lazy_properties)
+        if self.cache is not None:
+            self.cache.put("page", page_id, page, size=response.size)
+        return page
+
+    async def get_pages(
+        self,
+        page_ids: typing.Union[
+            typing.Iterable[uuid.UUID], typing.AsyncIterable[uuid.UUID]
+        ],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        ordered: bool = True,
+    ) -> typing.AsyncIterator[BulkResult[uuid.UUID, Page]]:
+        """Get many pages, with up to `concurrency` requests in flight
+
+        Yields a BulkResult per id, in the given order or as they complete if not
+        `ordered`. Failures are reported in the result's error instead of stopping the
+        other fetches. Requests still go through the client's rate limiter.
+        """
+        async with aclosing(
+            bounded_map(
+                self.get_page, page_ids, concurrency=concurrency, ordered=ordered
+            )
+        ) as results:
+            async for result in results:
+                yield result
 
-    async def create_page(self, create_page: CreatePage) -> Page:
-        """https://developers.notion.com/reference/post-page"""
+    async def create_page(
+        self, create_page: CreatePage, idempotent: bool = False
+    ) -> Page:
+        """https://developers.notion.com/reference/post-page
+
+        Creation isn't retried on errors unless declared `idempotent`, as a retry could
+        create a duplicate page.
+        """
         response = await self.api_request(
             "POST",
             self.get_url_for_path("v1/pages"),
-            data=create_page.json(),
+            content=codec.dumps_model(create_page),
+            idempotent=idempotent,
         )
-        return response.get_page()
+        return response.get_page(validate=self.validate, lazy=self.lazy_properties)
+
+    async def update_page(
+        self, page_id: uuid.UUID, update_page: UpdatePage, idempotent: bool = False
+    ) -> Page:
+        """https://developers.notion.com/reference/patch-page
 
-    async def update_page(self, page_id: uuid.UUID, update_page: UpdatePage) -> Page:
-        """https://developers.notion.com/reference/patch-page"""
+        Updates aren't retried on errors unless declared `idempotent`.
+        """
+        if self.cache is not None:
+            self.cache.invalidate("page", page_id)
         response = await self.api_request(
             "PATCH",
             self.get_url_for_path("v1/pages", str(page_id)),
-            data=update_page.json(),
+            content=codec.dumps_model(update_page),
+            idempotent=idempotent,
         )
-        return response.get_page()
+        page = response.get_page(validate=self.validate, lazy=self.lazy_properties)
+        if self.cache is not None:
+            self.cache.put("page", page_id, page, size=response.size)
+        return page
+
+    async def create_pages(
+        self,
+        create_pages: typing.Union[
+            typing.Iterable[CreatePage], typing.AsyncIterable[CreatePage]
+        ],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        idempotent: bool = False,
+    ) -> typing.AsyncIterator[BulkResult[CreatePage, Page]]:
+        """Create many pages, with up to `concurrency` requests in flight
+
+        Yields a BulkResult per request in input order, failures are reported in the
+        result's error. Input is consumed lazily, so it can be a stream. See
+        `create_page` for `idempotent`.
+        """
+
+        async def create(create_page: CreatePage) -> Page:
+            return await self.create_page(create_page, idempotent=idempotent)
+
+        async with aclosing(
+            bounded_map(create, create_pages, concurrency=concurrency, ordered=True)
+        ) as results:
+            async for result in results:
+                yield result
+
+    async def update_pages(
+        self,
+        update_pages: typing.Union[
+            typing.Iterable[typing.Tuple[uuid.UUID, UpdatePage]],
+            typing.AsyncIterable[typing.Tuple[uuid.UUID, UpdatePage]],
+        ],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        idempotent: bool = False,
+    ) -> typing.AsyncIterator[BulkResult[typing.Tuple[uuid.UUID, UpdatePage], Page]]:
+        """Update many pages from (page_id, update_page) pairs
+
+        Same behaviour as `create_pages`.
+        """
+
+        async def update(item: typing.Tuple[uuid.UUID, UpdatePage]) -> Page:
+            page_id, update_page = item
+            return await self.update_page(page_id, update_page, idempotent=idempotent)
+
+        async with aclosing(
+            bounded_map(update, update_pages, concurrency=concurrency, ordered=True)
+        ) as results:
+            async for result in results:
+                yield result
 
     async def get_block_children(self, block_id: uuid.UUID):
         """https://developers.notion.com/reference/get-block-children"""
@@ -225,15 +877,41 @@ class NotionAsyncClient:
         raise NotImplementedError()
 
     async def search(
-        self, search: Search
+        self,
+        search: Search,
+        stream: bool = False,
+        limit: typing.Optional[int] = None,
     ) -> typing.AsyncIterable[typing.Union[Database, Page]]:
-        """https://developers.notion.com/reference/post-search"""
-        async for page in self.paginated_request(
-            "POST",
-            self.base_url / "v1/search",
-            data=search.json(exclude_unset=True, exclude_none=True),
-            pagination_in_json=True,
-        ):
-            for item in page.iter_results():
+        """https://developers.notion.com/reference/post-search
+
+        See `stream_paginated_results` for `stream` and `query_database` for `limit`.
+        """
+        async with aclosing(
+            self.iter_paginated_results(
+                "POST",
+                self.base_url / "v1/search",
+                data=codec.dumps_model(search, exclude_unset=True, exclude_none=True),
+                pagination_in_json=True,
+                stream=stream,
+                limit=limit,
+            )
+        ) as items:
+            async for item in items:
                 LOG.debug(f"{item=}")
                 yield item
+
+    async def search_raw(
+        self, search: Search, limit: typing.Optional[int] = None
+    ) -> typing.AsyncIterator[bytes]:
+        """Like `search` but yields each result as the JSON bytes Notion sent"""
+        async with aclosing(
+            self.stream_paginated_results(
+                "POST",
+                self.base_url / "v1/search",
+                data=codec.dumps_model(search, exclude_unset=True, exclude_none=True),
+                pagination_in_json=True,
+                limit=limit,
+            )
+        ) as items:
+            async for item in items:
+                yield item
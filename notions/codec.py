@@ -0,0 +1,63 @@
+"""JSON encoding and decoding
+
+Uses orjson when it's installed (e.g. `pip install notions[orjson]`), which is a lot
+faster, otherwise falls back to the standard library json module. Both work on bytes,
+so responses can be decoded without converting to str first.
+
+Encoding handles the same types as pydantic's `.json()` (UUIDs, datetimes, decimals,
+enums etc.) and always produces compact output, so the result is the same whichever
+backend is used.
+"""
+
+import json
+import typing
+
+import pydantic
+from pydantic.json import pydantic_encoder
+
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:  # pragma: no cover - depends on the environment
+    HAS_ORJSON = False
+
+JSONInput = typing.Union[bytes, bytearray, memoryview, str]
+
+
+def get_backend() -> str:
+    """Name of the JSON library in use"""
+    return "orjson" if HAS_ORJSON else "json"
+
+
+if HAS_ORJSON:
+
+    def loads(data: JSONInput) -> typing.Any:
+        """Decode JSON from bytes (or str)"""
+        return orjson.loads(data)
+
+    def dumps(obj: typing.Any) -> bytes:
+        """Encode to compact JSON bytes"""
+        return orjson.dumps(obj, default=pydantic_encoder)
+
+else:
+
+    def loads(data: JSONInput) -> typing.Any:
+        """Decode JSON from bytes (or str)"""
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+    def dumps(obj: typing.Any) -> bytes:
+        """Encode to compact JSON bytes"""
+        return json.dumps(
+            obj, default=pydantic_encoder, separators=(",", ":"), ensure_ascii=False
+        ).encode("UTF-8")
+
+
+def dumps_model(model: pydantic.BaseModel, **kwargs: typing.Any) -> bytes:
+    """Encode a pydantic model, like `model.json(**kwargs)` but to bytes
+
+    kwargs are passed to `model.dict()`, e.g. exclude_unset=True.
+    """
+    return dumps(model.dict(**kwargs))
@@ -0,0 +1,213 @@
+"""Column layouts for tabular output
+
+A ColumnPlan is worked out once per export from the database schema and then used to
+lay out every page as a row. The headers don't depend on which pages come first, and
+pages with missing (or extra) properties still line up with them.
+
+Properties with nested values are expanded into a column per part, named
+`property_key.part` (e.g. `due_date.start` and `due_date.end`). Where a property holds
+a list (people, multi-selects, files etc.) each column holds the parts of all the
+items as a JSON array, e.g. `assignees.email` is `["a@example.com","b@example.com"]`.
+Unlike joining with commas, this can be split back apart whatever the items contain.
+"""
+
+import dataclasses
+import datetime
+import enum
+import typing
+
+from notions import codec
+from notions.flatten import keyify
+from notions.models.database import Database
+from notions.models.page import Page
+
+CORE_HEADERS = ["type", "id", "title", "created_time", "last_edited_time"]
+
+# Pulls a value out of a page property
+Getter = typing.Callable[[typing.Any], typing.Any]
+
+
+def _get_value(prop: typing.Any) -> typing.Any:
+    return prop.get_value()
+
+
+def _date_part(part: str) -> Getter:
+    def get(prop: typing.Any) -> typing.Any:
+        return getattr(prop.date, part) if prop.date is not None else None
+
+    return get
+
+
+def _user_part(part: str) -> Getter:
+    def get(prop: typing.Any) -> typing.Any:
+        return prop.get_value()[part]
+
+    return get
+
+
+def _people_part(part: str) -> Getter:
+    def get(prop: typing.Any) -> typing.Any:
+        return [person.get_value()[part] for person in prop.people]
+
+    return get
+
+
+def _select_name(prop: typing.Any) -> typing.Any:
+    return prop.select.name if prop.select is not None else None
+
+
+def _multi_select_names(prop: typing.Any) -> typing.Any:
+    return [option.name for option in prop.multi_select]
+
+
+def _file_urls(prop: typing.Any) -> typing.Any:
+    return [
+        value["url"] if isinstance(value, dict) else value for value in prop.get_value()
+    ]
+
+
+# The columns each property type expands into, as (part, getter). A part of None means
+# a single column for the whole value.
+PROPERTY_COLUMNS: typing.Dict[
+    str, typing.List[typing.Tuple[typing.Optional[str], Getter]]
+] = {
+    "date": [("start", _date_part("start")), ("end", _date_part("end"))],
+    "people": [("name", _people_part("name")), ("email", _people_part("email"))],
+    "created_by": [("name", _user_part("name")), ("email", _user_part("email"))],
+    "last_edited_by": [("name", _user_part("name")), ("email", _user_part("email"))],
+    "select": [(None, _select_name)],
+    "multi_select": [(None, _multi_select_names)],
+    "files": [(None, _file_urls)],
+}
+# Property types whose values (or parts) are lists
+LIST_PROPERTY_TYPES = frozenset({"people", "multi_select", "files", "relation"})
+# Property types whose values (or parts) are dates or times
+TIMESTAMP_PROPERTY_TYPES = frozenset({"created_time", "last_edited_time", "date"})
+DEFAULT_PROPERTY_COLUMNS: typing.List[typing.Tuple[typing.Optional[str], Getter]] = [
+    (None, _get_value)
+]
+
+
+def format_cell(value: typing.Any) -> str:
+    """Format a value for a CSV cell"""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return str(value.value)
+    if isinstance(value, list):
+        return codec.dumps([format_cell(item) for item in value]).decode("UTF-8")
+    if isinstance(value, dict):
+        if "start" in value and "end" in value:
+            # Date ranges from formulas and rollups, as an ISO 8601 interval
+            start, end = format_cell(value["start"]), format_cell(value["end"])
+            return f"{start}/{end}" if end else start
+        if value.get("type") in value:
+            # Items of rollup arrays, e.g. {"type": "email", "email": "..."}
+            return format_cell(value[value["type"]])
+        return codec.dumps(value).decode("UTF-8")
+    return str(value)
+
+
+@dataclasses.dataclass(frozen=True)
+class Column:
+    header: str
+    property_name: str
+    property_type: str
+    get: Getter = _get_value
+
+    @property
+    def kind(self) -> str:
+        """What sort of values the column holds, for typed outputs
+
+        One of "bool", "number", "timestamp", "list" (of strings) or "string".
+        """
+        if self.property_type == "checkbox":
+            return "bool"
+        if self.property_type == "number":
+            return "number"
+        if self.property_type in TIMESTAMP_PROPERTY_TYPES:
+            return "timestamp"
+        if self.property_type in LIST_PROPERTY_TYPES:
+            return "list"
+        return "string"
+
+
+class ColumnPlan:
+    """Fixed row layout for the pages of a database"""
+
+    def __init__(
+        self,
+        columns: typing.List[Column],
+        title_property: typing.Optional[str] = None,
+        database: typing.Optional[Database] = None,
+    ):
+        self.columns = columns
+        self.title_property = title_property
+        # The database the plan was made from, if any
+        self.database = database
+        self.width = len(CORE_HEADERS) + len(columns)
+        # Row index and getter of each property's cells
+        self.positions: typing.Dict[str, typing.List[typing.Tuple[int, Getter]]] = {}
+        for index, column in enumerate(columns, start=len(CORE_HEADERS)):
+            self.positions.setdefault(column.property_name, []).append(
+                (index, column.get)
+            )
+
+    @classmethod
+    def from_database(cls, database: Database) -> "ColumnPlan":
+        return cls._from_properties(database.properties, database=database)
+
+    @classmethod
+    def from_page(cls, page: Page) -> "ColumnPlan":
+        """Layout guessed from a page's own properties, when there's no schema"""
+        return cls._from_properties(page.properties)
+
+    @classmethod
+    def _from_properties(
+        cls,
+        properties: typing.Mapping[str, typing.Any],
+        database: typing.Optional[Database] = None,
+    ) -> "ColumnPlan":
+        columns = []
+        title_property = None
+        for name, prop in properties.items():
+            key = keyify(name)
+            for part, get in PROPERTY_COLUMNS.get(prop.type, DEFAULT_PROPERTY_COLUMNS):
+                columns.append(
+                    Column(
+                        header=key if part is None else f"{key}.{part}",
+                        property_name=name,
+                        property_type=prop.type,
+                        get=get,
+                    )
+                )
+            if prop.type == "title":
+                title_property = name
+        return cls(columns, title_property=title_property, database=database)
+
+    @property
+    def headers(self) -> typing.List[str]:
+        return CORE_HEADERS + [column.header for column in self.columns]
+
+    def values(self, page: Page) -> typing.List[typing.Any]:
+        """The page's values laid out as a row, unformatted (None where missing)"""
+        row: typing.List[typing.Any] = [None] * self.width
+        row[0] = page.object
+        row[1] = page.id
+        row[3] = page.created_time
+        row[4] = page.last_edited_time
+        positions = self.positions
+        for name, prop in page.properties.items():
+            for index, get in positions.get(name, ()):
+                row[index] = get(prop)
+        if self.title_property is not None:
+            row[2] = row[positions[self.title_property][0][0]]
+        return row
+
+    def row(self, page: Page) -> typing.List[str]:
+        """The page as a row of CSV cells"""
+        return [format_cell(value) for value in self.values(page)]
@@ -0,0 +1,269 @@
+"""Keeping pages and databases on disk between runs
+
+DiskCache stores the JSON of pages and databases in a SQLite file, keyed by type and
+id. It can be passed to NotionAsyncClient as its `cache` like ObjectCache, which
+suits CLI runs that start cold every time.
+
+Cached objects are only trusted after `revalidate`. That first asks a search sorted
+by `last_edited_time` for just the most recently edited object. If nothing is newer
+than the newest edit seen by the previous revalidation, every entry is still current,
+so when nothing has changed this is a single small request.
+
+Otherwise the search is read newest first until it gets back to that edit time.
+Anything edited since then is in those results, so cached copies of them are replaced
+with the listed versions. The search covers the whole workspace, so if more objects
+have been edited than the cache holds it's cheaper to empty the cache and fetch its
+objects again when they're asked for.
+
+The search index can lag behind edits a little, so this reads back `margin` further
+than strictly needed. The same lag means an edit made just before the previous
+revalidation may only show up now, with an older edit time than the newest seen then,
+so the full read also happens when the previous revalidation was within `margin` of
+the newest edit. Entries are trusted for `max_age` seconds after a revalidation, after
+which `get` misses until the next one.
+
+Hits skip validation (see `notions.models.construct`), as the JSON was validated when
+it was first fetched.
+"""
+
+import datetime
+import logging
+import sqlite3
+import time
+import typing
+
+from pydantic import datetime_parse
+
+from . import codec
+from .bulk import aclosing
+from .cache import CacheStats
+from .client import NotionAsyncClient
+from .models.response import parse_result
+from .models.search import Search, SearchSort
+from .sqlite import quote, to_sql_timestamp
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_MAX_AGE = 60.0
+DEFAULT_MARGIN = datetime.timedelta(minutes=5)
+DEFAULT_REVALIDATE_PAGE_SIZE = 10
+
+OBJECT_TYPES = frozenset({"page", "database"})
+OBJECTS_TABLE = "objects"
+META_TABLE = "notions_meta"
+
+
+def _timestamp(value: typing.Any) -> str:
+    if isinstance(value, str):
+        value = datetime_parse.parse_datetime(value)
+    return to_sql_timestamp(value) or ""
+
+
+class DiskCache:
+    """Pages and databases cached in a SQLite file
+
+    `clock` (wall clock seconds, as the cache outlives the process) can be swapped out
+    for testing.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_age: float = DEFAULT_MAX_AGE,
+        margin: datetime.timedelta = DEFAULT_MARGIN,
+        clock: typing.Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.max_age = max_age
+        self.margin = margin
+        self.clock = clock
+        self.stats = CacheStats()
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {quote(OBJECTS_TABLE)} "
+                "(object_type TEXT, id TEXT, last_edited_time TEXT, json TEXT, "
+                "PRIMARY KEY (object_type, id))"
+            )
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {quote(META_TABLE)} "
+                "(key TEXT PRIMARY KEY, value TEXT)"
+            )
+
+    def close(self):
+        self.connection.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute(
+            f"SELECT count(*) FROM {quote(OBJECTS_TABLE)}"
+        ).fetchone()[0]
+
+    def _get_meta(self, key: str) -> typing.Optional[str]:
+        row = self.connection.execute(
+            f"SELECT value FROM {quote(META_TABLE)} WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def _set_meta(self, key: str, value: str):
+        self.connection.execute(
+            f"INSERT OR REPLACE INTO {quote(META_TABLE)} (key, value) VALUES (?, ?)",
+            (key, value),
+        )
+
+    @property
+    def is_fresh(self) -> bool:
+        """Whether entries can be trusted without revalidating"""
+        validated_at = self._get_meta("validated_at")
+        return validated_at is not None and (
+            self.clock() - float(validated_at) < self.max_age
+        )
+
+    def get(self, object_type: str, object_id: typing.Any) -> typing.Any:
+        """The cached object, or None if it isn't cached or needs revalidating"""
+        row = None
+        if object_type in OBJECT_TYPES and self.is_fresh:
+            row = self.connection.execute(
+                f"SELECT json FROM {quote(OBJECTS_TABLE)} "
+                "WHERE object_type = ? AND id = ?",
+                (object_type, str(object_id)),
+            ).fetchone()
+        if row is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return parse_result(codec.loads(row[0]), validate=False)
+
+    def put(
+        self,
+        object_type: str,
+        object_id: typing.Any,
+        value: typing.Any,
+        size: typing.Optional[int] = None,
+    ):
+        # The size is only for ObjectCache's accounting, SQLite keeps track of its own
+        if object_type not in OBJECT_TYPES:
+            return
+        with self.connection:
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO {quote(OBJECTS_TABLE)} "
+                "(object_type, id, last_edited_time, json) VALUES (?, ?, ?, ?)",
+                (
+                    object_type,
+                    str(object_id),
+                    _timestamp(value.last_edited_time),
+                    codec.dumps_model(value).decode("UTF-8"),
+                ),
+            )
+
+    def invalidate(self, object_type: str, object_id: typing.Any):
+        with self.connection:
+            cursor = self.connection.execute(
+                f"DELETE FROM {quote(OBJECTS_TABLE)} WHERE object_type = ? AND id = ?",
+                (object_type, str(object_id)),
+            )
+        if cursor.rowcount:
+            self.stats.invalidations += 1
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute(f"DELETE FROM {quote(OBJECTS_TABLE)}")
+            self.connection.execute(f"DELETE FROM {quote(META_TABLE)}")
+
+    async def revalidate(
+        self,
+        client: NotionAsyncClient,
+        page_size: int = DEFAULT_REVALIDATE_PAGE_SIZE,
+    ) -> int:
+        """Bring cached entries up to date with recent edits
+
+        Returns the number of entries replaced or dropped. On the first revalidation
+        there's no record of what's been checked, so the cache is emptied.
+        """
+        started = self.clock()
+        watermark = self._get_meta("watermark")
+        newest = await self._newest_edit(client)
+        replaced = 0
+        with self.connection:
+            if watermark is None:
+                replaced = self._drop_all()
+            elif newest is not None and (
+                newest > watermark or self._may_lag(watermark)
+            ):
+                replaced = await self._replace_edited(client, watermark, page_size)
+            if newest is not None and (watermark is None or newest > watermark):
+                self._set_meta("watermark", newest)
+            self._set_meta("validated_at", str(started))
+        LOG.info(f"Revalidated {self.path=}: {replaced=} {newest=}")
+        return replaced
+
+    async def _newest_edit(self, client: NotionAsyncClient) -> typing.Optional[str]:
+        """Edit time of the most recently edited object, None if there are none"""
+        search = Search(
+            sort=SearchSort(direction="descending", timestamp="last_edited_time"),
+            page_size=1,
+        )
+        async with aclosing(client.search_raw(search, limit=1)) as results:
+            async for raw in results:
+                return _timestamp(codec.loads(raw)["last_edited_time"])
+        return None
+
+    def _may_lag(self, watermark: str) -> bool:
+        """Whether edits from before the previous revalidation may not have shown yet"""
+        validated_at = self._get_meta("validated_at")
+        if validated_at is None:
+            return True
+        checked = datetime.datetime.fromtimestamp(
+            float(validated_at), tz=datetime.timezone.utc
+        )
+        return checked - self.margin <= datetime.datetime.fromisoformat(watermark)
+
+    def _drop_all(self) -> int:
+        cursor = self.connection.execute(f"DELETE FROM {quote(OBJECTS_TABLE)}")
+        return cursor.rowcount
+
+    async def _replace_edited(
+        self, client: NotionAsyncClient, watermark: str, page_size: int
+    ) -> int:
+        """Replace entries edited since the watermark with the versions search lists"""
+        cached = len(self)
+        if not cached:
+            return 0
+        stop_at = _timestamp(datetime.datetime.fromisoformat(watermark) - self.margin)
+        search = Search(
+            sort=SearchSort(direction="descending", timestamp="last_edited_time"),
+            page_size=page_size,
+        )
+        edited = 0
+        replaced = 0
+        async with aclosing(client.search_raw(search)) as results:
+            async for raw in results:
+                obj = codec.loads(raw)
+                last_edited_time = _timestamp(obj["last_edited_time"])
+                if last_edited_time < stop_at:
+                    break
+                if last_edited_time > watermark:
+                    edited += 1
+                    if edited > cached:
+                        LOG.info(f"More edits than {cached=} entries, emptying cache")
+                        return self._drop_all()
+                cursor = self.connection.execute(
+                    f"UPDATE {quote(OBJECTS_TABLE)} "
+                    "SET last_edited_time = ?, json = ? "
+                    "WHERE object_type = ? AND id = ?",
+                    (last_edited_time, raw.decode("UTF-8"), obj["object"], obj["id"]),
+                )
+                replaced += cursor.rowcount
+        return replaced
+
+    async def ensure_fresh(self, client: NotionAsyncClient) -> int:
+        """Revalidate, unless that's been done in the last `max_age` seconds"""
+        if self.is_fresh:
+            return 0
+        return await self.revalidate(client)
+
+
+async def ensure_fresh_cache(client: NotionAsyncClient) -> int:
+    """Revalidate the client's cache if it's a DiskCache which needs it"""
+    if isinstance(client.cache, DiskCache):
+        return await client.cache.ensure_fresh(client)
+    return 0
@@ -0,0 +1,162 @@
+"""Keeping a local SQLite copy of a database up to date
+
+The mirror is a PageStore (see `notions.sqlite`). Each sync queries the database
+sorted by `last_edited_time`, newest first, and stops at the first page older than
+the watermark left by the previous sync, so only recent edits are fetched. Pages
+whose stored `last_edited_time` already matches aren't rewritten.
+
+Notion rounds `last_edited_time` to the minute, so pages edited in the same minute as
+the watermark are always fetched and rewritten, in case they changed after the last
+sync.
+
+Query results don't include pages which have been deleted (or archived), so an
+incremental sync can't notice them. A full sync (`full=True`) fetches every page and
+removes the ones which are gone. A full sync also happens on the first sync and when
+the database's properties have changed, since the table's columns then need filling
+in from scratch.
+
+The watermark is only moved on once a sync completes, so an interrupted sync is
+picked up again next time.
+"""
+
+import dataclasses
+import datetime
+import logging
+import typing
+import uuid
+
+from . import codec
+from .bulk import aclosing
+from .client import NotionAsyncClient
+from .models.database import Database
+from .models.page import Page
+from .models.query_database import Direction, QueryDatabase, QueryDatabaseSort
+from .sqlite import DEFAULT_BATCH_SIZE, PageStore, to_sql_timestamp
+
+LOG = logging.getLogger(__name__)
+
+WATERMARK_KEY = "mirror_last_edited_time"
+SCHEMA_KEY = "mirror_schema"
+
+
+@dataclasses.dataclass
+class SyncResult:
+    """What a sync did
+
+    seen is the number of pages fetched, upserted the number written to the store and
+    deleted the number removed (only on a full sync).
+    """
+
+    full: bool
+    seen: int = 0
+    upserted: int = 0
+    deleted: int = 0
+    watermark: typing.Optional[datetime.datetime] = None
+
+
+def schema_signature(database: Database) -> str:
+    """The property names and types, which decide the store's columns"""
+    return codec.dumps(
+        sorted([name, value.type] for name, value in database.properties.items())
+    ).decode("UTF-8")
+
+
+def _upsert_changed(
+    store: PageStore,
+    pages: typing.List[Page],
+    watermark: typing.Optional[str],
+    rewrite: bool,
+) -> int:
+    """Upsert the pages which aren't already stored as they are"""
+    if rewrite:
+        return store.upsert_pages(pages)
+    stored = store.last_edited_times(str(page.id) for page in pages)
+    changed = []
+    for page in pages:
+        last_edited_time = to_sql_timestamp(page.last_edited_time)
+        if (
+            stored.get(str(page.id)) != last_edited_time
+            or last_edited_time == watermark
+        ):
+            changed.append(page)
+    return store.upsert_pages(changed)
+
+
+async def sync_store(
+    client: NotionAsyncClient,
+    database_id: uuid.UUID,
+    store: PageStore,
+    full: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> SyncResult:
+    """Bring the store up to date with the database
+
+    The store should have been opened with the database's current schema. See the
+    module docstring for when a full sync happens.
+    """
+    database = store.column_plan.database
+    schema = schema_signature(database) if database is not None else None
+    watermark = store.get_meta(WATERMARK_KEY)
+    # A new or changed schema means every row needs its columns filling in again
+    rewrite = watermark is None or schema != store.get_meta(SCHEMA_KEY)
+    full = full or rewrite
+    since = (
+        None
+        if full or watermark is None
+        else datetime.datetime.fromisoformat(watermark)
+    )
+    result = SyncResult(full=full)
+    LOG.info(f"Syncing {database_id=} {full=} {since=}")
+
+    query = QueryDatabase(
+        sorts=[
+            QueryDatabaseSort(
+                timestamp="last_edited_time", direction=Direction.descending
+            )
+        ]
+    )
+    seen_ids: typing.Set[str] = set()
+    newest: typing.Optional[datetime.datetime] = None
+    batch: typing.List[Page] = []
+    async with aclosing(client.query_database(database_id, query)) as pages:
+        async for page in pages:
+            if since is not None and page.last_edited_time < since:
+                break
+            result.seen += 1
+            if newest is None or page.last_edited_time > newest:
+                newest = page.last_edited_time
+            if full:
+                seen_ids.add(str(page.id))
+            batch.append(page)
+            if len(batch) >= batch_size:
+                result.upserted += _upsert_changed(store, batch, watermark, rewrite)
+                batch.clear()
+    if batch:
+        result.upserted += _upsert_changed(store, batch, watermark, rewrite)
+    if full:
+        result.deleted = store.delete_pages(store.page_ids() - seen_ids)
+
+    if since is not None and (newest is None or newest < since):
+        newest = since
+    result.watermark = newest
+    if newest is not None:
+        store.set_meta(WATERMARK_KEY, to_sql_timestamp(newest) or "")
+    if schema is not None:
+        store.set_meta(SCHEMA_KEY, schema)
+    LOG.info(f"Synced {database_id=}: {result=}")
+    return result
+
+
+async def sync_database(
+    client: NotionAsyncClient,
+    database_id: uuid.UUID,
+    path: str,
+    full: bool = False,
+) -> SyncResult:
+    """Sync the database into the SQLite file at path, creating it if needed"""
+    database = await client.get_database(database_id)
+    store = PageStore.open(path, database)
+    try:
+        return await sync_store(client, database_id, store, full=full)
+    finally:
+        store.close()
@@ -0,0 +1,185 @@
+"""Building models from trusted data without validation
+
+Responses from the Notion API follow a fixed schema, so running every field through
+pydantic's validators mostly repeats checks the API has already made. `construct_model`
+builds the same model tree directly, only converting the values which need it (UUIDs,
+datetimes, decimals, enums and nested models). Discriminated unions are resolved by
+looking up the `type` tag. The few other unions (e.g. a date or a datetime) still go
+through pydantic.
+
+Nothing is checked, so bad data gives a broken model rather than a ValidationError.
+Only use this on data from the API.
+"""
+
+import datetime
+import decimal
+import enum
+import typing
+import uuid
+
+import pydantic
+from pydantic import datetime_parse
+from pydantic.fields import (
+    SHAPE_DICT,
+    SHAPE_LIST,
+    SHAPE_MAPPING,
+    SHAPE_SINGLETON,
+    ModelField,
+)
+
+M = typing.TypeVar("M", bound=pydantic.BaseModel)
+
+Converter = typing.Callable[[typing.Any], typing.Any]
+
+
+class _Plan(typing.NamedTuple):
+    # (field name, key in the data, converter or None if the value is used as is)
+    fields: typing.List[typing.Tuple[str, str, typing.Optional[Converter]]]
+    # Fields to fill in with their default when missing
+    optional: typing.List[typing.Tuple[str, ModelField]]
+
+
+_plans: typing.Dict[typing.Type[pydantic.BaseModel], _Plan] = {}
+_field_converters: typing.Dict[ModelField, Converter] = {}
+
+
+def construct_model(model: typing.Type[M], data: typing.Dict[str, typing.Any]) -> M:
+    """Build `model` from trusted data, skipping validation
+
+    Unknown keys are ignored and missing optional fields get their defaults, like
+    `model.parse_obj(data)`.
+    """
+    plan = _plans.get(model)
+    if plan is None:
+        plan = _plans[model] = _make_plan(model)
+    values = {}
+    for name, key, convert in plan.fields:
+        if key in data:
+            value = data[key]
+            values[name] = value if convert is None else convert(value)
+    fields_set = set(values)
+    for name, field in plan.optional:
+        if name not in values:
+            values[name] = field.get_default()
+    instance = model.__new__(model)
+    object.__setattr__(instance, "__dict__", values)
+    object.__setattr__(instance, "__fields_set__", fields_set)
+    if model.__private_attributes__:
+        instance._init_private_attributes()
+    return instance
+
+
+def construct_field(field: ModelField, value: typing.Any) -> typing.Any:
+    """Convert a value for a single field from trusted data, skipping validation"""
+    convert = _field_converters.get(field)
+    if convert is None:
+        convert = _field_converters[field] = _field_converter(field)
+    return convert(value)
+
+
+def _make_plan(model: typing.Type[pydantic.BaseModel]) -> _Plan:
+    fields = []
+    for name, field in model.__fields__.items():
+        convert: typing.Optional[Converter] = _field_converter(field)
+        fields.append((name, field.alias, None if convert is _identity else convert))
+    optional = [
+        (name, field) for name, field in model.__fields__.items() if not field.required
+    ]
+    return _Plan(fields=fields, optional=optional)
+
+
+def _identity(value: typing.Any) -> typing.Any:
+    return value
+
+
+def _to_uuid(value: typing.Any) -> typing.Any:
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(value)
+
+
+def _to_decimal(value: typing.Any) -> typing.Any:
+    if isinstance(value, float):
+        # Same as pydantic, avoids binary float artifacts
+        return decimal.Decimal(str(value))
+    return decimal.Decimal(value)
+
+
+def _validating_converter(field: ModelField) -> Converter:
+    """Fall back to pydantic for anything we can't convert directly"""
+
+    def convert(value: typing.Any) -> typing.Any:
+        result, errors = field.validate(value, {}, loc=field.name)
+        if errors:
+            raise pydantic.ValidationError([errors], pydantic.BaseModel)
+        return result
+
+    return convert
+
+
+def _type_converter(field: ModelField) -> Converter:
+    """Converter for a single value of the field's type"""
+    if field.discriminator_key is not None and field.sub_fields_mapping:
+        return _discriminated_converter(field)
+    if field.sub_fields:
+        # Unions without a discriminator
+        return _validating_converter(field)
+    type_ = field.type_
+    if isinstance(type_, type):
+        if issubclass(type_, pydantic.BaseModel):
+            return lambda value: construct_model(type_, value)
+        if issubclass(type_, uuid.UUID):
+            return _to_uuid
+        if issubclass(type_, datetime.datetime):
+            return datetime_parse.parse_datetime
+        if issubclass(type_, datetime.date):
+            return datetime_parse.parse_date
+        if issubclass(type_, decimal.Decimal):
+            return _to_decimal
+        if issubclass(type_, enum.Enum):
+            return type_
+        if type_ in (str, int, float, bool, dict, list):
+            return _identity
+        return _validating_converter(field)
+    # Literals, Any etc. are used as they are
+    return _identity
+
+
+def _discriminated_converter(field: ModelField) -> Converter:
+    assert field.sub_fields_mapping is not None
+    key = field.discriminator_alias
+    converters = {
+        tag: _field_converter(sub_field)
+        for tag, sub_field in field.sub_fields_mapping.items()
+    }
+
+    def convert(value: typing.Any) -> typing.Any:
+        return converters[value[key]](value)
+
+    return convert
+
+
+def _field_converter(field: ModelField) -> Converter:
+    """Converter for a whole field, including lists, dicts and None"""
+    if field.shape == SHAPE_SINGLETON:
+        convert = _type_converter(field)
+    elif field.shape == SHAPE_LIST and field.sub_fields:
+        item = _field_converter(field.sub_fields[0])
+
+        def convert(value: typing.Any) -> typing.Any:
+            return [item(v) for v in value]
+
+    elif field.shape in (SHAPE_DICT, SHAPE_MAPPING) and field.sub_fields:
+        item = _field_converter(field.sub_fields[0])
+
+        def convert(value: typing.Any) -> typing.Any:
+            return {k: item(v) for k, v in value.items()}
+
+    else:
+        convert = _validating_converter(field)
+
+    if not field.allow_none or convert is _identity:
+        return convert
+
+    def convert_optional(value: typing.Any) -> typing.Any:
+        return None if value is None else convert(value)
+
+    return convert_optional
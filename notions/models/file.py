@@ -7,6 +7,7 @@ import typing
 from datetime import datetime
 
 import pydantic
+from typing_extensions import Annotated
 
 
 class ExternalFileDetails(pydantic.BaseModel):
@@ -41,7 +42,9 @@ class NotionFile(pydantic.BaseModel):
         }
 
 
-File = typing.Union[ExternalFile, NotionFile]
+File = Annotated[
+    typing.Union[ExternalFile, NotionFile], pydantic.Field(discriminator="type")
+]
 
 
 class PageCover(pydantic.BaseModel):
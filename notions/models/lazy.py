@@ -0,0 +1,106 @@
+"""Pages and databases which parse their properties on demand
+
+Most consumers of a query only look at a handful of properties, but parsing a page
+parses all of them. The lazy versions keep each property as its raw JSON dict and only
+parse it when it's first looked up, caching the result.
+
+The models are the normal Page and Database, only `properties` is a LazyProperties.
+Lookups, iteration, `.items()` and `.values()`, as well as `.dict()` and `.json()` on
+the model, all give parsed properties, so it can be used in place of a plain dict.
+"""
+
+import typing
+
+import pydantic
+from pydantic.fields import ModelField
+
+from .construct import construct_field, construct_model
+from .database import Database
+from .page import Page
+
+M = typing.TypeVar("M", Page, Database)
+
+
+class LazyProperties(dict):
+    """A dict of properties which parses each value the first time it's used
+
+    Avoid `dict(properties)` or `{**properties}`, which copy the unparsed values.
+    """
+
+    def __init__(
+        self,
+        raw: typing.Dict[str, typing.Any],
+        field: ModelField,
+        validate: bool = True,
+    ):
+        super().__init__(raw)
+        self._field = field
+        self._validate = validate
+        self._parsed: typing.Set[str] = set()
+
+    def _parse(self, key: str, value: typing.Any) -> typing.Any:
+        if self._validate:
+            parsed, errors = self._field.validate(value, {}, loc=key)
+            if errors:
+                raise pydantic.ValidationError([errors], pydantic.BaseModel)
+        else:
+            parsed = construct_field(self._field, value)
+        super().__setitem__(key, parsed)
+        self._parsed.add(key)
+        return parsed
+
+    def __getitem__(self, key: str) -> typing.Any:
+        value = super().__getitem__(key)
+        if key in self._parsed:
+            return value
+        return self._parse(key, value)
+
+    def __setitem__(self, key: str, value: typing.Any):
+        super().__setitem__(key, value)
+        self._parsed.add(key)
+
+    def get(self, key: str, default: typing.Any = None) -> typing.Any:
+        if key in self:
+            return self[key]
+        return default
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def copy(self) -> typing.Dict[str, typing.Any]:
+        return dict(self.items())
+
+    def __eq__(self, other: typing.Any) -> bool:
+        return dict(self.items()) == other
+
+    def __ne__(self, other: typing.Any) -> bool:
+        return not self == other
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+    @property
+    def parsed_count(self) -> int:
+        """Number of properties parsed so far"""
+        return len(self._parsed)
+
+
+def parse_lazy(model: typing.Type[M], obj: dict, validate: bool = True) -> M:
+    """Parse a Page or Database, leaving the properties to be parsed when used
+
+    See `notions.models.construct` for `validate`.
+    """
+    rest = {**obj, "properties": {}}
+    if validate:
+        instance = model.parse_obj(rest)
+    else:
+        instance = construct_model(model, rest)
+    properties_field = model.__fields__["properties"]
+    assert properties_field.sub_fields
+    instance.__dict__["properties"] = LazyProperties(
+        obj.get("properties", {}), properties_field.sub_fields[0], validate=validate
+    )
+    return instance
@@ -2,6 +2,7 @@ import typing
 import uuid
 
 import pydantic
+from typing_extensions import Annotated
 
 
 class PageParent(pydantic.BaseModel):
@@ -29,6 +30,14 @@ class DatabaseParent(pydantic.BaseModel):
 
 
 # Each content type has slightly different valid parents
-AllParents = typing.Union[PageParent, WorkspaceParent, DatabaseParent]
-DatabaseParents = typing.Union[PageParent, WorkspaceParent]
-PageParents = typing.Union[PageParent, DatabaseParent, WorkspaceParent]
+AllParents = Annotated[
+    typing.Union[PageParent, WorkspaceParent, DatabaseParent],
+    pydantic.Field(discriminator="type"),
+]
+DatabaseParents = Annotated[
+    typing.Union[PageParent, WorkspaceParent], pydantic.Field(discriminator="type")
+]
+PageParents = Annotated[
+    typing.Union[PageParent, DatabaseParent, WorkspaceParent],
+    pydantic.Field(discriminator="type"),
+]
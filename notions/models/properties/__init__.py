@@ -1,10 +1,16 @@
 """Properties of pages and databases
 
 Split into request properties used for creation and content properties
+
+Page and database properties are parsed using their `type` field to pick the right
+model, rather than trying each one in turn.
 """
 
 import typing
 
+import pydantic
+from typing_extensions import Annotated
+
 from .checkbox import DatabaseCheckboxProperty, PageCheckboxProperty
 from .created_by import DatabaseCreatedByProperty, PageCreatedByProperty
 from .created_time import (
@@ -39,26 +45,29 @@ from .title import (
 )
 from .url import CreatePageURLProperty, DatabaseURLProperty, PageURLProperty
 
-DatabaseProperty = typing.Union[
-    DatabaseCheckboxProperty,
-    DatabaseCreatedByProperty,
-    DatabaseCreatedTimeProperty,
-    DatabaseDateProperty,
-    DatabaseEmailProperty,
-    DatabaseFileProperty,
-    DatabaseFormulaProperty,
-    DatabaseLastEditedByProperty,
-    DatabaseLastEditedTimeProperty,
-    DatabaseMultiSelectProperty,
-    DatabaseNumberProperty,
-    DatabasePeopleProperty,
-    DatabasePhoneNumberProperty,
-    DatabaseRelationProperty,
-    DatabaseRichTextProperty,
-    DatabaseRollupProperty,
-    DatabaseSelectProperty,
-    DatabaseTitleProperty,
-    DatabaseURLProperty,
+DatabaseProperty = Annotated[
+    typing.Union[
+        DatabaseCheckboxProperty,
+        DatabaseCreatedByProperty,
+        DatabaseCreatedTimeProperty,
+        DatabaseDateProperty,
+        DatabaseEmailProperty,
+        DatabaseFileProperty,
+        DatabaseFormulaProperty,
+        DatabaseLastEditedByProperty,
+        DatabaseLastEditedTimeProperty,
+        DatabaseMultiSelectProperty,
+        DatabaseNumberProperty,
+        DatabasePeopleProperty,
+        DatabasePhoneNumberProperty,
+        DatabaseRelationProperty,
+        DatabaseRichTextProperty,
+        DatabaseRollupProperty,
+        DatabaseSelectProperty,
+        DatabaseTitleProperty,
+        DatabaseURLProperty,
+    ],
+    pydantic.Field(discriminator="type"),
 ]
 
 DatabaseProperties = typing.Dict[str, DatabaseProperty]
@@ -87,26 +96,29 @@ CreateDatabaseProperty = typing.Union[
 
 CreateDatabaseProperties = typing.Dict[str, CreateDatabaseProperty]
 
-PageProperty = typing.Union[
-    PageCheckboxProperty,
-    PageCreatedByProperty,
-    PageCreatedTimeProperty,
-    PageDateProperty,
-    PageEmailProperty,
-    PageFileProperty,
-    PageFormulaProperty,
-    PageLastEditedByProperty,
-    PageLastEditedTimeProperty,
-    PageMultiSelectProperty,
-    PageNumberProperty,
-    PagePeopleProperty,
-    PagePhoneNumberProperty,
-    PageRelationProperty,
-    PageRichTextProperty,
-    PageRollupProperty,
-    PageSelectProperty,
-    PageTitleProperty,
-    PageURLProperty,
+PageProperty = Annotated[
+    typing.Union[
+        PageCheckboxProperty,
+        PageCreatedByProperty,
+        PageCreatedTimeProperty,
+        PageDateProperty,
+        PageEmailProperty,
+        PageFileProperty,
+        PageFormulaProperty,
+        PageLastEditedByProperty,
+        PageLastEditedTimeProperty,
+        PageMultiSelectProperty,
+        PageNumberProperty,
+        PagePeopleProperty,
+        PagePhoneNumberProperty,
+        PageRelationProperty,
+        PageRichTextProperty,
+        PageRollupProperty,
+        PageSelectProperty,
+        PageTitleProperty,
+        PageURLProperty,
+    ],
+    pydantic.Field(discriminator="type"),
 ]
 
 PageProperties = typing.Dict[str, PageProperty]
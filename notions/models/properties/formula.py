@@ -60,7 +60,7 @@ class PageFormulaProperty(pydantic.BaseModel):
     type: typing.Literal["formula"] = "formula"
     formula: typing.Union[
         PageStringFormula, PageNumberFormula, PageBooleanFormula, PageDateFormula
-    ]
+    ] = pydantic.Field(..., discriminator="type")
 
     def get_value(self):
         return self.formula.get_value()
@@ -83,7 +83,9 @@ class PageArrayRollup(pydantic.BaseModel):
 class PageRollupProperty(pydantic.BaseModel):
     id: str
     type: typing.Literal["rollup"] = "rollup"
-    rollup: typing.Union[PageNumberRollup, PageDateRollup, PageArrayRollup]
+    rollup: typing.Union[
+        PageNumberRollup, PageDateRollup, PageArrayRollup
+    ] = pydantic.Field(..., discriminator="type")
 
     def get_value(self):
         return self.rollup.get_value()
@@ -1,6 +1,4 @@
-"""The different responses the API will give back
-
-"""
+"""The different responses the API will give back"""
 
 import logging
 import typing
@@ -8,7 +6,9 @@ from dataclasses import dataclass
 
 import pydantic
 
+from .construct import construct_model
 from .database import Database
+from .lazy import parse_lazy
 from .page import Page
 
 LOG = logging.getLogger(__name__)
@@ -23,6 +23,8 @@ class NotionAPIResponse:
 
     object: str
     obj: typing.Any
+    # Length of the response body, for sizing cache entries without re-serialising
+    size: int = 0
 
     @property
     def is_error(self):
@@ -42,15 +44,15 @@ class NotionAPIResponse:
     def is_database(self):
         return self.object == "database"
 
-    def get_database(self) -> Database:
-        return Database.parse_obj(self.obj)
+    def get_database(self, validate: bool = True, lazy: bool = False) -> Database:
+        return parse_model(Database, self.obj, validate=validate, lazy=lazy)
 
     @property
     def is_page(self):
         return self.object == "page"
 
-    def get_page(self) -> Page:
-        return Page.parse_obj(self.obj)
+    def get_page(self, validate: bool = True, lazy: bool = False) -> Page:
+        return parse_model(Page, self.obj, validate=validate, lazy=lazy)
 
 
 class ErrorResponse(pydantic.BaseModel):
@@ -66,14 +68,44 @@ class PaginatedListResponse(pydantic.BaseModel):
     next_cursor: typing.Optional[str]
     has_more: bool
 
-    def iter_results(self) -> typing.Iterable[typing.Union[Database, Page]]:
+    def iter_results(
+        self, validate: bool = True, lazy: bool = False
+    ) -> typing.Iterable[typing.Union[Database, Page]]:
         """Iterate over the results, yielding Database or Page instances"""
         for result in self.results:
-            LOG.debug(f"{result=}")
-            result_type = result.get("object", None)
-            if result_type == "database":
-                yield Database.parse_obj(result)
-            elif result_type == "page":
-                yield Page.parse_obj(result)
-            else:
-                raise ValueError(f"Don't know how to parse {result=}")
+            yield parse_result(result, validate=validate, lazy=lazy)
+
+
+M = typing.TypeVar("M", Page, Database)
+
+
+def parse_model(
+    model: typing.Type[M], obj: dict, validate: bool = True, lazy: bool = False
+) -> M:
+    """Parse obj into model
+
+    Without `validate` the model is built by `construct_model`, which is a lot faster
+    but trusts obj to match the schema. Only use it for API responses.
+
+    With `lazy` the properties are left to be parsed when used, see
+    `notions.models.lazy`.
+    """
+    if lazy:
+        return parse_lazy(model, obj, validate=validate)
+    if validate:
+        return model.parse_obj(obj)
+    return construct_model(model, obj)
+
+
+def parse_result(
+    result: dict, validate: bool = True, lazy: bool = False
+) -> typing.Union[Database, Page]:
+    """Parse an item from a list response into a Database or Page"""
+    LOG.debug(f"{result=}")
+    result_type = result.get("object", None)
+    if result_type == "database":
+        return parse_model(Database, result, validate=validate, lazy=lazy)
+    elif result_type == "page":
+        return parse_model(Page, result, validate=validate, lazy=lazy)
+    else:
+        raise ValueError(f"Don't know how to parse {result=}")
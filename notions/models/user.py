@@ -2,6 +2,7 @@ import typing
 import uuid
 
 import pydantic
+from typing_extensions import Annotated
 
 
 class PersonDetails(pydantic.BaseModel):
@@ -46,4 +47,4 @@ class Bot(pydantic.BaseModel):
         }
 
 
-User = typing.Union[Person, Bot]
+User = Annotated[typing.Union[Person, Bot], pydantic.Field(discriminator="type")]
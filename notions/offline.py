@@ -0,0 +1,335 @@
+"""Querying a local copy of a database instead of the API
+
+A PageStore (see `notions.sqlite` and `notions.mirror`) has a column per property, so
+the filters and sorts of a QueryDatabase can be turned into SQL and run locally. The
+filter is the same JSON that would be sent to Notion, see
+https://developers.notion.com/reference/post-database-query-filter
+
+Supported are compound (`and` / `or`) filters, timestamp filters and property filters
+on text (title, rich text, url, email, phone number, select), number, checkbox,
+multi-select, relation, people (and created / last edited by), files, date (and
+created / last edited time) and formula properties. Rollup filters aren't, and raise
+UnsupportedFilter.
+
+Results match Notion's closely but not exactly: text matching is case insensitive for
+ASCII only, and dates are compared in UTC.
+
+Columns used for filtering or sorting are indexed the first time they're queried, so
+repeated queries get faster.
+"""
+
+import datetime
+import typing
+import uuid
+
+from . import codec
+from .bulk import aiter_items
+from .models.page import Page
+from .models.query_database import Direction, QueryDatabase, QueryDatabaseSort
+from .models.response import parse_model
+from .sqlite import PageStore, quote, to_sql_timestamp
+
+TEXT_TYPES = frozenset(
+    {"title", "rich_text", "url", "email", "phone_number", "select", "string"}
+)
+LIST_TYPES = frozenset({"multi_select", "relation", "files"})
+USER_TYPES = frozenset({"people", "created_by", "last_edited_by"})
+DATE_TYPES = frozenset({"date", "created_time", "last_edited_time"})
+
+COMPARISONS = {
+    "equals": "=",
+    "does_not_equal": "IS NOT",
+    "greater_than": ">",
+    "less_than": "<",
+    "greater_than_or_equal_to": ">=",
+    "less_than_or_equal_to": "<=",
+    "before": "<",
+    "after": ">",
+    "on_or_before": "<=",
+    "on_or_after": ">=",
+}
+# Relative date conditions, as the number of days either side of today they cover
+RELATIVE_DATES = {
+    "past_week": -7,
+    "past_month": -30,
+    "past_year": -365,
+    "next_week": 7,
+    "next_month": 30,
+    "next_year": 365,
+}
+
+
+class UnsupportedFilter(ValueError):
+    """A filter or sort which can't be evaluated against a local copy"""
+
+
+def _like_pattern(value: str, prefix: str = "%", suffix: str = "%") -> str:
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return prefix + escaped + suffix
+
+
+def _normalize_id(value: typing.Any) -> str:
+    """Ids as they're stored, with dashes (filters may leave them out)"""
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        return str(value)
+
+
+class FilterCompiler:
+    """Turns filter JSON into an SQL expression over a store's columns
+
+    Parameters are collected in `params` and the columns used in `columns`.
+    """
+
+    def __init__(self, store: PageStore):
+        self.store = store
+        self.params: typing.List[typing.Any] = []
+        self.columns: typing.Set[str] = set()
+        # SQL columns and type of each property
+        self.properties: typing.Dict[str, typing.Tuple[str, typing.List[str]]] = {}
+        for column, name in zip(store.column_plan.columns, store.property_columns):
+            _, names = self.properties.setdefault(
+                column.property_name, (column.property_type, [])
+            )
+            names.append(name)
+
+    def compile(self, filter: typing.Dict[str, typing.Any]) -> str:
+        if "and" in filter or "or" in filter:
+            operator = "and" if "and" in filter else "or"
+            parts = [f"({self.compile(part)})" for part in filter[operator]]
+            if not parts:
+                return "1" if operator == "and" else "0"
+            return f" {operator.upper()} ".join(parts)
+        if "timestamp" in filter:
+            timestamp = filter["timestamp"]
+            if timestamp not in ("created_time", "last_edited_time"):
+                raise UnsupportedFilter(f"Unknown timestamp: {timestamp=}")
+            return self._date(self._column(timestamp), filter[timestamp])
+        if "property" not in filter:
+            raise UnsupportedFilter(f"Can't understand {filter=}")
+        name = filter["property"]
+        if name not in self.properties:
+            raise UnsupportedFilter(f"No such property: {name=}")
+        property_type, columns = self.properties[name]
+        (filter_type,) = [key for key in filter if key != "property"]
+        condition = filter[filter_type]
+        if filter_type == "formula":
+            ((result_type, condition),) = condition.items()
+            return self._formula(self._column(columns[0]), result_type, condition)
+        if filter_type in TEXT_TYPES:
+            return self._text(self._column(columns[0]), condition)
+        if filter_type == "number":
+            return self._compare(self._column(columns[0]), condition)
+        if filter_type == "checkbox":
+            return self._compare(
+                self._column(columns[0]),
+                {key: int(value) for key, value in condition.items()},
+            )
+        if filter_type in LIST_TYPES:
+            return self._list(self._column(columns[0]), condition)
+        if filter_type in USER_TYPES:
+            return self._users(name, property_type, condition)
+        if filter_type in DATE_TYPES:
+            return self._date(self._column(columns[0]), condition)
+        raise UnsupportedFilter(f"Can't filter on {filter_type=} offline")
+
+    def _column(self, name: str) -> str:
+        self.columns.add(name)
+        return quote(name)
+
+    def _param(self, value: typing.Any) -> str:
+        self.params.append(value)
+        return "?"
+
+    @staticmethod
+    def _condition(
+        condition: typing.Dict[str, typing.Any],
+    ) -> typing.Tuple[str, typing.Any]:
+        if len(condition) != 1:
+            raise UnsupportedFilter(f"Expected a single condition: {condition=}")
+        ((key, value),) = condition.items()
+        return key, value
+
+    def _compare(self, column: str, condition: typing.Dict[str, typing.Any]) -> str:
+        key, value = self._condition(condition)
+        if key == "is_empty":
+            return f"{column} IS NULL"
+        if key == "is_not_empty":
+            return f"{column} IS NOT NULL"
+        if key not in COMPARISONS:
+            raise UnsupportedFilter(f"Unknown condition: {key=}")
+        return f"{column} {COMPARISONS[key]} {self._param(value)}"
+
+    def _text(self, column: str, condition: typing.Dict[str, typing.Any]) -> str:
+        key, value = self._condition(condition)
+        if key == "is_empty":
+            return f"({column} IS NULL OR {column} = '')"
+        if key == "is_not_empty":
+            return f"({column} IS NOT NULL AND {column} != '')"
+        if key in ("equals", "does_not_equal"):
+            return self._compare(column, condition)
+        patterns = {
+            "contains": ("%", "%"),
+            "does_not_contain": ("%", "%"),
+            "starts_with": ("", "%"),
+            "ends_with": ("%", ""),
+        }
+        if key not in patterns:
+            raise UnsupportedFilter(f"Unknown text condition: {key=}")
+        like = f"{column} LIKE {self._param(_like_pattern(value, *patterns[key]))} ESCAPE '\\'"
+        if key == "does_not_contain":
+            return f"({column} IS NULL OR NOT {like})"
+        return like
+
+    def _list(self, column: str, condition: typing.Dict[str, typing.Any]) -> str:
+        key, value = self._condition(condition)
+        if key == "is_empty":
+            return f"({column} IS NULL OR {column} = '[]')"
+        if key == "is_not_empty":
+            return f"({column} IS NOT NULL AND {column} != '[]')"
+        exists = (
+            f"EXISTS (SELECT 1 FROM json_each({column}) "
+            f"WHERE json_each.value = {self._param(_normalize_id(value))})"
+        )
+        if key == "contains":
+            return exists
+        if key == "does_not_contain":
+            return f"NOT {exists}"
+        raise UnsupportedFilter(f"Unknown list condition: {key=}")
+
+    def _users(
+        self, name: str, property_type: str, condition: typing.Dict[str, typing.Any]
+    ) -> str:
+        """People are matched by id, which is only in the page JSON"""
+        if '"' in name:
+            raise UnsupportedFilter(f"Can't filter on people in {name=} offline")
+        key, value = self._condition(condition)
+        page = quote("page")
+        if property_type == "people":
+            path = self._param(f'$.properties."{name}".people')
+            people = f"SELECT 1 FROM json_each({page}, {path})"
+            if key == "is_empty":
+                return f"NOT EXISTS ({people})"
+            if key == "is_not_empty":
+                return f"EXISTS ({people})"
+            exists = (
+                f"EXISTS ({people} WHERE json_extract(json_each.value, '$.id') = "
+                f"{self._param(_normalize_id(value))})"
+            )
+        else:
+            path = self._param(f'$.properties."{name}".{property_type}.id')
+            exists = (
+                f"json_extract({page}, {path}) = {self._param(_normalize_id(value))}"
+            )
+        if key == "contains":
+            return exists
+        if key == "does_not_contain":
+            return f"NOT {exists}"
+        raise UnsupportedFilter(f"Unknown people condition: {key=}")
+
+    def _date(self, column: str, condition: typing.Dict[str, typing.Any]) -> str:
+        key, value = self._condition(condition)
+        if key in RELATIVE_DATES:
+            today = datetime.datetime.now(datetime.timezone.utc).date()
+            other = today + datetime.timedelta(days=RELATIVE_DATES[key])
+            start, end = sorted([today, other])
+            return (
+                f"substr({column}, 1, 10) BETWEEN "
+                f"{self._param(start.isoformat())} AND {self._param(end.isoformat())}"
+            )
+        if key in ("is_empty", "is_not_empty"):
+            return self._compare(column, condition)
+        if key not in COMPARISONS:
+            raise UnsupportedFilter(f"Unknown date condition: {key=}")
+        if len(value) == 10:
+            # Whole days, compare on the date part
+            return f"substr({column}, 1, 10) {COMPARISONS[key]} {self._param(value)}"
+        value = to_sql_timestamp(
+            datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+        )
+        return f"{column} {COMPARISONS[key]} {self._param(value)}"
+
+    def _formula(
+        self, column: str, result_type: str, condition: typing.Dict[str, typing.Any]
+    ) -> str:
+        """Formula values are stored as text, as in CSV output"""
+        if result_type == "string":
+            return self._text(column, condition)
+        if result_type == "number":
+            return self._compare(f"CAST({column} AS REAL)", condition)
+        if result_type == "checkbox":
+            return self._compare(
+                column, {key: str(bool(value)) for key, value in condition.items()}
+            )
+        if result_type == "date":
+            return self._date(column, condition)
+        raise UnsupportedFilter(f"Can't filter on formula {result_type=} offline")
+
+
+def compile_sorts(
+    store: PageStore, sorts: typing.Iterable[QueryDatabaseSort]
+) -> typing.Tuple[str, typing.List[str]]:
+    """ORDER BY clause for the sorts, and the columns used
+
+    Like Notion, empty values go last.
+    """
+    first_columns: typing.Dict[str, str] = {}
+    for column, name in zip(store.column_plan.columns, store.property_columns):
+        first_columns.setdefault(column.property_name, name)
+    terms = []
+    columns = []
+    for sort in sorts:
+        if sort.timestamp is not None:
+            if sort.timestamp not in ("created_time", "last_edited_time"):
+                raise UnsupportedFilter(f"Unknown timestamp: {sort.timestamp=}")
+            name = sort.timestamp
+        elif sort.property in first_columns:
+            name = first_columns[sort.property]
+        else:
+            raise UnsupportedFilter(f"No such property: {sort.property=}")
+        direction = "DESC" if sort.direction == Direction.descending else "ASC"
+        terms.append(f"{quote(name)} IS NULL, {quote(name)} {direction}")
+        columns.append(name)
+    return ("ORDER BY " + ", ".join(terms) if terms else ""), columns
+
+
+def query_store(
+    store: PageStore, query: QueryDatabase, limit: typing.Optional[int] = None
+) -> typing.Iterator[str]:
+    """Run a query against the store, yielding the JSON of each matching page"""
+    compiler = FilterCompiler(store)
+    where = f"WHERE {compiler.compile(query.filter)}" if query.filter else ""
+    order_by, sort_columns = compile_sorts(store, query.sorts or [])
+    for column in compiler.columns | set(sort_columns):
+        store.ensure_index(column)
+    params = list(compiler.params)
+    limit_clause = ""
+    if limit is not None:
+        limit_clause = "LIMIT ?"
+        params.append(limit)
+    cursor = store.connection.execute(
+        f"SELECT {quote('page')} FROM {quote(store.table)} "
+        f"{where} {order_by} {limit_clause}",
+        params,
+    )
+    for (page,) in cursor:
+        yield page
+
+
+async def query_pages(
+    store: PageStore,
+    query: QueryDatabase,
+    raw: bool = False,
+    limit: typing.Optional[int] = None,
+) -> typing.AsyncIterator[typing.Union[Page, bytes]]:
+    """Like `NotionAsyncClient.query_database` but against the store
+
+    With `raw` pages are yielded as JSON bytes, like `query_database_raw`.
+    """
+    async for text in aiter_items(query_store(store, query, limit=limit)):
+        if raw:
+            yield text.encode("UTF-8")
+        else:
+            # The store's pages were already validated when they were fetched
+            yield parse_model(Page, codec.loads(text), validate=False)
@@ -0,0 +1,109 @@
+"""Client side rate limiting
+
+Notion allows an average of three requests per second per integration, with some
+bursts allowed. Requests over the limit get a HTTP 429 with a Retry-After header.
+
+See https://developers.notion.com/reference/request-limits
+"""
+
+import asyncio
+import datetime
+import email.utils
+import logging
+import time
+import typing
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_REQUESTS_PER_SECOND = 3.0
+# Allow for floating point error when refilling, otherwise we can end up sleeping for
+# intervals too small to advance the clock
+EPSILON = 1e-9
+
+
+class TokenBucket:
+    """Async token bucket rate limiter
+
+    Tokens are added at `rate` per second up to `capacity`, each request takes one.
+    Waiters are served in the order they arrived.
+
+    `clock` and `sleep` can be swapped out for testing.
+    """
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_REQUESTS_PER_SECOND,
+        capacity: typing.Optional[float] = None,
+        clock: typing.Callable[[], float] = time.monotonic,
+        sleep: typing.Callable[[float], typing.Awaitable[typing.Any]] = asyncio.sleep,
+    ):
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive: {rate=}")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.capacity
+        self.updated_at = clock()
+        self.paused_until = 0.0
+        # Created lazily so the lock is bound to the running event loop
+        self._lock: typing.Optional[asyncio.Lock] = None
+
+    def _refill(self, now: float):
+        elapsed = max(0.0, now - self.updated_at)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        """Wait until a request is allowed to go out"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = self.clock()
+                if now < self.paused_until:
+                    await self.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1 - EPSILON:
+                    self.tokens = max(0.0, self.tokens - 1)
+                    return
+                await self.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Hold back all requests for the given number of seconds
+
+        Used when the server tells us to back off (e.g. via Retry-After).
+        """
+        now = self.clock()
+        LOG.debug(f"Pausing requests for {seconds=}")
+        self.paused_until = max(self.paused_until, now + seconds)
+        # Restart filling from empty once the pause is over to avoid a burst
+        self.tokens = 0.0
+        self.updated_at = self.paused_until
+
+
+def parse_retry_after(
+    value: typing.Optional[str],
+    now: typing.Optional[datetime.datetime] = None,
+) -> typing.Optional[float]:
+    """Parse a Retry-After header into seconds
+
+    Handles both delay-seconds and HTTP-date forms, returns None if missing or invalid.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+    if now is None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+    return max(0.0, (retry_at - now).total_seconds())
@@ -0,0 +1,86 @@
+"""Retrying transient failures
+
+Timeouts, dropped connections and HTTP 5xx gateway errors are retried with jittered
+exponential backoff, but only for requests which are safe to repeat.
+"""
+
+import dataclasses
+import logging
+import random
+import typing
+
+import httpx
+
+LOG = logging.getLogger(__name__)
+
+# Methods which can be repeated without changing the outcome
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# Errors which might go away if we try again
+RETRYABLE_EXCEPTIONS = (
+    httpx.TimeoutException,
+    httpx.NetworkError,
+    httpx.RemoteProtocolError,
+)
+
+# Errors where the request never reached the server, so even writes can be retried
+UNSENT_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+@dataclasses.dataclass(frozen=True)
+class RetryPolicy:
+    """How to retry a failed request
+
+    max_attempts includes the first attempt, so 1 disables retries.
+
+    Backoff uses "full jitter": a random delay between 0 and
+    min(backoff_max, backoff_base * 2 ** (attempt - 1)).
+    """
+
+    max_attempts: int = 5
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    retry_statuses: typing.FrozenSet[int] = frozenset({500, 502, 503, 504})
+
+    def get_backoff(
+        self, attempt: int, rand: typing.Callable[[], float] = random.random
+    ) -> float:
+        """Delay before the next try, after `attempt` attempts have failed"""
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return rand() * ceiling
+
+
+NO_RETRIES = RetryPolicy(max_attempts=1)
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+DEFAULT_RETRY_POLICIES: typing.Dict[str, RetryPolicy] = {
+    "GET": DEFAULT_RETRY_POLICY,
+    "POST": DEFAULT_RETRY_POLICY,
+    "PATCH": DEFAULT_RETRY_POLICY,
+    "DELETE": DEFAULT_RETRY_POLICY,
+}
+
+
+class RetryBudget:
+    """Limits retries to a fraction of all requests
+
+    Every request adds `ratio` to the budget (up to `capacity`), every retry takes one
+    away. This stops a widespread outage from multiplying our request volume while
+    still letting occasional blips through. `min_retries` are available up front.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10, capacity: int = 100):
+        self.ratio = ratio
+        self.capacity = capacity
+        self.balance = float(min_retries)
+
+    def deposit(self):
+        self.balance = min(float(self.capacity), self.balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Try to take a retry from the budget, returns False if exhausted"""
+        if self.balance < 1:
+            return False
+        self.balance -= 1
+        return True
@@ -0,0 +1,268 @@
+"""Querying a large database in parallel
+
+A database query is a chain of cursors, each page of results needs the cursor from
+the one before, so a big database takes many sequential round trips. Here the query is
+split into shards covering disjoint `created_time` ranges (found with a quick probe of
+the earliest and latest pages), each with its own cursor chain. The chains run
+concurrently, still within the client's rate limit, and their results are merged.
+
+Without sorts pages come out in whatever order they arrive. With sorts the shards are
+k-way merged, which needs sort keys matching Notion's order. That's only possible for
+timestamps, numbers, checkboxes and dates: empty values go last and dates are compared
+by their start. Notion sorts text with its own collation and selects by the order of
+their options, so queries sorted on anything else run as a single query instead.
+
+`created_time` doesn't change, so pages can't move between shards while the query
+runs.
+"""
+
+import asyncio
+import datetime
+import functools
+import logging
+import typing
+import uuid
+
+from pydantic import datetime_parse
+
+from . import codec
+from .bulk import aclosing, merge, merge_sorted
+from .client import NotionAsyncClient
+from .columns import DEFAULT_PROPERTY_COLUMNS, PROPERTY_COLUMNS
+from .models.page import Page
+from .models.query_database import Direction, QueryDatabase, QueryDatabaseSort
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_SHARDS = 4
+# Property types whose order can be reproduced locally for merging sorted shards
+MERGEABLE_PROPERTY_TYPES = frozenset(
+    {"number", "checkbox", "date", "created_time", "last_edited_time"}
+)
+
+
+def _make_query(
+    fields: typing.Dict[str, typing.Any], filter: typing.Optional[dict]
+) -> QueryDatabase:
+    # Only set the filter if there is one, unset fields aren't sent
+    if filter is not None:
+        fields = {**fields, "filter": filter}
+    return QueryDatabase.parse_obj(fields)
+
+
+async def probe_created_times(
+    client: NotionAsyncClient, database_id: uuid.UUID, filter: typing.Optional[dict]
+) -> typing.Optional[typing.Tuple[datetime.datetime, datetime.datetime]]:
+    """created_time of the earliest and latest matching pages, None if there are none"""
+
+    async def first(direction: Direction) -> typing.Optional[datetime.datetime]:
+        probe = _make_query(
+            {
+                "sorts": [{"timestamp": "created_time", "direction": direction}],
+                "page_size": 1,
+            },
+            filter,
+        )
+        response = await client.api_request(
+            "POST",
+            client.base_url / "v1/databases" / str(database_id) / "query",
+            content=codec.dumps_model(probe, exclude_unset=True),
+            # A query only reads, so retry it like the shards' own queries are
+            idempotent=True,
+        )
+        results = response.obj["results"]
+        if not results:
+            return None
+        return datetime_parse.parse_datetime(results[0]["created_time"])
+
+    earliest, latest = await asyncio.gather(
+        first(Direction.ascending), first(Direction.descending)
+    )
+    if earliest is None or latest is None:
+        return None
+    return earliest, latest
+
+
+def shard_boundaries(
+    earliest: datetime.datetime, latest: datetime.datetime, shards: int
+) -> typing.List[datetime.datetime]:
+    """Times splitting earliest to latest into up to `shards` even ranges
+
+    Notion's times are to the minute, so boundaries are too. There are fewer when the
+    range is too short to split that many ways.
+    """
+    step = (latest - earliest) / shards
+    boundaries: typing.List[datetime.datetime] = []
+    for i in range(1, shards):
+        boundary = (earliest + step * i).replace(second=0, microsecond=0)
+        if boundary > earliest and (not boundaries or boundary > boundaries[-1]):
+            boundaries.append(boundary)
+    return boundaries
+
+
+def _time_condition(condition: str, value: datetime.datetime) -> dict:
+    return {"timestamp": "created_time", "created_time": {condition: value.isoformat()}}
+
+
+def shard_filters(
+    boundaries: typing.List[datetime.datetime], filter: typing.Optional[dict] = None
+) -> typing.List[typing.Optional[dict]]:
+    """A filter per shard, each the given filter and a created_time range
+
+    The first shard has no lower bound and the last no upper bound, so pages created
+    after the probe still turn up.
+    """
+    edges: typing.List[typing.Optional[datetime.datetime]] = [None, *boundaries, None]
+    filters: typing.List[typing.Optional[dict]] = []
+    for lower, upper in zip(edges, edges[1:]):
+        conditions = []
+        if lower is not None:
+            conditions.append(_time_condition("on_or_after", lower))
+        if upper is not None:
+            conditions.append(_time_condition("before", upper))
+        if filter is not None and list(filter) == ["and"]:
+            # Extend rather than nest, Notion limits how deep filters go
+            conditions = filter["and"] + conditions
+        elif filter is not None:
+            conditions.insert(0, filter)
+        if not conditions:
+            filters.append(None)
+        elif len(conditions) == 1:
+            filters.append(conditions[0])
+        else:
+            filters.append({"and": conditions})
+    return filters
+
+
+@functools.total_ordering
+class _Descending:
+    """Reverses the ordering of a value"""
+
+    def __init__(self, value: typing.Any):
+        self.value = value
+
+    def __eq__(self, other: typing.Any) -> bool:
+        return self.value == other.value
+
+    def __lt__(self, other: typing.Any) -> bool:
+        return other.value < self.value
+
+
+def _sortable(value: typing.Any) -> typing.Any:
+    if isinstance(value, datetime.datetime):
+        return value if value.tzinfo else value.replace(tzinfo=datetime.timezone.utc)
+    if isinstance(value, datetime.date):
+        # Comparable with datetimes, at the start of the day
+        return datetime.datetime(
+            value.year, value.month, value.day, tzinfo=datetime.timezone.utc
+        )
+    return value
+
+
+def _property_value(page: Page, name: str) -> typing.Any:
+    prop = page.properties.get(name)
+    if prop is None:
+        return None
+    _, get = PROPERTY_COLUMNS.get(prop.type, DEFAULT_PROPERTY_COLUMNS)[0]
+    value = get(prop)
+    if value is None or value == "" or value == []:
+        return None
+    return getattr(value, "start", value)
+
+
+def sort_key(
+    sorts: typing.Sequence[QueryDatabaseSort],
+) -> typing.Callable[[Page], typing.Tuple]:
+    """Key for ordering pages the way the sorts ask, empty values last
+
+    Only matches Notion's order for sorts allowed by `can_merge_sorts`.
+    """
+
+    def key(page: Page) -> typing.Tuple:
+        parts = []
+        for sort in sorts:
+            if sort.timestamp is not None:
+                value = getattr(page, sort.timestamp)
+            else:
+                value = _property_value(page, sort.property or "")
+            if value is None:
+                parts.append((1, None))
+                continue
+            value = _sortable(value)
+            if sort.direction == Direction.descending:
+                value = _Descending(value)
+            parts.append((0, value))
+        return tuple(parts)
+
+    return key
+
+
+async def can_merge_sorts(
+    client: NotionAsyncClient,
+    database_id: uuid.UUID,
+    sorts: typing.Sequence[QueryDatabaseSort],
+) -> bool:
+    """Whether `sort_key` orders pages the same way Notion does for these sorts"""
+    names = [sort.property for sort in sorts if sort.timestamp is None]
+    if not names:
+        return True
+    database = await client.get_database(database_id)
+    return all(
+        name in database.properties
+        and database.properties[name].type in MERGEABLE_PROPERTY_TYPES
+        for name in names
+    )
+
+
+async def query_database_sharded(
+    client: NotionAsyncClient,
+    database_id: uuid.UUID,
+    query: QueryDatabase,
+    shards: int = DEFAULT_SHARDS,
+    limit: typing.Optional[int] = None,
+) -> typing.AsyncIterator[Page]:
+    """Like `NotionAsyncClient.query_database`, but running `shards` queries at once
+
+    With a `limit` each shard fetches at most that many pages, as any of them could
+    hold the first ones, and the shards are closed once enough have been merged.
+
+    Queries sorted in a way the shards can't be merged in (see `can_merge_sorts`) are
+    run unsharded, so the order is still Notion's.
+    """
+    if shards < 1:
+        raise ValueError(f"Shards must be at least 1: {shards=}")
+    if limit == 0:
+        return
+    if query.sorts and not await can_merge_sorts(client, database_id, query.sorts):
+        LOG.warning(
+            f"Can't merge shards sorted by {query.sorts=} in Notion's order, "
+            "querying without sharding"
+        )
+        async with aclosing(
+            client.query_database(database_id, query, limit=limit)
+        ) as pages:
+            async for page in pages:
+                yield page
+        return
+    span = await probe_created_times(client, database_id, query.filter)
+    if span is None:
+        return
+    boundaries = shard_boundaries(*span, shards)
+    filters = shard_filters(boundaries, query.filter)
+    LOG.info(f"Querying {database_id=} in {len(filters)} shards split at {boundaries=}")
+    fields = query.dict(exclude_unset=True, exclude={"filter", "start_cursor"})
+    streams = [
+        client.query_database(database_id, _make_query(fields, filter), limit=limit)
+        for filter in filters
+    ]
+    if query.sorts:
+        merged = merge_sorted(streams, key=sort_key(query.sorts))
+    else:
+        merged = merge(streams)
+    count = 0
+    async with aclosing(merged) as pages:
+        async for page in pages:
+            yield page
+            count += 1
+            if count == limit:
+                break
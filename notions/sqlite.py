@@ -0,0 +1,289 @@
+"""Storing the pages of a database in SQLite
+
+Pages go in a table with a column per property, laid out by a ColumnPlan so nested
+values are expanded the same way as in CSV output. Checkboxes are stored as 0 or 1,
+numbers as REAL, times as ISO 8601 text in UTC (so they sort correctly) and lists as
+JSON arrays. The full Notion JSON of each page is kept in the `page` column, so pages
+can be loaded back as Page models.
+
+The `id` column is the primary key (which SQLite indexes) and `last_edited_time` is
+indexed too.
+"""
+
+import datetime
+import logging
+import os
+import sqlite3
+import typing
+
+from . import codec
+from .bulk import aiter_items
+from .columns import CORE_HEADERS, ColumnPlan, format_cell
+from .models.database import Database
+from .models.page import Page
+
+LOG = logging.getLogger(__name__)
+
+PAGES_TABLE = "pages"
+META_TABLE = "notions_meta"
+PAGE_COLUMN = "page"
+DEFAULT_BATCH_SIZE = 500
+
+SQL_TYPES = {
+    "bool": "INTEGER",
+    "number": "REAL",
+    "timestamp": "TEXT",
+    "list": "TEXT",
+    "string": "TEXT",
+}
+
+Converter = typing.Callable[[typing.Any], typing.Any]
+
+
+def quote(name: str) -> str:
+    """Quote an identifier (table or column name) for SQL"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def to_sql_timestamp(value: typing.Any) -> typing.Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(datetime.timezone.utc)
+        return value.isoformat()
+    return value.isoformat()
+
+
+def _to_sql_bool(value: typing.Any) -> typing.Optional[int]:
+    return None if value is None else int(bool(value))
+
+
+def _to_sql_number(value: typing.Any) -> typing.Optional[float]:
+    return None if value is None else float(value)
+
+
+def _to_sql_list(value: typing.Any) -> typing.Optional[str]:
+    if value is None:
+        return None
+    return codec.dumps([format_cell(item) for item in value]).decode("UTF-8")
+
+
+def _to_sql_string(value: typing.Any) -> typing.Optional[str]:
+    return None if value is None else format_cell(value)
+
+
+SQL_CONVERTERS: typing.Dict[str, Converter] = {
+    "bool": _to_sql_bool,
+    "number": _to_sql_number,
+    "timestamp": to_sql_timestamp,
+    "list": _to_sql_list,
+    "string": _to_sql_string,
+}
+
+
+class PageStore:
+    """A SQLite table of pages, laid out according to a ColumnPlan
+
+    Property columns are named after the plan's headers, with a numeric suffix where
+    they would clash with another column (e.g. a property called "ID").
+    """
+
+    def __init__(
+        self,
+        connection: sqlite3.Connection,
+        column_plan: ColumnPlan,
+        table: str = PAGES_TABLE,
+    ):
+        self.connection = connection
+        self.column_plan = column_plan
+        self.table = table
+        used = set(CORE_HEADERS) | {PAGE_COLUMN}
+        # SQL column name for each of the plan's columns
+        self.property_columns: typing.List[str] = []
+        for column in column_plan.columns:
+            name = column.header
+            suffix = 2
+            while name in used:
+                name = f"{column.header}_{suffix}"
+                suffix += 1
+            used.add(name)
+            self.property_columns.append(name)
+        self.column_types = ["TEXT"] * len(CORE_HEADERS) + [
+            SQL_TYPES[column.kind] for column in column_plan.columns
+        ]
+        self._converters = [
+            _to_sql_string,
+            _to_sql_string,
+            _to_sql_string,
+            to_sql_timestamp,
+            to_sql_timestamp,
+        ] + [SQL_CONVERTERS[column.kind] for column in column_plan.columns]
+        self.columns = CORE_HEADERS + self.property_columns + [PAGE_COLUMN]
+        placeholders = ", ".join("?" for _ in self.columns)
+        self._upsert_sql = (
+            f"INSERT OR REPLACE INTO {quote(table)} "
+            f"({', '.join(quote(c) for c in self.columns)}) VALUES ({placeholders})"
+        )
+
+    @classmethod
+    def open(
+        cls,
+        path: str,
+        database: typing.Union[Database, ColumnPlan],
+        table: str = PAGES_TABLE,
+    ) -> "PageStore":
+        """Open (or create) a store in the SQLite file at path"""
+        column_plan = (
+            database
+            if isinstance(database, ColumnPlan)
+            else ColumnPlan.from_database(database)
+        )
+        store = cls(sqlite3.connect(path), column_plan, table=table)
+        store.create_tables()
+        return store
+
+    @classmethod
+    def load(cls, path: str, table: str = PAGES_TABLE) -> "PageStore":
+        """Open an existing store, laid out for the database it was written from"""
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No page store at {path=}")
+        connection = sqlite3.connect(path)
+        try:
+            row = connection.execute(
+                f"SELECT value FROM {quote(META_TABLE)} WHERE key = ?", ("database",)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            row = None
+        if row is None:
+            connection.close()
+            raise ValueError(f"{path=} has no database schema, it isn't a page store")
+        database = Database.parse_raw(row[0])
+        return cls(connection, ColumnPlan.from_database(database), table=table)
+
+    def close(self):
+        self.connection.close()
+
+    def create_tables(self):
+        """Create the tables and indexes, adding columns for any new properties"""
+        table = quote(self.table)
+        definitions = [
+            f"{quote(name)} {sql_type}" + (" PRIMARY KEY" if name == "id" else "")
+            for name, sql_type in self._column_definitions()
+        ]
+        with self.connection:
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(definitions)})"
+            )
+            existing = {
+                row[1] for row in self.connection.execute(f"PRAGMA table_info({table})")
+            }
+            for name, sql_type in self._column_definitions():
+                if name not in existing:
+                    LOG.info(f"Adding column {name=} to {self.table=}")
+                    self.connection.execute(
+                        f"ALTER TABLE {table} ADD COLUMN {quote(name)} {sql_type}"
+                    )
+            self.connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {quote(self.table + '_last_edited_time')} "
+                f"ON {table} ({quote('last_edited_time')})"
+            )
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {quote(META_TABLE)} "
+                "(key TEXT PRIMARY KEY, value TEXT)"
+            )
+        if self.column_plan.database is not None:
+            self.set_meta(
+                "database",
+                codec.dumps_model(self.column_plan.database).decode("UTF-8"),
+            )
+
+    def ensure_index(self, column: str):
+        """Index a column, if it isn't already"""
+        with self.connection:
+            self.connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {quote(self.table + '_' + column)} "
+                f"ON {quote(self.table)} ({quote(column)})"
+            )
+
+    def _column_definitions(self) -> typing.List[typing.Tuple[str, str]]:
+        return list(zip(self.columns, self.column_types + ["TEXT"]))
+
+    def get_meta(self, key: str) -> typing.Optional[str]:
+        row = self.connection.execute(
+            f"SELECT value FROM {quote(META_TABLE)} WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def set_meta(self, key: str, value: str):
+        with self.connection:
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO {quote(META_TABLE)} (key, value) VALUES (?, ?)",
+                (key, value),
+            )
+
+    def row(self, page: Page) -> typing.Tuple[typing.Any, ...]:
+        values = [
+            convert(value)
+            for convert, value in zip(self._converters, self.column_plan.values(page))
+        ]
+        values.append(codec.dumps_model(page).decode("UTF-8"))
+        return tuple(values)
+
+    def last_edited_times(self, ids: typing.Iterable[str]) -> typing.Dict[str, str]:
+        """Stored last_edited_time of each of the pages which are in the table"""
+        ids = list(ids)
+        times: typing.Dict[str, str] = {}
+        # Stay well under SQLite's limit on the number of parameters
+        for start in range(0, len(ids), DEFAULT_BATCH_SIZE):
+            chunk = ids[start : start + DEFAULT_BATCH_SIZE]
+            placeholders = ", ".join("?" for _ in chunk)
+            times.update(
+                self.connection.execute(
+                    f"SELECT id, last_edited_time FROM {quote(self.table)} "
+                    f"WHERE id IN ({placeholders})",
+                    chunk,
+                )
+            )
+        return times
+
+    def page_ids(self) -> typing.Set[str]:
+        return {
+            row[0]
+            for row in self.connection.execute(f"SELECT id FROM {quote(self.table)}")
+        }
+
+    def delete_pages(self, ids: typing.Iterable[str]) -> int:
+        """Delete pages by id in a single transaction, returns how many"""
+        with self.connection:
+            cursor = self.connection.executemany(
+                f"DELETE FROM {quote(self.table)} WHERE id = ?", ((id,) for id in ids)
+            )
+        return cursor.rowcount
+
+    def upsert_pages(self, pages: typing.Iterable[Page]) -> int:
+        """Insert or replace pages in a single transaction, returns how many"""
+        rows = [self.row(page) for page in pages]
+        with self.connection:
+            self.connection.executemany(self._upsert_sql, rows)
+        return len(rows)
+
+    async def write_pages(
+        self,
+        pages: typing.Union[typing.Iterable[Page], typing.AsyncIterable[Page]],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> int:
+        """Upsert pages as they arrive, committing every `batch_size` pages
+
+        Returns the number of pages written.
+        """
+        count = 0
+        batch: typing.List[Page] = []
+        async for page in aiter_items(pages):
+            batch.append(page)
+            if len(batch) >= batch_size:
+                count += self.upsert_pages(batch)
+                batch.clear()
+        if batch:
+            count += self.upsert_pages(batch)
+        return count
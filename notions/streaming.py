@@ -0,0 +1,242 @@
+"""Incremental decoding of paginated list responses
+
+Notion's list responses look like:
+
+    {"object": "list", "results": [{...}, {...}], "next_cursor": "...", "has_more": true}
+
+ListResponseParser is fed the response body as it arrives and hands back each item of
+`results` (as the raw bytes of that item) as soon as it's complete, rather than
+waiting for and decoding the whole body. The other top level fields are decoded when
+the body is finished.
+
+This is not a general purpose JSON parser, it only tracks enough structure to find
+where each value starts and ends. Each value is then decoded by notions.codec.
+"""
+
+import re
+import typing
+
+from . import codec
+
+_WHITESPACE = re.compile(rb"[ \t\n\r]*")
+# Characters which change nesting or string state, everything else can be skipped
+_STRUCTURAL = re.compile(rb'[{}\[\]"]')
+_STRING_SPECIAL = re.compile(rb'["\\]')
+# Scalars (numbers, true, false, null) end at the next delimiter
+_SCALAR_END = re.compile(rb"[,}\] \t\n\r]")
+
+_OPEN = frozenset(b"{[")
+_QUOTE = ord('"')
+_BACKSLASH = ord("\\")
+
+
+class StreamingParseError(ValueError):
+    pass
+
+
+class ListResponseParser:
+    """Incremental parser for a list response body
+
+    Call `feed` with each chunk of bytes, it returns the raw bytes of any complete
+    result items. Call `close` at the end to get the remaining top level fields.
+    """
+
+    # States of the top level object
+    EXPECT_OBJECT = "expect_object"
+    EXPECT_KEY = "expect_key"
+    IN_KEY = "in_key"
+    EXPECT_COLON = "expect_colon"
+    EXPECT_VALUE = "expect_value"
+    IN_VALUE = "in_value"
+    EXPECT_RESULTS = "expect_results"
+    EXPECT_ITEM = "expect_item"
+    IN_ITEM = "in_item"
+    AFTER_ITEM = "after_item"
+    AFTER_VALUE = "after_value"
+    DONE = "done"
+
+    def __init__(self, results_key: str = "results"):
+        self.results_key = results_key
+        self.fields: typing.Dict[str, typing.Any] = {}
+        self.result_count = 0
+        self._buffer = bytearray()
+        self._pos = 0
+        self._state = self.EXPECT_OBJECT
+        self._key: typing.Optional[str] = None
+        self._first_item = True
+        self._first_key = True
+        # Scanning state for the value currently being read
+        self._value_start = 0
+        self._scan_pos = 0
+        self._depth = 0
+        self._in_string = False
+
+    def feed(self, chunk: bytes) -> typing.List[bytes]:
+        """Add more of the body, returning any newly completed result items"""
+        self._buffer += chunk
+        items = self._parse(final=False)
+        self._compact()
+        return items
+
+    def close(self) -> typing.Dict[str, typing.Any]:
+        """Finish parsing, returning the top level fields other than the results"""
+        self._parse(final=True)
+        if self._state != self.DONE:
+            raise StreamingParseError(f"Incomplete response body ({self._state=})")
+        if self._buffer[self._pos :].strip():
+            raise StreamingParseError("Unexpected data after response body")
+        return self.fields
+
+    def _compact(self):
+        """Drop everything from the buffer we don't need any more"""
+        keep_from = self._pos
+        if self._state in (self.IN_KEY, self.IN_VALUE, self.IN_ITEM):
+            keep_from = self._value_start
+        if keep_from:
+            del self._buffer[:keep_from]
+            self._pos -= keep_from
+            self._value_start -= keep_from
+            self._scan_pos -= keep_from
+
+    def _skip_whitespace(self) -> bool:
+        """Move past whitespace, returns False if we ran out of buffer"""
+        match = _WHITESPACE.match(self._buffer, self._pos)
+        assert match is not None  # can always match an empty string
+        self._pos = match.end()
+        return self._pos < len(self._buffer)
+
+    def _expect(self, allowed: bytes) -> int:
+        char = self._buffer[self._pos]
+        if char not in allowed:
+            raise StreamingParseError(
+                f"Expected one of {allowed!r} at {self._pos}, got {bytes([char])!r}"
+            )
+        self._pos += 1
+        return char
+
+    def _start_value(self):
+        self._value_start = self._pos
+        self._scan_pos = self._pos
+        self._depth = 0
+        self._in_string = False
+
+    def _scan_value(self, final: bool) -> typing.Optional[int]:
+        """Carry on scanning the current value, returning its end once complete"""
+        buffer = self._buffer
+        pos = self._scan_pos
+        if pos == self._value_start and not self._in_string and self._depth == 0:
+            first = buffer[pos]
+            if first == _QUOTE:
+                self._in_string = True
+                pos += 1
+            elif first in _OPEN:
+                self._depth = 1
+                pos += 1
+            else:
+                match = _SCALAR_END.search(buffer, pos)
+                if match is not None:
+                    return match.start()
+                return len(buffer) if final else None
+        while True:
+            if self._in_string:
+                match = _STRING_SPECIAL.search(buffer, pos)
+                if match is None:
+                    self._scan_pos = len(buffer)
+                    return None
+                if buffer[match.start()] == _BACKSLASH:
+                    if match.start() + 1 >= len(buffer):
+                        # Come back for the escaped character once we have it
+                        self._scan_pos = match.start()
+                        return None
+                    pos = match.start() + 2
+                    continue
+                self._in_string = False
+                pos = match.end()
+                if self._depth == 0:
+                    return pos
+                continue
+            match = _STRUCTURAL.search(buffer, pos)
+            if match is None:
+                self._scan_pos = len(buffer)
+                return None
+            char = buffer[match.start()]
+            pos = match.end()
+            if char == _QUOTE:
+                self._in_string = True
+            elif char in _OPEN:
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    return pos
+
+    def _parse(self, final: bool) -> typing.List[bytes]:
+        items: typing.List[bytes] = []
+        while self._state != self.DONE:
+            if self._state in (self.IN_KEY, self.IN_VALUE, self.IN_ITEM):
+                end = self._scan_value(final)
+                if end is None:
+                    break
+                span = bytes(self._buffer[self._value_start : end])
+                self._pos = end
+                if self._state == self.IN_KEY:
+                    self._key = codec.loads(span)
+                    self._state = self.EXPECT_COLON
+                elif self._state == self.IN_VALUE:
+                    assert self._key is not None
+                    self.fields[self._key] = codec.loads(span)
+                    self._state = self.AFTER_VALUE
+                else:
+                    items.append(span)
+                    self.result_count += 1
+                    self._state = self.AFTER_ITEM
+                continue
+
+            if not self._skip_whitespace():
+                break
+
+            if self._state == self.EXPECT_OBJECT:
+                self._expect(b"{")
+                self._state = self.EXPECT_KEY
+            elif self._state == self.EXPECT_KEY:
+                if self._buffer[self._pos] == ord("}") and self._first_key:
+                    self._pos += 1
+                    self._state = self.DONE
+                    continue
+                self._first_key = False
+                if self._buffer[self._pos] != _QUOTE:
+                    raise StreamingParseError(f"Expected a key at {self._pos}")
+                self._start_value()
+                self._state = self.IN_KEY
+            elif self._state == self.EXPECT_COLON:
+                self._expect(b":")
+                if self._key == self.results_key:
+                    self._state = self.EXPECT_RESULTS
+                else:
+                    self._state = self.EXPECT_VALUE
+            elif self._state == self.EXPECT_VALUE:
+                self._start_value()
+                self._state = self.IN_VALUE
+            elif self._state == self.EXPECT_RESULTS:
+                self._expect(b"[")
+                self._first_item = True
+                self._state = self.EXPECT_ITEM
+            elif self._state == self.EXPECT_ITEM:
+                if self._buffer[self._pos] == ord("]") and self._first_item:
+                    self._pos += 1
+                    self._state = self.AFTER_VALUE
+                    continue
+                self._first_item = False
+                self._start_value()
+                self._state = self.IN_ITEM
+            elif self._state == self.AFTER_ITEM:
+                if self._expect(b",]") == ord(","):
+                    self._state = self.EXPECT_ITEM
+                else:
+                    self._state = self.AFTER_VALUE
+            elif self._state == self.AFTER_VALUE:
+                if self._expect(b",}") == ord(","):
+                    self._state = self.EXPECT_KEY
+                else:
+                    self._state = self.DONE
+        return items
@@ -0,0 +1,76 @@
+"""Benchmarks for parsing
+
+Run with `pytest -s -m slow tests/test_benchmark.py` to see the timings.
+"""
+
+import json
+import timeit
+import typing
+
+import pydantic
+import pytest
+
+from notions.models.construct import construct_model
+from notions.models.lazy import parse_lazy
+from notions.models.page import Page
+from notions.models.properties import PageProperty
+
+from .test_parse_page import EXAMPLE_PAGE_JSON
+
+pytestmark = pytest.mark.slow
+
+# The page properties as a plain union, which pydantic parses by trying each member in turn
+UndiscriminatedPageProperty = typing.Union[typing.get_args(typing.get_args(PageProperty)[0])]  # type: ignore
+
+
+class UndiscriminatedPage(Page):
+    properties: typing.Dict[str, UndiscriminatedPageProperty]  # type: ignore
+
+
+def best_time(func: typing.Callable[[], typing.Any], number: int = 50) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def test_benchmark_discriminated_page_properties():
+    obj = json.loads(EXAMPLE_PAGE_JSON)
+    assert UndiscriminatedPage.parse_obj(obj).dict() == Page.parse_obj(obj).dict()
+
+    undiscriminated = best_time(lambda: UndiscriminatedPage.parse_obj(obj))
+    discriminated = best_time(lambda: Page.parse_obj(obj))
+    print(
+        f"Page.parse_obj: {discriminated * 1e6:.0f}µs discriminated, "
+        f"{undiscriminated * 1e6:.0f}µs undiscriminated "
+        f"({undiscriminated / discriminated:.1f}x speedup)"
+    )
+    assert discriminated < undiscriminated
+
+
+def test_benchmark_construct_page():
+    obj = json.loads(EXAMPLE_PAGE_JSON)
+
+    validated = best_time(lambda: Page.parse_obj(obj))
+    constructed = best_time(lambda: construct_model(Page, obj))
+    print(
+        f"Page: {validated * 1e6:.0f}µs parse_obj, "
+        f"{constructed * 1e6:.0f}µs construct_model "
+        f"({validated / constructed:.1f}x speedup)"
+    )
+    assert constructed < validated
+
+
+def test_benchmark_lazy_page():
+    obj = json.loads(EXAMPLE_PAGE_JSON)
+    names = ["Name", "Number Property", "Select property"]
+
+    def parse_lazy_and_read():
+        page = parse_lazy(Page, obj)
+        return [page.properties[name] for name in names]
+
+    validated = best_time(lambda: Page.parse_obj(obj))
+    lazy = best_time(parse_lazy_and_read)
+    print(
+        f"Page reading {len(names)} of {len(obj['properties'])} properties: "
+        f"{validated * 1e6:.0f}µs parse_obj, {lazy * 1e6:.0f}µs lazy "
+        f"({validated / lazy:.1f}x speedup)"
+    )
+    assert lazy < validated
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import uuid
+
+import httpx
+
+from notions.cache import ObjectCache
+from notions.client import NotionAsyncClient
+from notions.models.page import UpdatePage
+
+from .test_parse_database import EXAMPLE_DATABASE_JSON
+from .test_parse_page import EXAMPLE_PAGE_JSON
+
+PAGE_ID = uuid.UUID("ccad10e7-c776-423e-9662-6ad5fb1256d6")
+DATABASE_ID = uuid.UUID("fff51adc-8d4e-414a-a2e3-17e69111c328")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entries_expire_per_type():
+    clock = FakeClock()
+    cache = ObjectCache(ttls={"page": 10, "database": 100}, size_of=len, clock=clock)
+    cache.put("page", PAGE_ID, "page")
+    cache.put("database", DATABASE_ID, "database")
+    cache.put("user", PAGE_ID, "not cached")
+    assert cache.get("page", str(PAGE_ID)) == "page"
+    assert cache.get("user", PAGE_ID) is None
+
+    clock.now = 10
+    assert cache.get("page", PAGE_ID) is None
+    assert cache.get("database", DATABASE_ID) == "database"
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.expirations) == (2, 2, 1)
+
+
+def test_least_recently_used_are_evicted():
+    cache = ObjectCache(max_entries=2, max_bytes=10, size_of=len)
+    cache.put("page", 1, "aaa")
+    cache.put("page", 2, "bbb")
+    cache.get("page", 1)
+    cache.put("page", 3, "ccc")
+    assert cache.get("page", 2) is None
+    assert cache.get("page", 1) == "aaa"
+
+    # Over max_bytes
+    cache.put("page", 4, "dddddddd")
+    assert len(cache) == 1
+    assert cache.size == 8
+    assert cache.stats.evictions == 3
+    cache.put("page", 5, "too big to cache")
+    assert cache.get("page", 5) is None
+
+
+def test_client_serves_cached_reads_and_updates_on_writes():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append((request.method, request.url.path))
+        if "databases" in request.url.path:
+            return httpx.Response(200, json=json.loads(EXAMPLE_DATABASE_JSON))
+        return httpx.Response(200, json=json.loads(EXAMPLE_PAGE_JSON))
+
+    async def main():
+        async with NotionAsyncClient(
+            "test-token",
+            transport=httpx.MockTransport(handler),
+            requests_per_second=None,
+            cache=ObjectCache(),
+        ) as client:
+            databases = [await client.get_database(DATABASE_ID) for _ in range(3)]
+            assert databases[0] is databases[2]
+            page = await client.get_page(PAGE_ID)
+            updated = await client.update_page(PAGE_ID, UpdatePage(properties={}))
+            assert updated is not page
+            assert await client.get_page(PAGE_ID) is updated
+            return client.cache
+
+    cache = asyncio.run(main())
+    assert [method for method, _ in requests] == ["GET", "GET", "PATCH"]
+    assert (cache.stats.hits, cache.stats.misses) == (3, 2)
+    assert cache.stats.invalidations == 1
+
+
+def test_client_sizes_entries_from_the_response_body():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if "databases" in request.url.path:
+            return httpx.Response(200, content=EXAMPLE_DATABASE_JSON)
+        return httpx.Response(200, content=EXAMPLE_PAGE_JSON)
+
+    def size_of(value) -> int:
+        raise AssertionError(f"Re-serialised {value=} to size it")
+
+    async def main():
+        async with NotionAsyncClient(
+            "test-token",
+            transport=httpx.MockTransport(handler),
+            requests_per_second=None,
+            lazy_properties=True,
+            cache=ObjectCache(size_of=size_of),
+        ) as client:
+            await client.get_page(PAGE_ID)
+            await client.get_database(DATABASE_ID)
+            return client.cache
+
+    cache = asyncio.run(main())
+    assert len(cache) == 2
+    assert cache.size == len(EXAMPLE_PAGE_JSON.encode()) + len(
+        EXAMPLE_DATABASE_JSON.encode()
+    )
@@ -0,0 +1,375 @@
+import asyncio
+import csv
+import datetime
+import decimal
+import io
+import json
+import pathlib
+import sqlite3
+import typing
+import uuid
+
+import httpx
+import pytest
+import yaml
+from typer.testing import CliRunner
+
+from notions.cli.config import InputFormats, OutputFormats
+from notions.cli.database import run_query_databases, run_query_databases_offline
+from notions.cli.main import app
+from notions.cli.page import (
+    create_page_from_json,
+    create_page_from_row,
+    run_import_pages,
+)
+from notions.cli.run import (
+    csv_format_iterable,
+    notion_json_format_iterable,
+    yaml_stream_format_iterable,
+)
+from notions.client import NotionAsyncClient
+from notions.columns import format_cell
+from notions.models.color import Color
+from notions.models.database import Database
+from notions.models.page import Page
+from notions.models.properties import (
+    CreatePageNumberProperty,
+    CreatePageSelectProperty,
+    CreatePageURLProperty,
+)
+
+from .test_parse_database import EXAMPLE_DATABASE_JSON
+from .test_parse_page import EXAMPLE_PAGE_JSON
+
+DATABASE_ID = uuid.UUID("fff51adc-8d4e-414a-a2e3-17e69111c328")
+
+
+def test_create_page_from_row():
+    database = Database.parse_raw(EXAMPLE_DATABASE_JSON)
+    create_page = create_page_from_row(
+        database,
+        {
+            "Name": "A page",
+            "Number Property": "5.23",
+            "URL property": "https://example.com/",
+            "Select property": "foo",
+            "Phone property": "",
+        },
+    )
+    assert create_page.parent.database_id == DATABASE_ID
+    assert set(create_page.properties) == {
+        "Name",
+        "Number Property",
+        "URL property",
+        "Select property",
+    }
+    create_json = json.loads(create_page.json())
+    assert create_json["properties"]["Name"]["title"][0]["plain_text"] == "A page"
+    number = create_page.properties["Number Property"]
+    assert isinstance(number, CreatePageNumberProperty)
+    assert number.number == decimal.Decimal("5.23")
+    url = create_page.properties["URL property"]
+    assert isinstance(url, CreatePageURLProperty)
+    assert url.url == "https://example.com/"
+    select = create_page.properties["Select property"]
+    assert isinstance(select, CreatePageSelectProperty) and select.select is not None
+    assert select.select.color == Color.gray
+
+
+def test_create_page_from_json():
+    create_page = create_page_from_json(
+        '{"properties": {"Name": {"type": "title", "title": [{"plain_text": "A page", "text": {"content": "A page"}}]}}}',
+        database_id=DATABASE_ID,
+    )
+    assert create_page.parent.database_id == DATABASE_ID
+    assert create_page.children == []
+    create_json = json.loads(create_page.json())
+    assert create_json["properties"]["Name"]["title"][0]["plain_text"] == "A page"
+
+
+def test_import_reports_bad_rows_and_carries_on():
+    page = json.loads(EXAMPLE_PAGE_JSON)
+    created = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "GET":
+            return httpx.Response(200, content=EXAMPLE_DATABASE_JSON.encode("UTF-8"))
+        create_json = json.loads(request.content)
+        created.append(create_json["properties"]["Name"]["title"][0]["plain_text"])
+        return httpx.Response(200, json=page)
+
+    # Checkbox properties can't be created from CSV yet, so row c fails to parse
+    input = io.StringIO(
+        "Name,Number Property,Checkbox property\n" "a,1,\nb,2,\nc,3,true\nd,4,\ne,5,\n"
+    )
+    client = NotionAsyncClient("test-token", transport=httpx.MockTransport(handler))
+    output = io.StringIO()
+    failures = asyncio.run(
+        run_import_pages(
+            client,
+            input=input,
+            input_format=InputFormats.csv,
+            database_id=DATABASE_ID,
+            concurrency=2,
+            output=output,
+            output_format=OutputFormats.jsonl,
+        )
+    )
+    assert failures == 1
+    assert sorted(created) == ["a", "b", "d", "e"]
+    assert len(output.getvalue().splitlines()) == 4
+
+
+def test_query_notion_jsonl_passes_results_through_unparsed():
+    page = json.loads(EXAMPLE_PAGE_JSON)
+    compact = json.dumps(page, separators=(",", ":"))
+    indented = json.dumps(page, indent=2)
+    body = (
+        '{"object": "list", "results": ['
+        + compact
+        + ", "
+        + indented
+        + '], "next_cursor": null, "has_more": false}'
+    )
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=body.encode("UTF-8"))
+
+    client = NotionAsyncClient("test-token", transport=httpx.MockTransport(handler))
+    output = io.StringIO()
+    asyncio.run(
+        run_query_databases(
+            client,
+            DATABASE_ID,
+            output=output,
+            output_format=OutputFormats.notion_jsonl,
+            sorts=[],
+        )
+    )
+    lines = output.getvalue().splitlines()
+    assert len(lines) == 2
+    # Exactly what the server sent, rather than re-serialised
+    assert lines[0] == compact
+    assert json.loads(lines[1]) == page
+
+
+def test_notion_json_array_is_written_incrementally():
+    output = io.StringIO()
+    written_before_next_item = []
+
+    async def items(count: int):
+        for i in range(count):
+            written_before_next_item.append(output.getvalue())
+            yield json.dumps({"object": "page", "index": i}).encode("UTF-8")
+
+    for count in [0, 1, 3]:
+        output.seek(0)
+        output.truncate()
+        written_before_next_item.clear()
+        asyncio.run(notion_json_format_iterable(items(count), output))
+        assert json.loads(output.getvalue()) == [
+            {"object": "page", "index": i} for i in range(count)
+        ]
+        if count > 1:
+            assert '"index": 0' in written_before_next_item[1]
+
+
+def test_yaml_stream_writes_a_document_per_item():
+    page = Page.parse_raw(EXAMPLE_PAGE_JSON)
+    output = io.StringIO()
+    written_before_next_item = []
+
+    async def items():
+        for _ in range(2):
+            written_before_next_item.append(output.getvalue())
+            yield page
+
+    asyncio.run(yaml_stream_format_iterable(items(), output))
+    documents = list(yaml.safe_load_all(output.getvalue()))
+    assert len(documents) == 2
+    assert documents[0]["id"] == str(page.id)
+    assert documents[0]["title"] == "Fields filled in"
+    assert written_before_next_item[1].startswith("---\n")
+
+
+def run_database_query(output: typing.Any, output_format: OutputFormats):
+    """Query the example database, which returns two versions of the example page
+
+    The second page is missing a property and has one the schema doesn't list.
+    """
+    database = json.loads(EXAMPLE_DATABASE_JSON)
+    page = json.loads(EXAMPLE_PAGE_JSON)
+    other_page = json.loads(EXAMPLE_PAGE_JSON)
+    other_page["id"] = "ccad10e7-c776-423e-9662-000000000002"
+    number_property = other_page["properties"].pop("Number Property")
+    other_page["properties"]["Not in schema"] = number_property
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "GET":
+            return httpx.Response(200, json=database)
+        return httpx.Response(
+            200,
+            json={
+                "object": "list",
+                "results": [page, other_page],
+                "next_cursor": None,
+                "has_more": False,
+            },
+        )
+
+    client = NotionAsyncClient("test-token", transport=httpx.MockTransport(handler))
+    asyncio.run(
+        run_query_databases(
+            client,
+            DATABASE_ID,
+            output=output,
+            output_format=output_format,
+            sorts=[],
+        )
+    )
+
+
+def test_query_csv_columns_come_from_database_schema():
+    output = io.StringIO()
+    run_database_query(output, OutputFormats.csv)
+    headers, *rows = csv.reader(io.StringIO(output.getvalue()))
+    assert headers[:5] == ["type", "id", "title", "created_time", "last_edited_time"]
+    assert "not_in_schema" not in headers
+    assert len(rows) == 2
+    assert all(len(row) == len(headers) for row in rows)
+    number = headers.index("number_property")
+    assert [row[number] for row in rows] == ["5.23", ""]
+    assert [row[2] for row in rows] == ["Fields filled in", "Fields filled in"]
+    assert rows[0][headers.index("name")] == "Fields filled in"
+
+    # Nested values are expanded into columns
+    first = dict(zip(headers, rows[0]))
+    assert first["date_property.start"] == "2021-07-15"
+    assert first["date_property.end"] == ""
+    # Core timestamps are formatted like timestamp properties
+    assert first["created_time"] == first["created_time_property"]
+    assert "T" in first["last_edited_time"]
+    assert first["person_property.email"] == '["notion@mick.twomeylee.name"]'
+    assert first["muti_select_property"] == '["foo","bar"]'
+    assert first["select_property"] == "foo"
+    assert first["email_rollup_property"] == '["test@example.com"]'
+
+
+def test_list_cells_can_be_split_back_apart():
+    items = ["Smith, Jane", "report, final.pdf", 'with "quotes"']
+    assert json.loads(format_cell(items)) == items
+
+
+@pytest.mark.parametrize("guess_headers", [True, False])
+def test_csv_without_schema_expands_page_properties(guess_headers: bool):
+    page = Page.parse_raw(EXAMPLE_PAGE_JSON)
+    database = Database.parse_raw(EXAMPLE_DATABASE_JSON)
+
+    async def items():
+        yield page
+        yield database
+
+    output = io.StringIO()
+    asyncio.run(
+        csv_format_iterable(items(), output, format="csv", guess_headers=guess_headers)
+    )
+    headers, page_row, database_row = csv.reader(io.StringIO(output.getvalue()))
+    cells = set(page_row)
+    assert "2021-07-15" in cells
+    assert '["notion@mick.twomeylee.name"]' in cells
+    # No Python reprs of nested values
+    assert not any(cell.startswith(("{'", "[{", "Decimal(")) for cell in cells)
+    if guess_headers:
+        assert len(page_row) == len(headers)
+        assert page_row[headers.index("date_property.start")] == "2021-07-15"
+    assert database_row[:2] == ["database", str(database.id)]
+    assert not any(cell.startswith("{'") for cell in database_row)
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "arrow", "sqlite"])
+@pytest.mark.parametrize(
+    "command", [["page", "get", str(DATABASE_ID)], ["search"], ["database", "list"]]
+)
+def test_schema_output_formats_are_rejected_outside_database_query(
+    output_format: str, command: typing.List[str]
+):
+    result = CliRunner().invoke(
+        app,
+        ["--notion-api-key", "secret_key", "--output-format", output_format, *command],
+        env={"COLUMNS": "200"},
+    )
+    assert result.exit_code == 2
+    assert "only supported by `database query`" in result.output
+    assert not isinstance(result.exception, NotImplementedError)
+
+
+@pytest.mark.parametrize("output_format", [OutputFormats.parquet, OutputFormats.arrow])
+def test_query_columnar_output(output_format: OutputFormats):
+    pyarrow = pytest.importorskip("pyarrow")
+    ipc = pytest.importorskip("pyarrow.ipc")
+    parquet = pytest.importorskip("pyarrow.parquet")
+
+    output = io.BytesIO()
+    run_database_query(output, output_format)
+    output.seek(0)
+    if output_format == OutputFormats.parquet:
+        table = parquet.read_table(output)
+    else:
+        table = ipc.open_file(output).read_all()
+
+    assert table.num_rows == 2
+    assert table.schema.field("checkbox_property").type == pyarrow.bool_()
+    assert table.schema.field("number_property").type == pyarrow.float64()
+    assert table.schema.field("created_time").type == pyarrow.timestamp("us", tz="UTC")
+    rows = table.to_pylist()
+    assert rows[0]["title"] == "Fields filled in"
+    assert [row["number_property"] for row in rows] == [5.23, None]
+    assert rows[0]["checkbox_property"] is True
+    assert rows[0]["muti_select_property"] == ["foo", "bar"]
+    assert rows[0]["person_property.email"] == ["notion@mick.twomeylee.name"]
+    assert rows[0]["date_property.start"] == datetime.datetime(
+        2021, 7, 15, tzinfo=datetime.timezone.utc
+    )
+
+
+def test_query_sqlite_output(tmp_path: pathlib.Path):
+    path = tmp_path / "query.db"
+    with open(path, "w") as output:
+        run_database_query(output, OutputFormats.sqlite)
+    connection = sqlite3.connect(str(path))
+    rows = connection.execute(
+        "SELECT title, number_property FROM pages ORDER BY number_property"
+    ).fetchall()
+    assert rows == [("Fields filled in", None), ("Fields filled in", 5.23)]
+
+
+def test_query_offline_from_local_copy(tmp_path: pathlib.Path):
+    path = tmp_path / "mirror.db"
+    with open(path, "w") as sqlite_output:
+        run_database_query(sqlite_output, OutputFormats.sqlite)
+
+    output = io.StringIO()
+    asyncio.run(
+        run_query_databases_offline(
+            path,
+            DATABASE_ID,
+            output=output,
+            output_format=OutputFormats.csv,
+            sorts=[],
+            filter={"property": "Number Property", "number": {"is_not_empty": True}},
+        )
+    )
+    headers, *rows = csv.reader(io.StringIO(output.getvalue()))
+    assert len(rows) == 1
+    assert rows[0][headers.index("number_property")] == "5.23"
+
+    with pytest.raises(ValueError):
+        asyncio.run(
+            run_query_databases_offline(
+                path,
+                uuid.uuid4(),
+                output=io.StringIO(),
+                output_format=OutputFormats.csv,
+                sorts=[],
+            )
+        )
@@ -0,0 +1,537 @@
+"""Tests for NotionAsyncClient using a mock HTTP transport
+
+These don't talk to Notion, see test_examples.py for those.
+"""
+
+import asyncio
+import datetime
+import json
+import typing
+import uuid
+
+import httpx
+import pytest
+
+from notions.bulk import aclosing
+from notions.client import NotionAPIResponseError, NotionAsyncClient
+from notions.models.page import CreatePage, CreatePageDatabaseParent, UpdatePage
+from notions.models.properties import CreatePageTitleProperty
+from notions.models.query_database import QueryDatabase
+from notions.models.rich_text import RichTextText, Text
+from notions.ratelimit import TokenBucket, parse_retry_after
+from notions.retry import RetryBudget, RetryPolicy
+
+from .test_parse_page import EXAMPLE_PAGE_JSON
+
+PAGE_ID = uuid.UUID("ccad10e7-c776-423e-9662-6ad5fb1256d6")
+
+
+# What httpx.MockTransport accepts, plain functions or coroutine functions
+Handler = typing.Union[
+    typing.Callable[[httpx.Request], httpx.Response],
+    typing.Callable[[httpx.Request], typing.Coroutine[None, None, httpx.Response]],
+]
+
+
+def make_client(handler: Handler, **kwargs: typing.Any) -> NotionAsyncClient:
+    return NotionAsyncClient(
+        "test-token", transport=httpx.MockTransport(handler), **kwargs
+    )
+
+
+def page_handler(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json=json.loads(EXAMPLE_PAGE_JSON))
+
+
+def test_pooled_session_is_shared_and_closed():
+    seen_clients = set()
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return page_handler(request)
+
+    async def main():
+        async with make_client(handler) as client:
+            for _ in range(3):
+                seen_clients.add(id(client.get_httpx_client()))
+                page = await client.get_page(PAGE_ID)
+                assert page.id == PAGE_ID
+            async with client.async_client() as httpx_client:
+                assert httpx_client is client.get_httpx_client()
+            httpx_client = client.get_httpx_client()
+        assert httpx_client.is_closed
+
+    asyncio.run(main())
+    assert len(seen_clients) == 1
+    assert len(requests) == 3
+    assert requests[0].headers["Authorization"] == "Bearer test-token"
+    assert requests[0].headers["Notion-Version"] == "2022-02-22"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps: typing.List[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_spaces_out_requests():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=3.0, capacity=3.0, clock=clock, sleep=clock.sleep)
+
+    async def main():
+        for _ in range(9):
+            await bucket.acquire()
+
+    asyncio.run(main())
+    # First three go out as a burst, the rest at 3 per second
+    assert clock.now == pytest.approx(2.0)
+
+
+def test_token_bucket_pause():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1.0, capacity=1.0, clock=clock, sleep=clock.sleep)
+
+    async def main():
+        await bucket.acquire()
+        bucket.pause(5.0)
+        await bucket.acquire()
+
+    asyncio.run(main())
+    assert clock.now == pytest.approx(6.0)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("0.5") == 0.5
+    assert parse_retry_after("garbage") is None
+    now = datetime.datetime(2021, 10, 25, 17, 0, 0, tzinfo=datetime.timezone.utc)
+    assert parse_retry_after("Mon, 25 Oct 2021 17:00:10 GMT", now=now) == 10.0
+
+
+def test_rate_limited_requests_are_retried():
+    responses = [
+        httpx.Response(
+            429,
+            headers={"Retry-After": "0"},
+            json={
+                "object": "error",
+                "status": 429,
+                "code": "rate_limited",
+                "message": "Slow down",
+            },
+        ),
+        httpx.Response(200, json=json.loads(EXAMPLE_PAGE_JSON)),
+    ]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return responses.pop(0)
+
+    async def main():
+        async with make_client(handler, requests_per_second=100.0) as client:
+            return await client.get_page(PAGE_ID)
+
+    page = asyncio.run(main())
+    assert page.id == PAGE_ID
+    assert responses == []
+
+
+def test_rate_limited_retries_give_up():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            429,
+            headers={"Retry-After": "0"},
+            json={
+                "object": "error",
+                "status": 429,
+                "code": "rate_limited",
+                "message": "Slow down",
+            },
+        )
+
+    async def main():
+        async with make_client(
+            handler, requests_per_second=100.0, max_rate_limited_retries=2
+        ) as client:
+            await client.get_page(PAGE_ID)
+
+    with pytest.raises(NotionAPIResponseError) as exc_info:
+        asyncio.run(main())
+    assert exc_info.value.response is not None
+    assert exc_info.value.response.status_code == 429
+
+
+NO_BACKOFF_RETRIES = {
+    method: RetryPolicy(backoff_base=0.0) for method in ("GET", "POST", "PATCH")
+}
+
+
+def list_response(results: typing.List[dict], next_cursor: typing.Optional[str]):
+    return httpx.Response(
+        200,
+        json={
+            "object": "list",
+            "results": results,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+        },
+    )
+
+
+def test_transient_errors_are_retried_for_reads():
+    responses: typing.List[typing.Any] = [
+        httpx.Response(503, json={"object": "error"}),
+        httpx.ReadTimeout("Timed out"),
+        httpx.Response(200, json=json.loads(EXAMPLE_PAGE_JSON)),
+    ]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    async def main():
+        async with make_client(handler, retry_policies=NO_BACKOFF_RETRIES) as client:
+            return await client.get_page(PAGE_ID)
+
+    assert asyncio.run(main()).id == PAGE_ID
+    assert responses == []
+
+
+def test_writes_are_not_retried_unless_idempotent():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if len(requests) == 1:
+            return httpx.Response(503, json={"object": "error"})
+        return httpx.Response(200, json=json.loads(EXAMPLE_PAGE_JSON))
+
+    update = UpdatePage(properties={})
+
+    async def main(idempotent: bool):
+        async with make_client(handler, retry_policies=NO_BACKOFF_RETRIES) as client:
+            return await client.update_page(PAGE_ID, update, idempotent=idempotent)
+
+    with pytest.raises(NotionAPIResponseError):
+        asyncio.run(main(idempotent=False))
+    assert len(requests) == 1
+
+    requests.clear()
+    assert asyncio.run(main(idempotent=True)).id == PAGE_ID
+    assert len(requests) == 2
+
+
+def test_pagination_resumes_from_cursor_after_transient_error():
+    page = json.loads(EXAMPLE_PAGE_JSON)
+    cursors = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        cursor = json.loads(request.content).get("start_cursor")
+        cursors.append(cursor)
+        if cursor is None:
+            return list_response([page], "cursor-1")
+        if cursors.count("cursor-1") == 1:
+            raise httpx.ReadError("Connection reset")
+        return list_response([page], None)
+
+    async def main():
+        async with make_client(handler, retry_policies=NO_BACKOFF_RETRIES) as client:
+            return [p async for p in client.query_database(PAGE_ID, QueryDatabase())]
+
+    assert len(asyncio.run(main())) == 2
+    assert cursors == [None, "cursor-1", "cursor-1"]
+
+
+def test_retry_budget():
+    budget = RetryBudget(ratio=0.5, min_retries=1, capacity=2)
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+
+
+def test_get_pages_bounded_concurrency_and_failures():
+    page = json.loads(EXAMPLE_PAGE_JSON)
+    missing_id = uuid.UUID("00000000-0000-0000-0000-000000000000")
+    page_ids = [uuid.uuid4() for _ in range(10)] + [missing_id]
+    in_flight = 0
+    max_in_flight = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        page_id = request.url.path.rsplit("/", 1)[-1]
+        if page_id == str(missing_id):
+            return httpx.Response(
+                404,
+                json={
+                    "object": "error",
+                    "status": 404,
+                    "code": "object_not_found",
+                    "message": "Not found",
+                },
+            )
+        return httpx.Response(200, json=dict(page, id=page_id))
+
+    async def main():
+        async with make_client(handler, requests_per_second=None) as client:
+            return [r async for r in client.get_pages(page_ids, concurrency=3)]
+
+    results = asyncio.run(main())
+    assert max_in_flight == 3
+    assert [r.item for r in results] == page_ids
+    assert [r.result.id for r in results if r.result is not None] == page_ids[:-1]
+    assert not results[-1].ok
+    assert isinstance(results[-1].error, NotionAPIResponseError)
+
+
+def test_create_pages_streams_results_in_order():
+    page = json.loads(EXAMPLE_PAGE_JSON)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        title = json.loads(request.content)["properties"]["Name"]["title"][0]
+        # Finish out of order to check results are still returned in input order
+        await asyncio.sleep(0.01 * (5 - int(title["plain_text"])))
+        if title["plain_text"] == "3":
+            return httpx.Response(
+                400,
+                json={
+                    "object": "error",
+                    "status": 400,
+                    "code": "validation_error",
+                    "message": "Bad",
+                },
+            )
+        return httpx.Response(200, json=page)
+
+    async def create_pages():
+        for i in range(5):
+            yield CreatePage(
+                parent=CreatePageDatabaseParent(database_id=PAGE_ID),
+                properties={
+                    "Name": CreatePageTitleProperty(
+                        title=[
+                            RichTextText(plain_text=str(i), text=Text(content=str(i)))
+                        ]
+                    )
+                },
+                children=[],
+            )
+
+    async def main():
+        async with make_client(handler, requests_per_second=None) as client:
+            return [r async for r in client.create_pages(create_pages(), concurrency=2)]
+
+    results = asyncio.run(main())
+    assert [r.index for r in results] == [0, 1, 2, 3, 4]
+    assert [r.ok for r in results] == [True, True, True, False, True]
+
+
+def test_create_pages_finishes_sent_requests_when_input_fails():
+    page = json.loads(EXAMPLE_PAGE_JSON)
+    finished = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.01)
+        finished.append(request)
+        return httpx.Response(200, json=page)
+
+    async def create_pages():
+        for i in range(2):
+            yield CreatePage(
+                parent=CreatePageDatabaseParent(database_id=PAGE_ID),
+                properties={},
+                children=[],
+            )
+        raise ValueError("Bad input")
+
+    results = []
+
+    async def main():
+        async with make_client(handler, requests_per_second=None) as client:
+            async for result in client.create_pages(create_pages(), concurrency=4):
+                results.append(result)
+
+    with pytest.raises(ValueError, match="Bad input"):
+        asyncio.run(main())
+    # The requests already sent weren't cancelled, and were reported before the error
+    assert len(finished) == 2
+    assert [r.ok for r in results] == [True, True]
+
+
+def test_pagination_prefetches_next_page():
+    page = json.loads(EXAMPLE_PAGE_JSON)
+    events = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        cursor = json.loads(request.content).get("start_cursor")
+        events.append(f"fetch {cursor}")
+        if cursor is None:
+            return list_response([page], "cursor-1")
+        if cursor == "cursor-1":
+            return list_response([page], "cursor-2")
+        return list_response([page], None)
+
+    async def main(prefetch: int):
+        async with make_client(handler, requests_per_second=None) as client:
+            async with aclosing(
+                client.paginated_request(
+                    "POST",
+                    client.get_url_for_path("v1/search"),
+                    pagination_in_json=True,
+                    data="{}",
+                    prefetch=prefetch,
+                )
+            ) as pages:
+                async for list_page in pages:
+                    # Only synchronous work, no chance for anything else to run
+                    list(list_page.iter_results())
+                    events.append(f"consumed {list_page.next_cursor}")
+                    if list_page.next_cursor == "cursor-1":
+                        break
+
+    asyncio.run(main(prefetch=1))
+    assert events[:2] == ["fetch None", "fetch cursor-1"]
+    assert events[2] == "consumed cursor-1"
+
+    events.clear()
+    asyncio.run(main(prefetch=0))
+    assert events == ["fetch None", "consumed cursor-1"]
+
+
+def test_streamed_query_resumes_after_dropped_connection():
+    page = json.loads(EXAMPLE_PAGE_JSON)
+    body = json.dumps(
+        {
+            "object": "list",
+            "results": [page, page],
+            "next_cursor": None,
+            "has_more": False,
+        }
+    ).encode("UTF-8")
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+
+        async def chunks():
+            # Send the first result and part of the second, then drop on the first try
+            split = body.index(b"}, {") + 3
+            yield body[:split]
+            if len(requests) == 1:
+                raise httpx.ReadError("Connection reset")
+            yield body[split:]
+
+        return httpx.Response(200, content=chunks())
+
+    async def main():
+        async with make_client(handler, retry_policies=NO_BACKOFF_RETRIES) as client:
+            return [
+                p
+                async for p in client.query_database(
+                    PAGE_ID, QueryDatabase(), stream=True
+                )
+            ]
+
+    pages = asyncio.run(main())
+    assert [p.id for p in pages] == [PAGE_ID, PAGE_ID]
+    assert len(requests) == 2
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_limit_stops_pagination_early(stream: bool):
+    page = json.loads(EXAMPLE_PAGE_JSON)
+    page_sizes = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        # An endless database, only the limit stops the query
+        page_size = json.loads(request.content).get("page_size", 100)
+        page_sizes.append(page_size)
+        return list_response([page] * page_size, f"cursor-{len(page_sizes)}")
+
+    async def main(limit: int):
+        async with make_client(handler, requests_per_second=None) as client:
+            return [
+                p
+                async for p in client.query_database(
+                    PAGE_ID, QueryDatabase(page_size=2), stream=stream, limit=limit
+                )
+            ]
+
+    assert len(asyncio.run(main(limit=5))) == 5
+    assert page_sizes == [2, 2, 1]
+
+    page_sizes.clear()
+    assert asyncio.run(main(limit=0)) == []
+    assert page_sizes == []
+
+
+def test_concurrent_reads_share_one_request():
+    requests = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        await asyncio.sleep(0.01)
+        return page_handler(request)
+
+    async def main():
+        async with make_client(handler, requests_per_second=None) as client:
+            pages = await asyncio.gather(*[client.get_page(PAGE_ID) for _ in range(20)])
+            # Once finished the next call makes a new request
+            await client.get_page(PAGE_ID)
+            return pages, client
+
+    pages, client = asyncio.run(main())
+    assert len(requests) == 2
+    assert all(page is pages[0] for page in pages)
+    assert client._single_flight.shared == 19
+    assert len(client._single_flight) == 0
+
+
+def test_shared_read_errors_reach_every_caller_and_survive_cancellation():
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.02)
+        if request.url.path.endswith(str(PAGE_ID)):
+            return page_handler(request)
+        return httpx.Response(
+            404,
+            json={
+                "object": "error",
+                "status": 404,
+                "code": "object_not_found",
+                "message": "Not found",
+            },
+        )
+
+    async def main():
+        async with make_client(handler, requests_per_second=None) as client:
+            missing = uuid.uuid4()
+            errors = await asyncio.gather(
+                *[client.get_page(missing) for _ in range(3)], return_exceptions=True
+            )
+            assert all(isinstance(e, NotionAPIResponseError) for e in errors)
+
+            first = asyncio.ensure_future(client.get_page(PAGE_ID))
+            second = asyncio.ensure_future(client.get_page(PAGE_ID))
+            await asyncio.sleep(0.005)
+            first.cancel()
+            page = await second
+            assert first.cancelled()
+            assert page.id == PAGE_ID
+
+    asyncio.run(main())
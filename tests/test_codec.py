@@ -0,0 +1,47 @@
+import importlib
+import json
+import sys
+
+import pytest
+
+import notions.codec
+from notions.flatten import flatten_page
+from notions.models.page import Page
+
+from .test_parse_page import EXAMPLE_PAGE_JSON
+
+
+@pytest.fixture(params=["default", "stdlib"])
+def codec(request, monkeypatch):
+    """The codec module with whichever backend is installed, and forced to stdlib json"""
+    if request.param == "stdlib":
+        # A None entry makes the import fail
+        monkeypatch.setitem(sys.modules, "orjson", None)
+    yield importlib.reload(notions.codec)
+    monkeypatch.undo()
+    importlib.reload(notions.codec)
+
+
+def test_codec_stdlib_fallback(monkeypatch):
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    try:
+        assert importlib.reload(notions.codec).get_backend() == "json"
+    finally:
+        monkeypatch.undo()
+        importlib.reload(notions.codec)
+
+
+def test_codec_round_trip(codec):
+    obj = codec.loads(EXAMPLE_PAGE_JSON.encode("UTF-8"))
+    assert obj == json.loads(EXAMPLE_PAGE_JSON)
+    assert codec.loads(codec.dumps(obj)) == obj
+    assert codec.loads(memoryview(codec.dumps(obj))) == obj
+
+
+def test_codec_dumps_model_matches_pydantic(codec):
+    page = Page.parse_raw(EXAMPLE_PAGE_JSON)
+    encoded = codec.dumps_model(page)
+    assert isinstance(encoded, bytes)
+    assert json.loads(encoded) == json.loads(page.json())
+    flat_page = flatten_page(page)
+    assert json.loads(codec.dumps_model(flat_page)) == json.loads(flat_page.json())
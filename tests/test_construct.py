@@ -0,0 +1,40 @@
+import json
+
+from notions.flatten import flatten_page
+from notions.models.construct import construct_model
+from notions.models.database import Database
+from notions.models.page import Page
+from notions.models.properties.formula import PageNumberFormula
+from notions.models.response import parse_result
+
+from .test_flatten import EXAMPLE_FLAT_PAGE
+from .test_parse_database import EXAMPLE_DATABASE_JSON
+from .test_parse_page import EXAMPLE_PAGE_JSON
+
+
+def test_construct_page_matches_validated():
+    obj = json.loads(EXAMPLE_PAGE_JSON)
+    page = construct_model(Page, obj)
+    assert page == Page.parse_obj(obj)
+    assert json.loads(page.json()) == obj
+
+
+def test_construct_database_matches_validated():
+    obj = json.loads(EXAMPLE_DATABASE_JSON)
+    database = construct_model(Database, obj)
+    assert database == Database.parse_obj(obj)
+    assert json.loads(database.json()) == obj
+
+
+def test_construct_page_flattens():
+    page = parse_result(json.loads(EXAMPLE_PAGE_JSON), validate=False)
+    assert isinstance(page, Page)
+    assert flatten_page(page).dict() == EXAMPLE_FLAT_PAGE
+
+
+def test_construct_converts_numbers_like_pydantic():
+    for number in [1, 1.1, "2.50"]:
+        obj = {"type": "number", "number": number}
+        assert construct_model(PageNumberFormula, obj) == PageNumberFormula.parse_obj(
+            obj
+        )
@@ -0,0 +1,157 @@
+import asyncio
+import datetime
+import json
+import pathlib
+import typing
+import uuid
+
+import httpx
+
+from notions.client import NotionAsyncClient
+from notions.diskcache import DiskCache, ensure_fresh_cache
+from notions.models.page import Page
+
+from .test_parse_page import EXAMPLE_PAGE_JSON
+
+PAGE_ID = uuid.UUID("ccad10e7-c776-423e-9662-6ad5fb1256d6")
+
+
+class FakeWorkspace:
+    """Serves the example page, and search results for it and another page"""
+
+    def __init__(self):
+        self.page = json.loads(EXAMPLE_PAGE_JSON)
+        self.other = json.loads(EXAMPLE_PAGE_JSON)
+        self.other["id"] = str(uuid.uuid4())
+        self.other["last_edited_time"] = "2021-10-26T09:00:00.000Z"
+        self.requests: typing.List[typing.Tuple[str, str]] = []
+        self.search_page_sizes: typing.List[int] = []
+        # Well after the last edit, so the search index has caught up
+        self.now = datetime.datetime(
+            2021, 11, 1, tzinfo=datetime.timezone.utc
+        ).timestamp()
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append((request.method, request.url.path))
+        if request.url.path == "/v1/search":
+            search = json.loads(request.content)
+            assert search["sort"] == {
+                "direction": "descending",
+                "timestamp": "last_edited_time",
+            }
+            self.search_page_sizes.append(search["page_size"])
+            results = sorted(
+                [self.page, self.other],
+                key=lambda p: p["last_edited_time"],
+                reverse=True,
+            )
+            return httpx.Response(
+                200,
+                json={
+                    "object": "list",
+                    "results": results[: search["page_size"]],
+                    "next_cursor": None,
+                    "has_more": False,
+                },
+            )
+        return httpx.Response(200, json=self.page)
+
+    def get_page(self, path: str):
+        """A cold run of `notions page get`"""
+        cache = DiskCache(path, clock=lambda: self.now)
+        client = NotionAsyncClient(
+            "test-token",
+            transport=httpx.MockTransport(self.handler),
+            requests_per_second=None,
+            cache=cache,
+        )
+
+        async def main():
+            async with client:
+                await ensure_fresh_cache(client)
+                return await client.get_page(PAGE_ID)
+
+        try:
+            return asyncio.run(main())
+        finally:
+            cache.close()
+
+    def paths(self):
+        paths = [path for _, path in self.requests]
+        self.requests.clear()
+        return paths
+
+
+def test_unchanged_pages_come_from_disk(tmp_path: pathlib.Path):
+    path = str(tmp_path / "cache.db")
+    workspace = FakeWorkspace()
+    page_path = f"/v1/pages/{PAGE_ID}"
+
+    assert workspace.get_page(path).id == PAGE_ID
+    assert workspace.paths() == ["/v1/search", page_path]
+
+    # Within max_age nothing is checked
+    workspace.now += 10
+    workspace.get_page(path)
+    assert workspace.paths() == []
+
+    # Later, one search for the latest edit shows nothing has changed
+    workspace.now += 120
+    workspace.search_page_sizes.clear()
+    workspace.get_page(path)
+    assert workspace.paths() == ["/v1/search"]
+    assert workspace.search_page_sizes == [1]
+
+
+def test_edited_pages_are_replaced_from_search(tmp_path: pathlib.Path):
+    path = str(tmp_path / "cache.db")
+    workspace = FakeWorkspace()
+    workspace.get_page(path)
+    workspace.paths()
+
+    workspace.page["last_edited_time"] = "2021-10-27T09:00:00.000Z"
+    workspace.page["properties"]["Number Property"]["number"] = 42
+    workspace.now += 120
+    page = workspace.get_page(path)
+    # The probe sees a newer edit, so the search is read back to the last one
+    assert workspace.paths() == ["/v1/search", "/v1/search"]
+    assert page.properties["Number Property"].get_value() == 42
+
+
+def test_recent_checks_read_back_for_lagging_edits(tmp_path: pathlib.Path):
+    path = str(tmp_path / "cache.db")
+    workspace = FakeWorkspace()
+    # Just after the newest edit, so earlier edits may not be searchable yet
+    workspace.now = datetime.datetime(
+        2021, 10, 26, 9, 2, tzinfo=datetime.timezone.utc
+    ).timestamp()
+    workspace.get_page(path)
+    workspace.paths()
+
+    workspace.now += 120
+    workspace.get_page(path)
+    assert workspace.paths() == ["/v1/search", "/v1/search"]
+
+
+def test_more_edits_than_entries_empty_the_cache(tmp_path: pathlib.Path):
+    path = str(tmp_path / "cache.db")
+    workspace = FakeWorkspace()
+    workspace.get_page(path)
+    workspace.paths()
+
+    workspace.page["last_edited_time"] = "2021-10-27T09:00:00.000Z"
+    workspace.other["last_edited_time"] = "2021-10-27T10:00:00.000Z"
+    workspace.now += 120
+    workspace.search_page_sizes.clear()
+    workspace.get_page(path)
+    # Both pages were edited but only one is cached, so it's dropped
+    assert workspace.search_page_sizes == [1, 10]
+    assert workspace.paths() == ["/v1/search", "/v1/search", f"/v1/pages/{PAGE_ID}"]
+
+
+def test_entries_are_not_trusted_before_revalidating(tmp_path: pathlib.Path):
+    cache = DiskCache(str(tmp_path / "cache.db"))
+    cache.put("page", PAGE_ID, Page.parse_raw(EXAMPLE_PAGE_JSON))
+    assert len(cache) == 1
+    assert cache.get("page", PAGE_ID) is None
+    assert cache.stats.misses == 1
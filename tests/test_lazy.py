@@ -0,0 +1,47 @@
+import json
+
+import pydantic
+import pytest
+
+from notions.flatten import flatten_page
+from notions.models.lazy import LazyProperties, parse_lazy
+from notions.models.page import Page
+from notions.models.properties.number import PageNumberProperty
+
+from .test_flatten import EXAMPLE_FLAT_PAGE
+from .test_parse_page import EXAMPLE_PAGE_JSON
+
+
+@pytest.mark.parametrize("validate", [True, False])
+def test_lazy_page_parses_properties_on_access(validate: bool):
+    obj = json.loads(EXAMPLE_PAGE_JSON)
+    page = parse_lazy(Page, obj, validate=validate)
+    properties = page.properties
+    assert isinstance(properties, LazyProperties)
+    assert properties.parsed_count == 0
+
+    number = page.properties["Number Property"]
+    assert isinstance(number, PageNumberProperty)
+    assert number == Page.parse_obj(obj).properties["Number Property"]
+    assert properties.parsed_count == 1
+    # Cached
+    assert page.properties["Number Property"] is number
+    assert properties.parsed_count == 1
+
+
+@pytest.mark.parametrize("validate", [True, False])
+def test_lazy_page_matches_parsed(validate: bool):
+    obj = json.loads(EXAMPLE_PAGE_JSON)
+    page = parse_lazy(Page, obj, validate=validate)
+    assert flatten_page(page).dict() == EXAMPLE_FLAT_PAGE
+    assert json.loads(parse_lazy(Page, obj, validate=validate).json()) == obj
+    assert page == Page.parse_obj(obj)
+
+
+def test_lazy_page_validates_on_access():
+    obj = json.loads(EXAMPLE_PAGE_JSON)
+    obj["properties"]["Number Property"]["number"] = "not a number"
+    page = parse_lazy(Page, obj)
+    assert page.properties["Checkbox property"].get_value() is True
+    with pytest.raises(pydantic.ValidationError):
+        page.properties["Number Property"]
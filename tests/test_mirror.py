@@ -0,0 +1,125 @@
+import asyncio
+import json
+import pathlib
+import sqlite3
+import typing
+import uuid
+
+import httpx
+
+from notions.client import NotionAsyncClient
+from notions.mirror import sync_database
+
+from .test_parse_database import EXAMPLE_DATABASE_JSON
+from .test_parse_page import EXAMPLE_PAGE_JSON
+
+DATABASE_ID = uuid.UUID("4b4c8a2f-0d38-4b55-a36a-2e5f7e3d1b01")
+
+
+class FakeDatabase:
+    """Serves the example database, with pages sorted newest first"""
+
+    def __init__(self, count: int):
+        self.database = json.loads(EXAMPLE_DATABASE_JSON)
+        self.pages: typing.Dict[int, dict] = {}
+        for i in range(count):
+            self.edit(i, f"2021-08-0{i + 1}T10:00:00.000Z")
+        self.queries: typing.List[dict] = []
+
+    def edit(self, i: int, last_edited_time: str):
+        page = json.loads(EXAMPLE_PAGE_JSON)
+        page["id"] = f"ccad10e7-c776-423e-9662-{i:012d}"
+        page["last_edited_time"] = last_edited_time
+        page["properties"]["Number Property"]["number"] = i
+        self.pages[i] = page
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "GET":
+            return httpx.Response(200, json=self.database)
+        self.queries.append(json.loads(request.content))
+        results = sorted(
+            self.pages.values(), key=lambda p: p["last_edited_time"], reverse=True
+        )
+        return httpx.Response(
+            200,
+            json={
+                "object": "list",
+                "results": results,
+                "next_cursor": None,
+                "has_more": False,
+            },
+        )
+
+    def sync(self, path: str, full: bool = False):
+        client = NotionAsyncClient(
+            "test-token", transport=httpx.MockTransport(self.handler)
+        )
+        return asyncio.run(sync_database(client, DATABASE_ID, path, full=full))
+
+
+def stored_numbers(path: str):
+    connection = sqlite3.connect(path)
+    return dict(connection.execute("SELECT id, number_property FROM pages"))
+
+
+def test_sync_only_fetches_and_writes_recent_edits(tmp_path: pathlib.Path):
+    path = str(tmp_path / "mirror.db")
+    fake = FakeDatabase(3)
+
+    result = fake.sync(path)
+    assert result.full
+    assert (result.seen, result.upserted) == (3, 3)
+    assert fake.queries[0]["sorts"] == [
+        {"timestamp": "last_edited_time", "direction": "descending"}
+    ]
+
+    fake.edit(0, "2021-09-01T10:00:00.000Z")
+    fake.pages[0]["properties"]["Number Property"]["number"] = 100
+    result = fake.sync(path)
+    assert not result.full
+    # The edited page, then the page at the old watermark, then it stops
+    assert (result.seen, result.upserted) == (2, 2)
+    assert result.watermark is not None
+    assert result.watermark.isoformat() == "2021-09-01T10:00:00+00:00"
+    assert sorted(stored_numbers(path).values()) == [1.0, 2.0, 100.0]
+
+    result = fake.sync(path)
+    assert (result.seen, result.upserted) == (1, 1)
+
+
+def test_full_sync_removes_deleted_pages(tmp_path: pathlib.Path):
+    path = str(tmp_path / "mirror.db")
+    fake = FakeDatabase(3)
+    fake.sync(path)
+
+    del fake.pages[1]
+    assert fake.sync(path).deleted == 0
+    assert len(stored_numbers(path)) == 3
+
+    result = fake.sync(path, full=True)
+    assert (result.seen, result.upserted, result.deleted) == (2, 1, 1)
+    assert sorted(stored_numbers(path).values()) == [0.0, 2.0]
+
+
+def test_schema_change_rewrites_every_page(tmp_path: pathlib.Path):
+    path = str(tmp_path / "mirror.db")
+    fake = FakeDatabase(3)
+    fake.sync(path)
+
+    fake.database["properties"]["Extra"] = {
+        "id": "xtra",
+        "name": "Extra",
+        "type": "checkbox",
+        "checkbox": {},
+    }
+    for page in fake.pages.values():
+        page["properties"]["Extra"] = {
+            "id": "xtra",
+            "type": "checkbox",
+            "checkbox": True,
+        }
+    result = fake.sync(path)
+    assert result.full
+    assert (result.seen, result.upserted) == (3, 3)
+    connection = sqlite3.connect(path)
+    assert [row[0] for row in connection.execute("SELECT extra FROM pages")] == [1] * 3
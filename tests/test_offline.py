@@ -0,0 +1,118 @@
+import json
+import pathlib
+import typing
+
+import pytest
+
+from notions.models.database import Database
+from notions.models.page import Page
+from notions.models.query_database import Direction, QueryDatabase, QueryDatabaseSort
+from notions.offline import UnsupportedFilter, query_store
+from notions.sqlite import PageStore
+
+from .test_parse_database import EXAMPLE_DATABASE_JSON
+from .test_parse_page import EXAMPLE_PAGE_JSON
+
+PERSON_ID = "b66c20dd-0a48-4418-ae23-2d82ec151be3"
+
+
+@pytest.fixture
+def store(tmp_path: pathlib.Path) -> typing.Iterator[PageStore]:
+    """The example page five times over, numbered 0 to 4
+
+    Even pages have no people and odd ones aren't tagged "foo".
+    """
+    store = PageStore.open(
+        str(tmp_path / "pages.db"), Database.parse_raw(EXAMPLE_DATABASE_JSON)
+    )
+    pages = []
+    for i in range(5):
+        obj = json.loads(EXAMPLE_PAGE_JSON)
+        obj["id"] = f"ccad10e7-c776-423e-9662-{i:012d}"
+        obj["properties"]["Number Property"]["number"] = i
+        obj["properties"]["Name"]["title"][0]["plain_text"] = f"Page {i}"
+        obj["properties"]["Date property"]["date"]["start"] = f"2021-07-1{i}"
+        if i % 2 == 0:
+            obj["properties"]["Person property"]["people"] = []
+        else:
+            obj["properties"]["Muti-select property"]["multi_select"].pop(0)
+        pages.append(Page.parse_obj(obj))
+    store.upsert_pages(pages)
+    yield store
+    store.close()
+
+
+def numbers(store: PageStore, filter=None, sorts=None) -> typing.List[typing.Any]:
+    query = QueryDatabase(filter=filter, sorts=sorts)
+    return [
+        Page.parse_raw(page).properties["Number Property"].get_value()
+        for page in query_store(store, query)
+    ]
+
+
+def test_number_filter_and_sort(store: PageStore):
+    sorts = [
+        QueryDatabaseSort(property="Number Property", direction=Direction.descending)
+    ]
+    filter = {"property": "Number Property", "number": {"greater_than": 1}}
+    assert numbers(store, filter, sorts) == [4, 3, 2]
+    limited = query_store(store, QueryDatabase(filter=filter, sorts=sorts), limit=2)
+    assert [
+        Page.parse_raw(page).properties["Number Property"].get_value()
+        for page in limited
+    ] == [4, 3]
+    indexes = {row[1] for row in store.connection.execute("PRAGMA index_list(pages)")}
+    assert "pages_number_property" in indexes
+
+
+@pytest.mark.parametrize(
+    "filter,expected",
+    [
+        ({"property": "Name", "title": {"contains": "PAGE 3"}}, [3]),
+        ({"property": "Name", "title": {"starts_with": "Page"}}, [0, 1, 2, 3, 4]),
+        (
+            {"property": "Muti-select property", "multi_select": {"contains": "foo"}},
+            [0, 2, 4],
+        ),
+        ({"property": "Person property", "people": {"contains": PERSON_ID}}, [1, 3]),
+        ({"property": "Person property", "people": {"is_empty": True}}, [0, 2, 4]),
+        ({"property": "Date property", "date": {"on_or_after": "2021-07-13"}}, [3, 4]),
+        ({"property": "Checkbox property", "checkbox": {"equals": False}}, []),
+        (
+            {
+                "timestamp": "created_time",
+                "created_time": {"after": "2021-07-31T16:00:00Z"},
+            },
+            [0, 1, 2, 3, 4],
+        ),
+        (
+            {
+                "or": [
+                    {"property": "Number Property", "number": {"equals": 0}},
+                    {
+                        "and": [
+                            {"property": "Number Property", "number": {"less_than": 4}},
+                            {
+                                "property": "Person property",
+                                "people": {"is_not_empty": True},
+                            },
+                        ]
+                    },
+                ]
+            },
+            [0, 1, 3],
+        ),
+    ],
+)
+def test_filters(store: PageStore, filter, expected):
+    sorts = [
+        QueryDatabaseSort(property="Number Property", direction=Direction.ascending)
+    ]
+    assert numbers(store, filter, sorts) == expected
+
+
+def test_unsupported_filters_raise(store: PageStore):
+    with pytest.raises(UnsupportedFilter):
+        numbers(store, {"property": "Number Rollup property", "rollup": {"any": {}}})
+    with pytest.raises(UnsupportedFilter):
+        numbers(store, {"property": "Missing", "number": {"equals": 1}})
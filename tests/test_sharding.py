@@ -0,0 +1,282 @@
+import asyncio
+import datetime
+import json
+import typing
+import uuid
+
+import httpx
+import pytest
+
+from notions.bulk import aclosing, merge, merge_sorted
+from notions.client import NotionAsyncClient
+from notions.models.properties import PageSelectProperty
+from notions.models.query_database import Direction, QueryDatabase, QueryDatabaseSort
+from notions.retry import RetryPolicy
+from notions.sharding import query_database_sharded, shard_boundaries, shard_filters
+
+from .test_parse_database import EXAMPLE_DATABASE_JSON
+from .test_parse_page import EXAMPLE_PAGE_JSON
+
+DATABASE_ID = uuid.UUID("fff51adc-8d4e-414a-a2e3-17e69111c328")
+START = datetime.datetime(2021, 1, 1, tzinfo=datetime.timezone.utc)
+
+CONDITIONS: typing.Dict[
+    str, typing.Callable[[datetime.datetime, datetime.datetime], bool]
+] = {
+    "on_or_after": lambda value, bound: value >= bound,
+    "before": lambda value, bound: value < bound,
+}
+
+
+def matches(page: dict, filter: typing.Optional[dict]) -> bool:
+    """Enough of Notion's filtering for the shards"""
+    if filter is None:
+        return True
+    if "and" in filter:
+        return all(matches(page, part) for part in filter["and"])
+    ((condition, bound),) = filter["created_time"].items()
+    created = datetime.datetime.fromisoformat(
+        page["created_time"].replace("Z", "+00:00")
+    )
+    return CONDITIONS[condition](created, datetime.datetime.fromisoformat(bound))
+
+
+# Not in alphabetical order, Notion sorts selects by the order of their options
+SELECT_OPTIONS = ["zebra", "apple", "mango"]
+
+
+def sort_value(page: dict, sort: dict) -> typing.Any:
+    if "timestamp" in sort:
+        return page[sort["timestamp"]]
+    prop = page["properties"][sort["property"]]
+    if prop["type"] == "select":
+        return SELECT_OPTIONS.index(prop["select"]["name"])
+    return prop["number"]
+
+
+class FakeDatabase:
+    def __init__(self, count: int):
+        self.pages = []
+        for i in range(count):
+            page = json.loads(EXAMPLE_PAGE_JSON)
+            page["id"] = str(uuid.uuid4())
+            created = START + datetime.timedelta(hours=i)
+            page["created_time"] = created.isoformat().replace("+00:00", ".000Z")
+            # Numbers in a different order to created_time
+            page["properties"]["Number Property"]["number"] = (i * 7) % count
+            page["properties"]["Select property"]["select"]["name"] = SELECT_OPTIONS[
+                i % len(SELECT_OPTIONS)
+            ]
+            self.pages.append(page)
+        self.database = json.loads(EXAMPLE_DATABASE_JSON)
+        self.database["properties"]["Select property"]["select"]["options"] = [
+            {"id": str(uuid.uuid4()), "name": name, "color": "gray"}
+            for name in SELECT_OPTIONS
+        ]
+        self.queries: typing.List[dict] = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "GET":
+            return httpx.Response(200, json=self.database)
+        query = json.loads(request.content)
+        self.queries.append(query)
+        pages = [page for page in self.pages if matches(page, query.get("filter"))]
+        for sort in reversed(query.get("sorts", [])):
+            pages.sort(
+                key=lambda page: sort_value(page, sort),
+                reverse=sort["direction"] == "descending",
+            )
+        start = int(query.get("start_cursor") or 0)
+        end = start + query.get("page_size", 100)
+        return httpx.Response(
+            200,
+            json={
+                "object": "list",
+                "results": pages[start:end],
+                "next_cursor": str(end) if end < len(pages) else None,
+                "has_more": end < len(pages),
+            },
+        )
+
+    def query(
+        self, query: QueryDatabase, shards: int, limit: typing.Optional[int] = None
+    ):
+        async def main():
+            async with NotionAsyncClient(
+                "test-token",
+                transport=httpx.MockTransport(self.handler),
+                requests_per_second=None,
+            ) as client:
+                return [
+                    page
+                    async for page in query_database_sharded(
+                        client, DATABASE_ID, query, shards=shards, limit=limit
+                    )
+                ]
+
+        return asyncio.run(main())
+
+
+def test_shard_filters_cover_every_time_once():
+    boundaries = shard_boundaries(START, START + datetime.timedelta(hours=8), 4)
+    assert [b.hour for b in boundaries] == [2, 4, 6]
+    assert shard_boundaries(START, START + datetime.timedelta(seconds=30), 4) == []
+
+    filters = shard_filters(boundaries[:1], {"and": [{"property": "x"}]})
+    assert filters == [
+        {
+            "and": [
+                {"property": "x"},
+                {
+                    "timestamp": "created_time",
+                    "created_time": {"before": "2021-01-01T02:00:00+00:00"},
+                },
+            ]
+        },
+        {
+            "and": [
+                {"property": "x"},
+                {
+                    "timestamp": "created_time",
+                    "created_time": {"on_or_after": "2021-01-01T02:00:00+00:00"},
+                },
+            ]
+        },
+    ]
+    assert shard_filters([]) == [None]
+
+
+def test_sharded_query_returns_every_page_once():
+    database = FakeDatabase(50)
+    pages = database.query(QueryDatabase(page_size=5), shards=4)
+    assert sorted(str(page.id) for page in pages) == sorted(
+        page["id"] for page in database.pages
+    )
+    shard_queries = [query for query in database.queries if "filter" in query]
+    assert len({json.dumps(query["filter"]) for query in shard_queries}) == 4
+
+
+def test_sharded_query_keeps_sort_order():
+    database = FakeDatabase(50)
+    query = QueryDatabase(
+        page_size=5,
+        sorts=[
+            QueryDatabaseSort(
+                property="Number Property", direction=Direction.descending
+            )
+        ],
+    )
+    pages = database.query(query, shards=3)
+    numbers = [page.properties["Number Property"].get_value() for page in pages]
+    assert numbers == sorted(numbers, reverse=True)
+    assert len(numbers) == 50
+
+    pages = database.query(query, shards=3, limit=7)
+    assert [page.properties["Number Property"].get_value() for page in pages] == (
+        numbers[:7]
+    )
+
+
+def test_sorts_which_cant_be_merged_run_unsharded():
+    database = FakeDatabase(30)
+    query = QueryDatabase(
+        page_size=5,
+        sorts=[
+            QueryDatabaseSort(property="Select property", direction=Direction.ascending)
+        ],
+    )
+    pages = database.query(query, shards=3)
+    names = []
+    for page in pages:
+        select = page.properties["Select property"]
+        assert isinstance(select, PageSelectProperty) and select.select is not None
+        names.append(select.select.name)
+    # Notion's order, not alphabetical or an interleaving of shards
+    assert names == sorted(names, key=SELECT_OPTIONS.index)
+    assert names[0] == "zebra"
+    assert len(names) == 30
+    assert not any("filter" in query for query in database.queries)
+
+
+def test_merge_sorted_is_stable():
+    async def items(*values):
+        for value in values:
+            yield value
+
+    async def main():
+        streams = [items((1, "a"), (3, "a")), items((1, "b"), (2, "b"))]
+        return [item async for item in merge_sorted(streams, key=lambda item: item[0])]
+
+    assert asyncio.run(main()) == [(1, "a"), (1, "b"), (2, "b"), (3, "a")]
+
+
+@pytest.mark.parametrize("ordered", [False, True])
+def test_stopping_early_closes_the_sources(ordered: bool):
+    closed = []
+
+    async def items(name: str):
+        try:
+            for i in range(10):
+                yield i
+        finally:
+            closed.append(name)
+
+    async def main():
+        streams = [items("a"), items("b"), items("c")]
+        merged = (
+            merge_sorted(streams, key=lambda item: item) if ordered else merge(streams)
+        )
+        async with aclosing(merged) as results:
+            async for _ in results:
+                break
+        # Closed straight away, not left for the garbage collector
+        return list(closed)
+
+    assert set(asyncio.run(main())) == {"a", "b", "c"}
+
+
+def test_stopping_a_sharded_query_early_stops_the_shards():
+    database = FakeDatabase(50)
+
+    async def main():
+        async with NotionAsyncClient(
+            "test-token",
+            transport=httpx.MockTransport(database.handler),
+            requests_per_second=None,
+        ) as client:
+            pages = query_database_sharded(
+                client, DATABASE_ID, QueryDatabase(page_size=5), shards=4
+            )
+            async with aclosing(pages) as results:
+                async for _ in results:
+                    break
+            return asyncio.all_tasks() - {asyncio.current_task()}
+
+    assert asyncio.run(main()) == set()
+
+
+def test_probe_is_retried():
+    database = FakeDatabase(10)
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if len(requests) == 1:
+            return httpx.Response(503, json={"object": "error"})
+        return database.handler(request)
+
+    async def main():
+        async with NotionAsyncClient(
+            "test-token",
+            transport=httpx.MockTransport(handler),
+            requests_per_second=None,
+            retry_policies={"POST": RetryPolicy(backoff_base=0.0)},
+        ) as client:
+            return [
+                page
+                async for page in query_database_sharded(
+                    client, DATABASE_ID, QueryDatabase(), shards=2
+                )
+            ]
+
+    assert len(asyncio.run(main())) == 10
@@ -0,0 +1,71 @@
+import asyncio
+import json
+import pathlib
+import sqlite3
+
+from notions.models.database import Database
+from notions.models.page import Page
+from notions.sqlite import PageStore
+
+from .test_parse_database import EXAMPLE_DATABASE_JSON
+from .test_parse_page import EXAMPLE_PAGE_JSON
+
+
+def example_pages(count: int):
+    for i in range(count):
+        obj = json.loads(EXAMPLE_PAGE_JSON)
+        obj["id"] = f"ccad10e7-c776-423e-9662-{i:012d}"
+        obj["properties"]["Number Property"]["number"] = i
+        yield Page.parse_obj(obj)
+
+
+def test_page_store_writes_typed_columns_in_batches(tmp_path: pathlib.Path):
+    path = str(tmp_path / "pages.db")
+    store = PageStore.open(path, Database.parse_raw(EXAMPLE_DATABASE_JSON))
+    count = asyncio.run(store.write_pages(example_pages(5), batch_size=2))
+    assert count == 5
+    store.close()
+
+    connection = sqlite3.connect(path)
+    connection.row_factory = sqlite3.Row
+    rows = connection.execute(
+        'SELECT * FROM pages WHERE number_property >= 3 ORDER BY "number_property"'
+    ).fetchall()
+    assert [row["number_property"] for row in rows] == [3.0, 4.0]
+    row = rows[0]
+    assert row["title"] == "Fields filled in"
+    assert row["checkbox_property"] == 1
+    assert row["created_time"] == "2021-07-31T17:01:00+00:00"
+    assert row["date_property.start"] == "2021-07-15"
+    assert json.loads(row["muti_select_property"]) == ["foo", "bar"]
+    assert Page.parse_raw(row["page"]) == list(example_pages(4))[3]
+    indexes = {row[1] for row in connection.execute("PRAGMA index_list(pages)")}
+    assert "pages_last_edited_time" in indexes
+
+
+def test_page_store_upserts_and_adds_new_columns(tmp_path: pathlib.Path):
+    path = str(tmp_path / "pages.db")
+    database = Database.parse_raw(EXAMPLE_DATABASE_JSON)
+    store = PageStore.open(path, database)
+    store.upsert_pages(example_pages(3))
+    store.close()
+
+    # Re-open with an extra property in the schema, and update a page
+    obj = json.loads(EXAMPLE_DATABASE_JSON)
+    obj["properties"]["Extra"] = {
+        "id": "xtra",
+        "name": "Extra",
+        "type": "checkbox",
+        "checkbox": {},
+    }
+    store = PageStore.open(path, Database.parse_obj(obj))
+    page = list(example_pages(1))[0]
+    page.archived = True
+    store.upsert_pages([page])
+    assert Database.parse_raw(store.get_meta("database") or "").properties["Extra"]
+
+    rows = store.connection.execute(
+        "SELECT extra, page FROM pages ORDER BY id"
+    ).fetchall()
+    assert [row[0] for row in rows] == [None, None, None]
+    assert [Page.parse_raw(row[1]).archived for row in rows] == [True, False, False]
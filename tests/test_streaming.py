@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from notions.streaming import ListResponseParser, StreamingParseError
+
+from .test_parse_page import EXAMPLE_PAGE_JSON
+
+TRICKY_RESULT = {
+    "string": 'Quotes " and braces }]{[ and a backslash \\',
+    "nested": [1, 2, {"null": None, "list": []}],
+    "number": -1.5e3,
+    "boolean": True,
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 100_000])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_list_response_parser(chunk_size, indent):
+    results = [json.loads(EXAMPLE_PAGE_JSON), TRICKY_RESULT, "string", 42]
+    body = json.dumps(
+        {
+            "object": "list",
+            "results": results,
+            "next_cursor": "abc",
+            "has_more": True,
+        },
+        indent=indent,
+    ).encode("UTF-8")
+    parser = ListResponseParser()
+    items = []
+    for i in range(0, len(body), chunk_size):
+        items.extend(parser.feed(body[i : i + chunk_size]))
+    fields = parser.close()
+    assert [json.loads(item) for item in items] == results
+    assert fields == {"object": "list", "next_cursor": "abc", "has_more": True}
+
+
+def test_list_response_parser_empty_results():
+    parser = ListResponseParser()
+    assert parser.feed(b'{"results": [], "has_more": false}') == []
+    assert parser.close() == {"has_more": False}
+
+
+def test_list_response_parser_yields_items_before_body_completes():
+    parser = ListResponseParser()
+    assert parser.feed(b'{"object": "list", "results": [{"a": 1}, {"b"') == [
+        b'{"a": 1}'
+    ]
+    assert parser.feed(b": 2}]") == [b'{"b": 2}']
+
+
+def test_list_response_parser_incomplete_body():
+    parser = ListResponseParser()
+    parser.feed(b'{"object": "list", "results": [{"a": 1}')
+    with pytest.raises(StreamingParseError):
+        parser.close()